@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+compares the get_obs_params database paths on a synthetic large set:
+fetching every OK recording row (get_all_meas_dict), streaming them into
+columnar arrays (get_meas_arrays) and fetching the distinct antenna and
+frequency pairs (get_coverage). The time and the peak memory of each
+path are reported
+
+the obs database is replaced by an SQLite file (see onoff_sqlite)
+
+Created Oct 2026
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+from optparse import OptionParser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+import onoff_db
+import onoff_sqlite
+import onoff_dbstats
+
+
+def best_time(func,ntimes):
+    best = None
+    for i in range(ntimes):
+        tstart = time.time()
+        result = func()
+        elapsed = time.time() - tstart
+        best = elapsed if best is None else min(best,elapsed)
+    return best,result
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    current,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options]',
+            description='Benchmark of the get_obs_params database paths on a synthetic set')
+    parser.add_option('-a', '--ants', dest='nants', type=int, action="store", default=42,
+                        help ='Number of antennas, default: 42')
+    parser.add_option('-f', '--freqs', dest='nfreqs', type=int, action="store", default=40,
+                        help ='Number of frequencies, default: 40')
+    parser.add_option('-r', '--repetitions', dest='repetitions', type=int, action="store", default=10,
+                        help ='On-off repetitions per frequency, default: 10')
+    parser.add_option('-n', '--ntimes', dest='ntimes', type=int, action="store", default=5,
+                        help ='Runs of each path, the best one is reported, default: 5')
+
+    (options,args) = parser.parse_args()
+
+    #the timings are printed, do not log them as slow queries too
+    onoff_dbstats.stats.slow_threshold = float('inf')
+
+    freq_list = [1000.0 + 250.0 * n for n in range(options.nfreqs)]
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory,"obs.sqlite")
+    try:
+        obsdb = onoff_sqlite.use_sqlite(filename)
+        ants = onoff_sqlite.synthetic_ants(options.nants)
+        setid = onoff_sqlite.generate_set(obsdb,ants,freq_list,["casa","moon"],options.repetitions,
+                complete=1.0,ok_fraction=0.95,rng=random.Random(1))
+        nrec = obsdb.count_recordings(setid)
+        obsdb.close()
+
+        ant_snap_dictionary = {}
+        for n,ant in enumerate(ants):
+            ant_snap_dictionary.setdefault("snap{}".format(n % 3),[]).append(ant)
+
+        def all_meas():
+            meas = onoff_db.get_all_meas_dict(setid,ants)
+            return onoff_db.obs_params_from_meas(meas,ant_snap_dictionary,freq_list)
+
+        def arrays():
+            cov = onoff_db.get_meas_arrays(setid,ants).coverage()
+            return onoff_db.obs_params_from_coverage(cov,ant_snap_dictionary,freq_list)
+
+        def coverage():
+            cov = onoff_db.get_coverage(setid,ants)
+            return onoff_db.obs_params_from_coverage(cov,ant_snap_dictionary,freq_list)
+
+        t_all,r_all = best_time(all_meas,options.ntimes)
+        t_arr,r_arr = best_time(arrays,options.ntimes)
+        t_cov,r_cov = best_time(coverage,options.ntimes)
+        assert r_all[0] == r_cov[0] and sorted(r_all[1]) == sorted(r_cov[1])
+        assert r_arr[0] == r_cov[0] and sorted(r_arr[1]) == sorted(r_cov[1])
+
+        print("{} OK recordings, {} antennas, {} frequencies".format(nrec,len(ants),len(freq_list)))
+        for name,elapsed,func in [("get_all_meas_dict",t_all,all_meas),("get_meas_arrays",t_arr,arrays),
+                ("get_coverage",t_cov,coverage)]:
+            print("{:<18s} {:8.1f} ms ({:4.1f}x) peak {:8.1f} kB".format(name,1000 * elapsed,t_all / elapsed,
+                peak_memory(func) / 1024.0))
+    finally:
+        onoff_db.close_pool()
+        os.remove(filename)
+        os.rmdir(directory)
+
+if __name__== "__main__":
+    main()
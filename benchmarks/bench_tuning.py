@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+compares the ADC level tuning of snap_record.py (-t) with snap_tuning on
+simulated inputs whose RMS falls by a given slope (dB per dB of
+attenuation): the steps to reach the target, each one a set_atten call
+and 5 ADC snapshots, and the time of the statistics of one step on
+ready snapshots
+
+Created Oct 2026
+"""
+
+import os
+import sys
+import time
+from optparse import OptionParser
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+import snap_tuning
+
+
+class SimInputs(object):
+
+    def __init__(self,rms0,slope,nsamples,seed):
+        self.rms0 = rms0
+        self.slope = slope
+        self.nsamples = nsamples
+        self.attens = [0.0,0.0]
+        self.rng = np.random.RandomState(seed)
+
+    def set_atten(self,antpols,attens):
+        self.attens = list(attens)
+
+    def snapshot(self):
+        samples = np.empty(self.nsamples)
+        for n in range(2):
+            rms = self.rms0[n] * 10 ** (-self.slope * self.attens[n] / 20.0)
+            samples[n::2] = self.rng.normal(0,rms,self.nsamples // 2)
+        return np.round(samples).clip(-128,127).astype(np.int8).tolist()
+
+
+def record_stats(snapshot,num_snaps=5):
+    chani = []
+    chanq = []
+    for i in range(num_snaps):
+        all_chan_data = snapshot()
+        chani += [all_chan_data[0::2][0::2]]
+        chanq += [all_chan_data[1::2][0::2]]
+    chani = np.array(chani)
+    chanq = np.array(chanq)
+    return chani.std(),chanq.std()
+
+
+def best_time(func,ntimes=20):
+    best = None
+    for i in range(ntimes):
+        tstart = time.time()
+        func()
+        elapsed = time.time() - tstart
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+
+def record_tuning(inputs,target_rms,max_attempts=5,num_snaps=5):
+    """
+    the snap_record.py loop, without the database and e-mail calls
+    """
+    atteni = attenq = 0.0
+    for attempt in range(max_attempts):
+        inputs.set_atten(None,[atteni,attenq])
+        stdi,stdq = record_stats(inputs.snapshot,num_snaps)
+        delta_atteni = 20*np.log10(stdi / target_rms)
+        delta_attenq = 20*np.log10(stdq / target_rms)
+        if (delta_atteni < 1) and (delta_attenq < 1):
+            return attempt + 1,[stdi,stdq]
+        atteni = min(max(int(4 * (atteni + delta_atteni)) / 4.0,0),30)
+        attenq = min(max(int(4 * (attenq + delta_attenq)) / 4.0,0),30)
+    return max_attempts,[stdi,stdq]
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options]',
+            description='Benchmark of the ADC level tuning')
+    parser.add_option('-s', '--slopes', dest='slopes', type=str, action="store", default="1.0,0.8,0.6",
+                        help ='Comma separated attenuator slopes in dB/dB, default: 1.0,0.8,0.6')
+    parser.add_option('--samples', dest='nsamples', type=int, action="store", default=16384,
+                        help ='Samples per ADC snapshot, default: 16384')
+    parser.add_option('-t', dest='target_rms', type=float, action="store", default=12.0,
+                        help ='Target RMS, default: 12')
+
+    (options,args) = parser.parse_args()
+
+    rms0 = [60.0,45.0]
+    inputs = SimInputs(rms0,1.0,options.nsamples,1)
+    snapshots = [inputs.snapshot() for i in range(5)]
+    def snapshot():
+        snapshots.append(snapshots.pop(0))
+        return snapshots[0]
+    sampler = snap_tuning.AdcSampler(snapshot)
+    print("statistics of 5 snapshots of {} samples: snap_record {:.2f} ms, snap_tuning {:.2f} ms".format(
+        options.nsamples,1000 * best_time(lambda: record_stats(snapshot)),1000 * best_time(sampler.sample)))
+
+    for slope in [float(s) for s in options.slopes.split(',')]:
+        inputs = SimInputs(rms0,slope,options.nsamples,1)
+        steps,rms = record_tuning(inputs,options.target_rms)
+        print("slope {:.1f} snap_record:          {} steps, rms {:5.1f} {:5.1f}".format(slope,steps,rms[0],rms[1]))
+
+        response = snap_tuning.AttenResponse()
+        for run in ["first","second"]:
+            inputs = SimInputs(rms0,slope,options.nsamples,2)
+            sampler = snap_tuning.AdcSampler(inputs.snapshot)
+            tuner = snap_tuning.SnapTuner(sampler,inputs.set_atten,response,options.target_rms)
+            result = tuner.tune("1a")
+            print("slope {:.1f} snap_tuning ({:<6s}): {} steps, rms {:5.1f} {:5.1f}".format(slope,run,result.steps,
+                result.rms[0],result.rms[1]))
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+compares the vacc snapshot decoders of snap_vacc on synthetic snapshots:
+the struct.unpack decoding of snap_record.py, the frombuffer view
+decoding and the same with a reused output buffer. The time per
+snapshot and the peak memory of each decoder are reported
+
+Created Oct 2026
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+import snap_vacc
+
+
+def best_time(func,ntimes,nloops):
+    best = None
+    for i in range(ntimes):
+        tstart = time.time()
+        for n in range(nloops):
+            func()
+        elapsed = (time.time() - tstart) / nloops
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    current,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options]',
+            description='Benchmark of the vacc snapshot decoders')
+    parser.add_option('-c', '--channels', dest='nchannels', type=int, action="store", default=4096,
+                        help ='Channels per snapshot, default: 4096')
+    parser.add_option('-l', '--loops', dest='nloops', type=int, action="store", default=200,
+                        help ='Decodings per timing run, default: 200')
+    parser.add_option('-n', '--ntimes', dest='ntimes', type=int, action="store", default=5,
+                        help ='Timing runs of each decoder, the best one is reported, default: 5')
+
+    (options,args) = parser.parse_args()
+
+    #accumulations of a realistic level, near the top of the uint32 range
+    rng = np.random.RandomState(1)
+    counts = rng.randint(1 << 30,(1 << 32) - 1,size=2 * options.nchannels,dtype=np.uint64)
+    data = counts.astype(snap_vacc.vacc_dtype).tobytes()
+    acc_len = 12207.0
+
+    out = np.empty((2,options.nchannels),dtype=np.float64)
+    decoders = [("struct.unpack",lambda: snap_vacc.decode_vacc_unpack(data,acc_len)),
+            ("frombuffer",lambda: snap_vacc.decode_vacc(data,acc_len)),
+            ("frombuffer, reused out",lambda: snap_vacc.decode_vacc(data,acc_len,out=out))]
+
+    auto0,auto1 = snap_vacc.decode_vacc_unpack(data,acc_len)
+    decoded = snap_vacc.decode_vacc(data,acc_len)
+    assert np.array_equal(decoded[0],auto0) and np.array_equal(decoded[1],auto1)
+
+    print("{} channel snapshots, {} bytes".format(options.nchannels,len(data)))
+    t_ref = None
+    for name,func in decoders:
+        elapsed = best_time(func,options.ntimes,options.nloops)
+        t_ref = t_ref or elapsed
+        print("{:<24s} {:8.1f} us ({:5.1f}x) peak {:8.1f} kB".format(name,1e6 * elapsed,t_ref / elapsed,
+            peak_memory(func) / 1024.0))
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+antenna polarization (antpol) names
+
+an ATA antenna is named by its number and letter ("2a"), one of its
+pols by the antenna name and the pol ("2ax", "2ay"). The antenna lists
+of snap_onoff_obs may contain single pols, e.g. "2a,3bx" to leave out
+the broken y pol of 3b: the recordings are of whole antennas (setRMS,
+record_same and the rec_ants rows take antenna names), so 3b is
+observed, the pol only matters to the tuning of the SNAP inputs (see
+snap_tuning)
+
+Created Oct 2026
+"""
+
+import re
+
+pols = ['x','y']
+
+_name = re.compile(r'^(\d+[a-z])([xy]?)$')
+
+
+def parse(name):
+    """
+    (antenna, pol) of an antenna or antpol name, pol is None for an
+    antenna: "2a" -> ("2a", None), "2ax" -> ("2a", "x")
+    """
+    match = _name.match(name.strip())
+    if not match:
+        raise ValueError("bad antenna name '{}'".format(name))
+    return match.group(1),match.group(2) or None
+
+
+def is_antpol(name):
+    return parse(name)[1] is not None
+
+
+def antpols(name):
+    """
+    the antpols of a label: "2a" -> ["2ax", "2ay"], "2ax" -> ["2ax"],
+    "2ax,3by" -> ["2ax", "3by"]
+    """
+    result = []
+    for part in name.split(','):
+        if not part.strip():
+            continue
+        ant,pol = parse(part)
+        result.extend([ant + p for p in pols] if pol is None else [ant + pol])
+    return result
+
+
+def input_antpols(name):
+    """
+    dictionary of SNAP input pol to the antpol connected to it, for a
+    label
+    """
+    return dict((parse(antpol)[1],antpol) for antpol in antpols(name))
+
+
+def antenna(name):
+    return parse(name)[0]
+
+
+def antennas(names):
+    """
+    the antennas (without duplicates, in order) of a list of labels
+    """
+    result = []
+    for name in names:
+        for antpol in antpols(name):
+            ant = antenna(antpol)
+            if ant not in result:
+                result.append(ant)
+    return result
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+persistent cache of the attenuations found by setRMS, per antpol, source
+and frequency
+
+before tuning the RMS, the attenuators are seeded with the last good
+values, so the tuning usually converges at once. Values older than
+max_age are ignored. Without a value at the requested frequency, the
+value is interpolated between the closest cached frequencies around it,
+if they are at most max_span MHz apart
+
+Created Oct 2026
+"""
+
+import os
+import json
+import time
+import bisect
+
+default_max_age = 12*3600.0
+default_max_span = 2000.0
+#frequencies closer than that are considered equal
+freq_tolerance = 1.0
+
+
+class AttenCache(object):
+
+    def __init__(self,filename,max_age=default_max_age,max_span=default_max_span):
+        self.filename = filename
+        self.max_age = max_age
+        self.max_span = max_span
+        self.entries = {}
+        if os.path.exists(filename):
+            with open(filename) as f:
+                self.entries = json.load(f)
+
+    def _key(self,antpol,source):
+        return "{}|{}".format(antpol,source)
+
+    def store(self,attendict,source,freq,now=None):
+        """
+        stores the setRMS result, attendict mapping an antenna to [x, y]
+        """
+        now = now or time.time()
+        for ant in attendict:
+            for pol,atten in zip(['x','y'],attendict[ant]):
+                key = self._key(ant + pol,source)
+                entries = [e for e in self.entries.get(key,[])
+                        if abs(e['freq'] - freq) > freq_tolerance and now - e['time'] <= self.max_age]
+                entries.append({'freq': float(freq), 'atten': float(atten), 'time': now})
+                entries.sort(key=lambda e: e['freq'])
+                self.entries[key] = entries
+
+    def lookup(self,antpol,source,freq,now=None):
+        """
+        returns the cached or interpolated attenuation, None if not known
+        """
+        now = now or time.time()
+        entries = [e for e in self.entries.get(self._key(antpol,source),[])
+                if now - e['time'] <= self.max_age]
+        if not entries:
+            return None
+
+        freqs = [e['freq'] for e in entries]
+        idx = bisect.bisect_left(freqs,freq)
+        for i in [idx - 1,idx]:
+            if 0 <= i < len(entries) and abs(freqs[i] - freq) <= freq_tolerance:
+                return entries[i]['atten']
+
+        if idx == 0 or idx == len(entries):
+            return None
+        lower = entries[idx - 1]
+        upper = entries[idx]
+        if upper['freq'] - lower['freq'] > self.max_span:
+            return None
+        frac = (freq - lower['freq']) / (upper['freq'] - lower['freq'])
+        return lower['atten'] + frac * (upper['atten'] - lower['atten'])
+
+    def seed(self,ant_dict,source,freq,now=None):
+        """
+        returns the antpols and attenuations lists (in the set_atten_thread
+        format) for the antennas having both pols cached
+        """
+        antpols_list_list = []
+        atten_list_list = []
+        for snap in ant_dict:
+            ant = ant_dict[snap]
+            attens = [self.lookup(ant + pol,source,freq,now) for pol in ['x','y']]
+            if None in attens:
+                continue
+            antpols_list_list.append([ant + 'x',ant + 'y'])
+            #attenuators have 0.25 dB steps
+            atten_list_list.append([round(a * 4) / 4.0 for a in attens])
+        return antpols_list_list,atten_list_list
+
+    def save(self):
+        tmpname = self.filename + ".tmp"
+        with open(tmpname,'w') as f:
+            json.dump(self.entries,f)
+        os.replace(tmpname,self.filename)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+the set of modules snap_onoff_obs uses to talk to the array, the SNAPs,
+the obs database and the outside world.
+
+any object providing the same functions can be used instead of a module,
+see onoff_sim for a simulated array
+
+Created Oct 2026
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Backend(object):
+    """
+    container for the ata_control, snap_observations, obs_db, onoff_db,
+    ATAComm and ata_positions implementations
+    """
+    def __init__(self,ata_control,snap_observations,obs_db,onoff_db,ATAComm,ata_positions):
+        self.ata_control = ata_control
+        self.snap_observations = snap_observations
+        self.obs_db = obs_db
+        self.onoff_db = onoff_db
+        self.ATAComm = ATAComm
+        self.ata_positions = ata_positions
+
+    def executor(self,max_workers):
+        """
+        executor of the steps run in the background (pipelined writes,
+        concurrent setup)
+        """
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    def now(self):
+        """
+        the current time, in seconds, of the measured durations
+        """
+        return time.time()
+
+
+def real_backend():
+    """
+    the backend talking to the real array
+    """
+    from SNAPobs import snap_observations
+    from ATATools import ata_control,ata_positions
+    from ATAobs import obs_db
+    import ATAComm
+    import onoff_db
+
+    return Backend(ata_control,snap_observations,obs_db,onoff_db,ATAComm,ata_positions)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+antenna x frequency coverage matrix of an onoff observation set
+
+the antennas (grouped by SNAP) and the requested frequencies are mapped to
+row and column indices of a boolean matrix. A measured frequency marks the
+closest requested frequency, if it is within tolerance MHz of it, so a
+database value of 1400.0001 still counts as 1400 MHz. Requested
+frequencies within tolerance of an earlier one are dropped, a measurement
+could only ever mark one of them
+
+Created Oct 2026
+"""
+
+import numpy as np
+
+default_freq_tolerance = 0.5
+
+
+def unique_freqs(freq_list,tolerance=None):
+    """
+    freq_list without the frequencies within tolerance MHz of an earlier
+    one, in order
+    """
+    tolerance = default_freq_tolerance if tolerance is None else tolerance
+    unique = []
+    for freq in freq_list:
+        if all(abs(float(freq) - float(kept)) > tolerance for kept in unique):
+            unique.append(freq)
+    return unique
+
+
+class CoverageMatrix(object):
+
+    def __init__(self,ant_snap_dictionary,freq_list,tolerance=None):
+        self.tolerance = default_freq_tolerance if tolerance is None else tolerance
+        self.freq_list = unique_freqs(freq_list,self.tolerance)
+        self.snaps = list(ant_snap_dictionary.keys())
+        self.ants = []
+        snap_rows = []
+        for n,sk in enumerate(self.snaps):
+            self.ants.extend(ant_snap_dictionary[sk])
+            snap_rows.extend([n] * len(ant_snap_dictionary[sk]))
+        self.ant_index = dict((ant,row) for row,ant in enumerate(self.ants))
+        self.snap_rows = np.array(snap_rows,dtype=int)
+
+        self.freqs = np.array(self.freq_list,dtype=float)
+        self.order = np.argsort(self.freqs,kind='stable')
+        self.sorted_freqs = self.freqs[self.order]
+        self.matrix = np.zeros((len(self.ants),len(self.freq_list)),dtype=bool)
+
+    def freq_columns(self,freqs):
+        """
+        returns the column indices of the requested frequencies closest to
+        freqs and a mask of the ones within tolerance
+        """
+        freqs = np.asarray(freqs,dtype=float)
+        if not len(self.sorted_freqs) or not freqs.size:
+            return np.zeros(freqs.shape,dtype=int),np.zeros(freqs.shape,dtype=bool)
+        idx = np.searchsorted(self.sorted_freqs,freqs)
+        lower = np.clip(idx - 1,0,len(self.sorted_freqs) - 1)
+        upper = np.clip(idx,0,len(self.sorted_freqs) - 1)
+        use_upper = np.abs(self.sorted_freqs[upper] - freqs) < np.abs(self.sorted_freqs[lower] - freqs)
+        nearest = np.where(use_upper,upper,lower)
+        mask = np.abs(self.sorted_freqs[nearest] - freqs) <= self.tolerance
+        return self.order[nearest],mask
+
+    def add(self,ant,freqs):
+        """
+        marks the frequencies as measured for the antenna. Antennas and
+        frequencies that are not in the matrix are ignored
+        """
+        row = self.ant_index.get(ant)
+        if row is None:
+            return
+        cols,mask = self.freq_columns(list(freqs))
+        self.matrix[row,cols[mask]] = True
+
+    def add_coverage(self,coverage):
+        """
+        adds a get_coverage like dictionary of antenna to frequencies
+        """
+        if coverage:
+            for ant,freqs in coverage.items():
+                self.add(ant,freqs)
+
+    @classmethod
+    def from_coverage(cls,coverage,ant_snap_dictionary,freq_list,tolerance=None):
+        matrix = cls(ant_snap_dictionary,freq_list,tolerance)
+        matrix.add_coverage(coverage)
+        return matrix
+
+    def missing(self):
+        """
+        antenna to the list of the frequencies it misses, in freq_list
+        order. Complete antennas are omitted
+        """
+        rows = np.flatnonzero(~self.matrix.all(axis=1))
+        return dict((self.ants[row],[self.freq_list[c] for c in np.flatnonzero(~self.matrix[row])])
+                for row in rows)
+
+    def obs_params(self):
+        """
+        returns the first incomplete antenna of each SNAP (as a SNAP to
+        antenna dictionary) and the frequencies (in freq_list order) any
+        of them misses
+        """
+        incomplete = np.flatnonzero(~self.matrix.all(axis=1))
+        #rows are grouped by SNAP, so the first row of each SNAP is the first antenna
+        snaps,first = np.unique(self.snap_rows[incomplete],return_index=True)
+        rows = incomplete[first]
+
+        outputDict = dict((self.snaps[sn],self.ants[row]) for sn,row in zip(snaps,rows))
+        todo = (~self.matrix[rows]).any(axis=0)
+        return outputDict,[self.freq_list[c] for c in np.flatnonzero(todo)]
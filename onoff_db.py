@@ -9,19 +9,160 @@ Created Jan 2020
 @author: jkulpa
 """
 
+import time
+import atexit
+import threading
+
+import numpy as np
+
 from ATATools import logger_defaults,snap_array_helpers
 #from ATAobs import obs_db
 import ATASQL
 
+import onoff_planner
+import onoff_coverage
+import onoff_dbpool
+import onoff_dbstats
+
+default_reconcile_interval = 1800.0
+default_chunk_size = 5000
+
+_pool = None
+_pool_lock = threading.Lock()
+#connection factory replacing ATASQL.connectObsDb, see use_connection
+_connect = None
+
+
+def get_pool():
+    """
+    the pool of obs database connections, created on first use
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = onoff_dbpool.ConnectionPool(_connect or ATASQL.connectObsDb)
+            atexit.register(close_pool)
+        return _pool
+
+def use_connection(connect):
+    """
+    makes the following queries use connections returned by connect()
+    instead of ATASQL.connectObsDb()
+    """
+    global _connect
+    close_pool()
+    _connect = connect
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+def _fetchall(name,query,args):
+    """
+    runs a read only query on a pooled connection and returns all rows.
+    If the connection turns out to be broken, the query is retried once
+    on a new connection. The call is recorded in onoff_dbstats as name
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+    pool = get_pool()
+    tstart = time.time()
+    rows = None
+    try:
+        for attempt in [0,1]:
+            try:
+                with pool.connection() as mydb:
+                    mycursor = mydb.cursor()
+                    try:
+                        mycursor.execute(query,args)
+                        rows = mycursor.fetchall()
+                        return rows
+                    finally:
+                        mycursor.close()
+            except Exception as e:
+                if attempt or not onoff_dbpool.is_connection_error(e):
+                    raise
+                logger.warning("database connection failed ({}), retrying".format(e))
+    finally:
+        onoff_dbstats.stats.record(name,time.time() - tstart,
+                None if rows is None else len(rows),None if rows is None else onoff_dbstats.row_bytes(rows),
+                onoff_dbstats.render(query,args),rows is None)
+
+
+def _unbuffered_cursor(mydb):
+    """
+    a cursor reading the rows from the server as they are fetched, not
+    all of them on execute. Each driver asks for it its own way: the
+    buffered flag of mysql-connector, the server side cursor class of
+    MySQLdb and PyMySQL. Other connections (sqlite) step through the rows
+    with their default cursor
+    """
+    driver = type(mydb).__module__.split('.')[0]
+    if driver == 'mysql':
+        return mydb.cursor(buffered=False)
+    if driver == 'MySQLdb':
+        import MySQLdb.cursors
+        return mydb.cursor(MySQLdb.cursors.SSCursor)
+    if driver == 'pymysql':
+        import pymysql.cursors
+        return mydb.cursor(pymysql.cursors.SSCursor)
+    return mydb.cursor()
+
+def _iter_chunks(name,query,args,chunk_size=default_chunk_size):
+    """
+    runs a read only query on an unbuffered cursor and yields the rows in
+    lists of at most chunk_size, so the whole result is never held in
+    memory. The connection is not reused if the generator is not run to
+    the end, as unread rows may be left on it
+    """
+    pool = get_pool()
+    tstart = time.time()
+    nrows = 0
+    nbytes = 0
+    done = False
+    mydb = pool.acquire()
+    try:
+        mycursor = _unbuffered_cursor(mydb)
+        try:
+            mycursor.execute(query,args)
+            while True:
+                rows = mycursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                nrows += len(rows)
+                nbytes += onoff_dbstats.row_bytes(rows)
+                yield rows
+            done = True
+        finally:
+            try:
+                mycursor.close()
+            except Exception:
+                done = False
+    finally:
+        pool.release(mydb,broken=not done)
+        onoff_dbstats.stats.record(name,time.time() - tstart,nrows,nbytes,
+                onoff_dbstats.render(query,args),not done)
+
+def _ant_condition(antenna_list):
+    """
+    the rec_ants.ant condition and its arguments. None selects all the
+    recordings of the set
+    """
+    if antenna_list is None:
+        return "",[]
+    in_p=', '.join(map(lambda x: '%s', antenna_list))
+    return " and rec_ants.ant in ({})".format(in_p),list(antenna_list)
+
+def _ant_desc(antenna_list):
+    return "(all)" if antenna_list is None else ",".join(antenna_list)
 
 def get_all_meas_dict(setid,antenna_list):
     
     logger= logger_defaults.getModuleLogger(__name__)
 
-    mydb = ATASQL.connectObsDb()
-    mycursor = mydb.cursor()
-
-    if not antenna_list:
+    if antenna_list is not None and not antenna_list:
         logger.warning('antenna list empty for id {}'.format(setid))
         return None
 
@@ -29,22 +170,16 @@ def get_all_meas_dict(setid,antenna_list):
             "rec_ants.ant,rec_ants.az,rec_ants.el "
             "from (recordings inner join rec_ants on recordings.id = rec_ants.id ) "
             "where recordings.status = 'OK' and  recordings.setid = %s ")
-    cpart2 = (" and rec_ants.ant in (%s)")
-    in_p=', '.join(map(lambda x: '%s', antenna_list))
-
-    insertcmd_part2 = cpart2 % in_p
+    insertcmd_part2,ant_args = _ant_condition(antenna_list)
 
     insertcmd = insertcmd_part + insertcmd_part2
 
-    exec_list = [setid] + antenna_list
+    exec_list = [setid] + ant_args
 
-    logger.info("getting previous measurements for id {} antennas {}".format(setid,",".join(antenna_list)))
-    mycursor.execute(insertcmd,exec_list)
-    myiterator = mycursor.fetchall()
+    logger.info("getting previous measurements for id {} antennas {}".format(setid,_ant_desc(antenna_list)))
+    myiterator = _fetchall('get_all_meas_dict',insertcmd,exec_list)
 
     if not myiterator:
-        mycursor.close()
-        mydb.close()
         return None
     
     returndict = {}
@@ -59,66 +194,410 @@ def get_all_meas_dict(setid,antenna_list):
         returndict[ant]['az'].append(az)
         returndict[ant]['el'].append(el)
 
+    return returndict
+
 
-    mycursor.close()
-    mydb.close()
+def get_coverage(setid,antenna_list):
+    """
+    returns a dictionary of antenna to the set of frequencies with an OK
+    recording in the set. Only the distinct (antenna, frequency) pairs
+    are fetched, aggregated by the database. If antenna_list is None,
+    all the recording labels of the set are returned
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
 
-    return returndict
+    if antenna_list is not None and not antenna_list:
+        logger.warning('antenna list empty for id {}'.format(setid))
+        return {}
+
+    ant_cond,ant_args = _ant_condition(antenna_list)
+    querycmd = ("select rec_ants.ant,recordings.freq "
+            "from (recordings inner join rec_ants on recordings.id = rec_ants.id ) "
+            "where recordings.status = 'OK' and recordings.setid = %s{} "
+            "group by rec_ants.ant,recordings.freq").format(ant_cond)
+
+    logger.info("getting coverage for id {} antennas {}".format(setid,_ant_desc(antenna_list)))
+    coverage = {}
+    for (ant,freq) in _fetchall('get_coverage',querycmd,[setid] + ant_args):
+        coverage.setdefault(ant,set()).add(freq)
+    return coverage
+
+def get_source_coverage(setid,antenna_list):
+    """
+    returns a list of the distinct (antenna, frequency, source) of the OK
+    recordings in the set
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+
+    if antenna_list is not None and not antenna_list:
+        logger.warning('antenna list empty for id {}'.format(setid))
+        return []
 
+    ant_cond,ant_args = _ant_condition(antenna_list)
+    querycmd = ("select rec_ants.ant,recordings.freq,recordings.source "
+            "from (recordings inner join rec_ants on recordings.id = rec_ants.id ) "
+            "where recordings.status = 'OK' and recordings.setid = %s{} "
+            "group by rec_ants.ant,recordings.freq,recordings.source").format(ant_cond)
 
-def get_obs_params(setid,sources,ant_snap_dictionary,freq_list):
+    logger.info("getting coverage per source for id {} antennas {}".format(setid,_ant_desc(antenna_list)))
+    return [tuple(row) for row in _fetchall('get_source_coverage',querycmd,[setid] + ant_args)]
 
-    all_antennas_list = snap_array_helpers.dict_list_to_list(ant_snap_dictionary)
+def get_bulk_coverage(setids,sources=None,antenna_list=None):
+    """
+    returns the coverage of several sets in a single query, as a
+    dictionary of (setid, source) to antenna to the set of frequencies
+    with an OK recording. sources (None for all) restricts the sources,
+    antenna_list (None for all) the antennas
+    """
     logger= logger_defaults.getModuleLogger(__name__)
 
-    meas_dictionary = get_all_meas_dict(setid,all_antennas_list)
+    if not setids or (sources is not None and not sources) or (antenna_list is not None and not antenna_list):
+        logger.warning('empty set, source or antenna list for bulk coverage')
+        return {}
+
+    set_p=', '.join(map(lambda x: '%s', setids))
+    querycmd = ("select recordings.setid,recordings.source,rec_ants.ant,recordings.freq "
+            "from (recordings inner join rec_ants on recordings.id = rec_ants.id ) "
+            "where recordings.status = 'OK' and recordings.setid in ({})").format(set_p)
+    query_args = list(setids)
+    if sources is not None:
+        source_p=', '.join(map(lambda x: '%s', sources))
+        querycmd += " and recordings.source in ({})".format(source_p)
+        query_args += list(sources)
+    ant_cond,ant_args = _ant_condition(antenna_list)
+    querycmd += ant_cond + " group by recordings.setid,recordings.source,rec_ants.ant,recordings.freq"
+
+    logger.info("getting coverage for ids {} sources {} antennas {}".format(
+        ",".join(map(str,setids)),_ant_desc(sources),_ant_desc(antenna_list)))
+    bulk = {}
+    for (setid,source,ant,freq) in _fetchall('get_bulk_coverage',querycmd,query_args + ant_args):
+        bulk.setdefault((setid,source),{}).setdefault(ant,set()).add(freq)
+    return bulk
+
+def merge_coverage(bulk,setids=None,sources=None):
+    """
+    the get_coverage dictionary of a get_bulk_coverage dictionary, merged
+    over the given sets and sources (None for all)
+    """
+    coverage = {}
+    for (setid,source),set_coverage in bulk.items():
+        if (setids is not None and setid not in setids) or (sources is not None and source not in sources):
+            continue
+        for ant,freqs in set_coverage.items():
+            coverage.setdefault(ant,set()).update(freqs)
+    return coverage
+
+def source_rows(bulk):
+    """
+    the get_source_coverage rows of a get_bulk_coverage dictionary, over
+    all its sets
+    """
+    rows = set()
+    for (setid,source),set_coverage in bulk.items():
+        for ant,freqs in set_coverage.items():
+            rows.update((ant,freq,source) for freq in freqs)
+    return list(rows)
+
+class MeasArrays(object):
+    """
+    columnar OK measurements: antenna code, frequency and obsid arrays
+    (one entry per recording and antenna), with ants mapping the codes
+    to the antenna labels. The arrays grow by doubling as the rows are
+    appended
+    """
+    def __init__(self,capacity=1024):
+        self.ants = []
+        self.ant_index = {}
+        self.size = 0
+        self.ant_codes = np.empty(capacity,dtype=np.int32)
+        self.freqs = np.empty(capacity,dtype=np.float64)
+        self.obsids = np.empty(capacity,dtype=np.int64)
+
+    def _reserve(self,nrows):
+        capacity = len(self.freqs)
+        if self.size + nrows <= capacity:
+            return
+        while capacity < self.size + nrows:
+            capacity *= 2
+        for attr in ['ant_codes','freqs','obsids']:
+            old = getattr(self,attr)
+            new = np.empty(capacity,dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self,attr,new)
+
+    def _code(self,ant):
+        code = self.ant_index.get(ant)
+        if code is None:
+            code = len(self.ants)
+            self.ant_index[ant] = code
+            self.ants.append(ant)
+        return code
 
-    snapKeys = ant_snap_dictionary.keys()
-    outputDict = {}
+    def append_rows(self,rows):
+        """
+        appends (antenna, frequency, obsid) rows
+        """
+        nrows = len(rows)
+        self._reserve(nrows)
+        end = self.size + nrows
+        self.ant_codes[self.size:end] = [self._code(row[0]) for row in rows]
+        self.freqs[self.size:end] = [row[1] for row in rows]
+        self.obsids[self.size:end] = [row[2] for row in rows]
+        self.size = end
+
+    def trim(self):
+        """
+        drops the unused capacity
+        """
+        self.ant_codes = self.ant_codes[:self.size].copy()
+        self.freqs = self.freqs[:self.size].copy()
+        self.obsids = self.obsids[:self.size].copy()
+        return self
+
+    def coverage(self):
+        """
+        the get_coverage dictionary of the measurements
+        """
+        pairs = np.unique(np.stack([self.ant_codes[:self.size].astype(np.float64),self.freqs[:self.size]],axis=1),
+                axis=0) if self.size else []
+        coverage = {}
+        for code,freq in pairs:
+            coverage.setdefault(self.ants[int(code)],set()).add(float(freq))
+        return coverage
+
+    def nbytes(self):
+        return self.ant_codes.nbytes + self.freqs.nbytes + self.obsids.nbytes
+
+def get_meas_arrays(setid,antenna_list,chunk_size=default_chunk_size):
+    """
+    the OK measurements of the set as MeasArrays, fetched in chunks of
+    chunk_size rows, so the memory used is the arrays plus one chunk.
+    antenna_list None selects all the antennas
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+
+    arrays = MeasArrays()
+    if antenna_list is not None and not antenna_list:
+        logger.warning('antenna list empty for id {}'.format(setid))
+        return arrays
+
+    ant_cond,ant_args = _ant_condition(antenna_list)
+    querycmd = ("select rec_ants.ant,recordings.freq,recordings.id "
+            "from (recordings inner join rec_ants on recordings.id = rec_ants.id ) "
+            "where recordings.status = 'OK' and recordings.setid = %s{}").format(ant_cond)
+
+    logger.info("streaming measurements for id {} antennas {}".format(setid,_ant_desc(antenna_list)))
+    for rows in _iter_chunks('get_meas_arrays',querycmd,[setid] + ant_args,chunk_size):
+        arrays.append_rows(rows)
+    return arrays.trim()
+
+def coverage_from_meas(meas_dictionary):
+    """
+    the get_coverage dictionary for a get_all_meas_dict dictionary
+    """
+    coverage = {}
     if meas_dictionary:
+        for cant in meas_dictionary:
+            coverage[cant] = set(meas_dictionary[cant]['freq'])
+    return coverage
+
+
+def write_onoff_series(atten_list,obsids):
+    """
+    writes the attenuation values of all the recordings of an on-off series
+    and marks the recordings as OK, in a single transaction. atten_list is
+    a list of (obsid, attendict), the obs_db.updateAttenVals arguments, with
+    attendict mapping each antenna to its [x, y] attenuation.
+    If anything fails, nothing is written and the exception is re-raised.
+    The obs_db calls commit on their own connection each, so the
+    statements are the ones of updateAttenVals and markRecordingsOK run
+    on a single connection (test_onoff_sqlite checks the rows match)
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+
+    if not obsids:
+        logger.warning('no recordings to mark as OK')
+        return
+
+    atten_rows = []
+    for (obsid,attendict) in atten_list:
+        for ant in attendict:
+            attenx,atteny = attendict[ant]
+            atten_rows.append((attenx,atteny,obsid,ant))
+
+    updatecmd_atten = ("update rec_ants set attenx = %s, atteny = %s "
+            "where id = %s and ant = %s")
+    in_p=', '.join(map(lambda x: '%s', obsids))
+    updatecmd_status = "update recordings set status = 'OK' where id in (%s)" % in_p
+
+    tstart = time.time()
+    ok = False
+    #the pool rolls the transaction back if anything fails
+    try:
+        with get_pool().connection() as mydb:
+            mycursor = mydb.cursor()
+            try:
+                logger.info("writing {} attenuation values and marking {} recordings as OK".format(
+                    len(atten_rows),len(obsids)))
+                if atten_rows:
+                    mycursor.executemany(updatecmd_atten,atten_rows)
+                mycursor.execute(updatecmd_status,list(obsids))
+                mydb.commit()
+                ok = True
+            finally:
+                mycursor.close()
+    finally:
+        onoff_dbstats.stats.record('write_onoff_series',time.time() - tstart,len(atten_rows) + len(obsids),
+                onoff_dbstats.row_bytes(atten_rows),onoff_dbstats.render(updatecmd_status,list(obsids)),not ok)
+
+
+def query_antennas(ant_snap_dictionary):
+    """
+    the antenna list to query for a planning dictionary
+    """
+    return snap_array_helpers.dict_list_to_list(ant_snap_dictionary)
 
-        #using sets because it automatically removes duplicates
-        #we are allowing to re-measure some frequencies on some 
-        #of the antennas. e.g. ant1a was measured on 1,2,3 GHz
-        #and ant1c on 1,2 GHz and they belong to different snaps,
-        #while order was 1,2,3,4 GHzwe would order to measure
-        #1a and 2c on 3 and 4 GHz, duplicating 3GHz for 1a
-        freq_set = set(freq_list)
-        todo_freq_set = set()
-        antennas_got = meas_dictionary.keys()
-        for sk in snapKeys:
-            clist = ant_snap_dictionary[sk]
-            #for each host, we are searching for first antenna that
-            #was not measured, or was measured but has still some
-            #not measured frequencies
-            for cant in clist:
-                if cant in antennas_got:
-                    #antenna was measured, testing freq list
-                    flist = meas_dictionary[cant]['freq']
-                    diffset = freq_set - set(flist)
-                    #we have some unmeasured freqencies for that antenna
-                    if diffset:
-                        outputDict[sk] = cant
-                        todo_freq_set.update(diffset)
-                        break
-                else:
-                    outputDict[sk] = cant
-                    todo_freq_set.update(freq_list)
-                    break 
-
-
-        outputFreqList = list(todo_freq_set)
+def get_obs_params(setid,sources,ant_snap_dictionary,freq_list,tolerance=None):
+
+    coverage = get_coverage(setid,query_antennas(ant_snap_dictionary))
+
+    return obs_params_from_coverage(coverage,ant_snap_dictionary,freq_list,tolerance)
+
+def obs_params_from_meas(meas_dictionary,ant_snap_dictionary,freq_list,tolerance=None):
+    """
+    the get_obs_params selection for an already fetched measurement dictionary
+    """
+    return obs_params_from_coverage(coverage_from_meas(meas_dictionary),ant_snap_dictionary,freq_list,tolerance)
+
+def obs_params_from_coverage(coverage,ant_snap_dictionary,freq_list,tolerance=None):
+    """
+    the get_obs_params selection for an already fetched coverage dictionary.
+    A frequency within tolerance MHz of a requested one counts as measured
+    """
+    #for each host, we are searching for first antenna that
+    #was not measured, or was measured but has still some
+    #not measured frequencies.
+    #we are allowing to re-measure some frequencies on some 
+    #of the antennas. e.g. ant1a was measured on 1,2,3 GHz
+    #and ant1c on 1,2 GHz and they belong to different snaps,
+    #while order was 1,2,3,4 GHzwe would order to measure
+    #1a and 2c on 3 and 4 GHz, duplicating 3GHz for 1a
+    matrix = onoff_coverage.CoverageMatrix.from_coverage(coverage,ant_snap_dictionary,freq_list,tolerance)
+    return matrix.obs_params()
+
+def get_obs_plan(setid,sources,ant_snap_dictionary,freq_list,cost_model=None,prior_sets=None):
+    """
+    plans the observation of everything that is still missing in the set,
+    with a single database query. Measurements of the prior_sets count
+    as done too. Returns a list of onoff_planner.PlanStep
+    """
+    if prior_sets:
+        bulk = get_bulk_coverage([setid] + list(prior_sets),None,query_antennas(ant_snap_dictionary))
+        coverage = merge_coverage(bulk)
     else:
-        #there were no measurements for those antennas
-        #taking first antenna from each list and copying
-        #the frequency list
-        outputFreqList = freq_list
-        for sk in snapKeys:
-            clist = ant_snap_dictionary[sk]
-            outputDict[sk] = clist[0]
-        
-
-    return outputDict,outputFreqList
+        coverage = get_coverage(setid,query_antennas(ant_snap_dictionary))
+
+    return plan_from_coverage(setid,coverage,sources,ant_snap_dictionary,freq_list,cost_model)
+
+def plan_from_meas(setid,meas_dictionary,sources,ant_snap_dictionary,freq_list,cost_model=None):
+    """
+    the get_obs_plan planning for an already fetched measurement dictionary
+    """
+    return plan_from_coverage(setid,coverage_from_meas(meas_dictionary),sources,ant_snap_dictionary,
+            freq_list,cost_model)
+
+def plan_from_coverage(setid,coverage,sources,ant_snap_dictionary,freq_list,cost_model=None):
+    """
+    the get_obs_plan planning for an already fetched coverage dictionary
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+
+    cost_model = cost_model or onoff_planner.CostModel()
+    plan = onoff_planner.plan_observations(coverage,ant_snap_dictionary,freq_list,cost_model)
+    logger.info("planned {} steps for set {}, estimated {:.0f} s".format(len(plan),setid,
+        cost_model.estimate(plan,len(sources))))
+    return plan
+
+class CoverageIndex(object):
+    """
+    in-memory antenna x frequency x source coverage of a set, loaded once
+    with fetch() (returning get_source_coverage like rows) and updated with
+    mark_ok as the on-off series are marked OK. It is reconciled with the
+    database with reconcile(), or by maybe_reconcile() once every
+    reconcile_interval seconds of clock(). get_obs_params matches the
+    frequencies within tolerance MHz
+    """
+    def __init__(self,fetch,reconcile_interval=default_reconcile_interval,tolerance=None,clock=time.time):
+        self.fetch = fetch
+        self.clock = clock
+        self.reconcile_interval = reconcile_interval
+        self.tolerance = tolerance
+        self.lock = threading.Lock()
+        #antenna to the frequency to the set of sources
+        self.index = {}
+        #(antenna, frequency, source) marked OK since the last reconciliation
+        self.local = set()
+        self.last_reconcile = None
+        self.reconcile()
+
+    def _add(self,ant,freq,source):
+        self.index.setdefault(ant,{}).setdefault(freq,set()).add(source)
+
+    def mark_ok(self,ant_dict,freq,source):
+        with self.lock:
+            for ant in ant_dict.values():
+                self._add(ant,freq,source)
+                self.local.add((ant,freq,source))
+
+    def is_measured(self,ant,freq,source=None):
+        with self.lock:
+            sources = self.index.get(ant,{}).get(freq)
+            if not sources:
+                return False
+            return source is None or source in sources
+
+    def coverage(self,source=None):
+        """
+        the get_coverage dictionary of the frequencies measured, on the
+        given source or on any source if None
+        """
+        with self.lock:
+            coverage = {}
+            for ant,freqs in self.index.items():
+                cfreqs = set(f for f,sources in freqs.items() if source is None or source in sources)
+                if cfreqs:
+                    coverage[ant] = cfreqs
+            return coverage
+
+    def get_obs_params(self,setid,sources,ant_snap_dictionary,freq_list):
+        """
+        get_obs_params answered from the index
+        """
+        self.maybe_reconcile()
+        return obs_params_from_coverage(self.coverage(),ant_snap_dictionary,freq_list,self.tolerance)
+
+    def reconcile(self):
+        """
+        reloads the index from the database, keeping what was marked OK
+        locally in the meantime
+        """
+        logger= logger_defaults.getModuleLogger(__name__)
+        rows = set(self.fetch())
+        with self.lock:
+            missing = self.local - rows
+            self.index = {}
+            for (ant,freq,source) in rows | self.local:
+                self._add(ant,freq,source)
+            self.local = missing
+            self.last_reconcile = self.clock()
+        if missing:
+            logger.warning("{} antenna frequencies marked OK are not in the database yet".format(len(missing)))
+        logger.info("coverage index loaded, {} antenna frequencies".format(len(rows)))
+
+    def maybe_reconcile(self):
+        if self.reconcile_interval is not None and self.clock() - self.last_reconcile > self.reconcile_interval:
+            self.reconcile()
+
 
 def remove_antennas_from_dict(ant_groups,curr_ant_dict):
     
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+small pool of reused database connections
+
+connections are created on demand by the connect function (e.g.
+ATASQL.connectObsDb) up to maxsize, and returned to the pool after use
+instead of being closed, so repeated queries do not pay the TCP and
+authentication setup again. A connection that was idle for longer than
+check_after seconds is tested with a trivial query before it is handed
+out, a broken one is closed and replaced by a new connection.
+A connection that fails during use is discarded.
+
+the transaction left open on a connection is rolled back when it is
+returned to the pool. The obs database runs without autocommit and with
+REPEATABLE READ, so a reused connection would otherwise keep the snapshot
+of its first query and not see the rows committed on other connections.
+Writes must therefore be committed before the connection is returned
+
+Created Oct 2026
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+from ATATools import logger_defaults
+
+default_pool_size = 4
+default_timeout = 30.0
+default_check_after = 30.0
+default_max_idle = 600.0
+
+
+def is_connection_error(exc):
+    """
+    True if exc (a DB API exception) means the connection itself failed,
+    so the query may be retried on a new connection
+    """
+    return type(exc).__name__ in ('OperationalError','InterfaceError')
+
+
+class ConnectionPool(object):
+
+    def __init__(self,connect,maxsize=default_pool_size,timeout=default_timeout,
+            check_after=default_check_after,max_idle=default_max_idle):
+        self.connect = connect
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(maxsize)
+        #(connection, time returned to the pool)
+        self.idle = []
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _healthy(self,conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("select 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self,conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _get(self):
+        logger = logger_defaults.getModuleLogger(__name__)
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                conn,since = self.idle.pop()
+            idle_time = time.time() - since
+            if idle_time > self.max_idle:
+                self._close(conn)
+                continue
+            if idle_time > self.check_after and not self._healthy(conn):
+                logger.warning("discarding broken database connection")
+                self.discarded += 1
+                self._close(conn)
+                continue
+            self.reused += 1
+            return conn
+
+        conn = self.connect()
+        self.created += 1
+        return conn
+
+    def acquire(self):
+        """
+        returns a connection, waiting at most timeout seconds for one
+        to be released if maxsize connections are in use
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise RuntimeError("no database connection free after {:.0f} s".format(self.timeout))
+        try:
+            return self._get()
+        except:
+            self.slots.release()
+            raise
+
+    def release(self,conn,broken=False):
+        """
+        ends the open transaction of the connection and returns it to the
+        pool, or closes it if broken or if the rollback fails
+        """
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self.discarded += 1
+            self._close(conn)
+        else:
+            with self.lock:
+                self.idle.append((conn,time.time()))
+        self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        connection for the with block. Whatever the block did not commit
+        is rolled back when it ends, and the connection is discarded if
+        the rollback fails
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """
+        closes all the idle connections
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        with self.lock:
+            idle = self.idle
+            self.idle = []
+        for conn,since in idle:
+            self._close(conn)
+        if self.created:
+            logger.info("database pool: {} connections created, {} reuses, {} discarded".format(
+                self.created,self.reused,self.discarded))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+timing, row count and slow query statistics of the obs database calls
+
+every call is recorded under a name (e.g. get_all_meas_dict or
+obs_db.updateAttenVals) with its latency, in a histogram, and, where
+known, the rows returned and an estimate of the bytes transferred. Calls
+slower than slow_threshold seconds are logged with the rendered
+statement. The statistics are summarized in the log and, as JSON, in a
+file at the end of a run
+
+Created Oct 2026
+"""
+
+import json
+import time
+import threading
+
+from ATATools import logger_defaults
+
+default_slow_threshold = 0.5
+#upper bounds of the latency histogram buckets, in ms, the last one is open
+histogram_bounds = [1,2,5,10,20,50,100,200,500,1000,2000,5000]
+
+
+def render(query,args):
+    """
+    the statement with the %s placeholders replaced by the arguments
+    """
+    parts = query.split('%s')
+    if len(parts) != len(args) + 1:
+        return "{} {!r}".format(query,list(args))
+    rendered = [parts[0]]
+    for arg,part in zip(args,parts[1:]):
+        rendered.append(repr(arg))
+        rendered.append(part)
+    return ''.join(rendered)
+
+
+def row_bytes(rows):
+    """
+    estimated size of the values of the rows, as sent by the server
+    """
+    nbytes = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value,(bytes,bytearray)):
+                nbytes += len(value)
+            elif isinstance(value,str):
+                nbytes += len(value.encode('utf-8'))
+            elif isinstance(value,(int,float)):
+                nbytes += 8
+            else:
+                nbytes += len(str(value))
+    return nbytes
+
+
+class CallStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.nbytes = 0
+        self.histogram = [0] * (len(histogram_bounds) + 1)
+
+    def add(self,seconds,rows,nbytes,error):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max,seconds)
+        if error:
+            self.errors += 1
+        if rows is not None:
+            self.rows += rows
+        if nbytes is not None:
+            self.nbytes += nbytes
+        ms = seconds * 1000.0
+        for n,bound in enumerate(histogram_bounds):
+            if ms <= bound:
+                self.histogram[n] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def percentile(self,fraction):
+        """
+        upper bound (ms) of the histogram bucket holding the percentile,
+        None for the open last bucket
+        """
+        target = fraction * self.count
+        seen = 0
+        for n,count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                return histogram_bounds[n] if n < len(histogram_bounds) else None
+        return None
+
+    def as_dict(self):
+        return {'count': self.count, 'errors': self.errors, 'total_s': self.total,
+                'mean_ms': 1000.0 * self.total / self.count if self.count else 0.0,
+                'max_ms': 1000.0 * self.max, 'p50_ms': self.percentile(0.5),
+                'p95_ms': self.percentile(0.95), 'rows': self.rows, 'bytes': self.nbytes,
+                'histogram_ms': dict(zip([str(b) for b in histogram_bounds] + ['inf'],self.histogram))}
+
+
+class DbStats(object):
+
+    def __init__(self,slow_threshold=default_slow_threshold):
+        self.slow_threshold = slow_threshold
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.slow = []
+
+    def record(self,name,seconds,rows=None,nbytes=None,statement=None,error=False):
+        logger = logger_defaults.getModuleLogger(__name__)
+        with self.lock:
+            self.calls.setdefault(name,CallStats()).add(seconds,rows,nbytes,error)
+            if seconds >= self.slow_threshold:
+                self.slow.append({'name': name, 'ms': 1000.0 * seconds, 'rows': rows,
+                    'statement': statement, 'time': time.time()})
+        if seconds >= self.slow_threshold:
+            logger.warning("slow database call {} took {:.0f} ms{}: {}".format(name,1000.0 * seconds,
+                "" if rows is None else ", {} rows".format(rows),statement or "(statement not known)"))
+
+    def reset(self):
+        with self.lock:
+            self.calls = {}
+            self.slow = []
+
+    def summary(self):
+        with self.lock:
+            return {'slow_threshold_s': self.slow_threshold,
+                    'calls': dict((name,cstats.as_dict()) for name,cstats in self.calls.items()),
+                    'slow': list(self.slow)}
+
+    def format_summary(self):
+        lines = ["database calls:"]
+        with self.lock:
+            for name in sorted(self.calls.keys(),key=lambda n: -self.calls[n].total):
+                cstats = self.calls[name]
+                p95 = cstats.percentile(0.95)
+                lines.append("    {:<28s} {:5d} x {:8.1f} ms mean {:8.1f} ms max p95 {:>6s} ms {:7d} rows {:9d} B{}".format(
+                    name,cstats.count,1000.0 * cstats.total / cstats.count,1000.0 * cstats.max,
+                    ">5000" if p95 is None else str(p95),cstats.rows,cstats.nbytes,
+                    " ({} errors)".format(cstats.errors) if cstats.errors else ""))
+            if self.slow:
+                lines.append("    {} slow calls (over {:.0f} ms)".format(len(self.slow),1000.0 * self.slow_threshold))
+        return '\n'.join(lines)
+
+    def write_summary(self,filename):
+        with open(filename,'w') as f:
+            json.dump(self.summary(),f,indent=1,default=str)
+
+
+#statistics of the running process
+stats = DbStats()
+
+
+def from_config(configParser,section='database'):
+    """
+    reads slow_query (seconds) from the [database] section
+    """
+    if configParser.has_section(section) and configParser.has_option(section,'slow_query'):
+        stats.slow_threshold = configParser.getfloat(section,'slow_query')
+
+
+def timed(name,func,*args,**kwargs):
+    """
+    calls func(*args,**kwargs) and records its duration under name
+    """
+    tstart = time.time()
+    error = True
+    try:
+        result = func(*args,**kwargs)
+        error = False
+        return result
+    finally:
+        stats.record(name,time.time() - tstart,error=error)
+
+
+class InstrumentedModule(object):
+    """
+    proxy of a database module (like obs_db) recording the duration of
+    every function call as "<prefix>.<function>"
+    """
+    def __init__(self,module,prefix):
+        self._module = module
+        self._prefix = prefix
+
+    def __getattr__(self,attr):
+        value = getattr(self._module,attr)
+        if not callable(value):
+            return value
+        name = "{}.{}".format(self._prefix,attr)
+        def call(*args,**kwargs):
+            return timed(name,value,*args,**kwargs)
+        return call
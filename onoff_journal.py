@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+local append-only journal of an onoff observation set
+
+the plan, every recording (antenna dictionary, frequency, repetition,
+on/off and obsid) and every on-off series marked as OK in the database
+are appended, one JSON object per line, and synced to disk. On a restart
+the coverage of the set is rebuilt from the journal without querying
+the database, the database is then reconciled in the background.
+
+a line cut by a crash is ignored on reading
+
+Created Oct 2026
+"""
+
+import os
+import json
+import threading
+
+from ATATools import logger_defaults
+
+import onoff_dbpool
+
+
+def journal_filename(directory,setid):
+    return os.path.join(directory,"onoff_set_{}.jsonl".format(setid))
+
+
+class Journal(object):
+    """
+    journal of a single observation set
+    """
+    def __init__(self,filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.plan = None
+        self.units = []
+        self.ok_coverage = {}
+        self.db_coverage = {}
+        self.reconcile_error = None
+        self.existed = os.path.exists(filename)
+        if self.existed:
+            self._load()
+        self.jfile = open(filename,'a')
+        #terminate a line cut by a crash, so it does not swallow the next record
+        if self.existed and os.path.getsize(filename) > 0:
+            with open(filename,'rb') as f:
+                f.seek(-1,os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.jfile.write('\n')
+
+    @classmethod
+    def for_set(cls,directory,setid):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        return cls(journal_filename(directory,setid))
+
+    def _load(self):
+        logger = logger_defaults.getModuleLogger(__name__)
+        nbad = 0
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    nbad += 1
+                    continue
+                self._apply(record)
+        if nbad:
+            logger.warning("skipped {} damaged lines of journal {}".format(nbad,self.filename))
+        logger.info("journal {}: {} recordings, {} antennas with OK measurements".format(
+            self.filename,len(self.units),len(self.ok_coverage)))
+
+    def _apply(self,record):
+        rtype = record.get('t')
+        if rtype == 'plan':
+            self.plan = record['steps']
+        elif rtype == 'unit':
+            self.units.append(record)
+        elif rtype == 'ok':
+            for ant in record['ants']:
+                self.ok_coverage.setdefault(ant,set()).add(record['freq'])
+
+    def _append(self,record):
+        line = json.dumps(record,separators=(',',':'))
+        with self.lock:
+            self._apply(record)
+            self.jfile.write(line + '\n')
+            self.jfile.flush()
+            os.fsync(self.jfile.fileno())
+
+    def record_plan(self,plan):
+        self._append({'t': 'plan', 'steps': [[step.ant_dict,step.freq_list] for step in plan]})
+
+    def record_unit(self,ant_dict,freq,rep,on_or_off,obsid):
+        self._append({'t': 'unit', 'ants': ant_dict, 'freq': freq, 'rep': rep,
+            'pos': on_or_off, 'obsid': obsid})
+
+    def record_ok(self,ant_dict,freq,obsids):
+        self._append({'t': 'ok', 'ants': sorted(ant_dict.values()), 'freq': freq, 'obsids': obsids})
+
+    def coverage(self):
+        """
+        antenna to the frequencies measured, from the journal and from
+        the database, if it was already reconciled. A reconciliation that
+        failed for another reason than the database connection raises
+        its error here
+        """
+        with self.lock:
+            if self.reconcile_error is not None:
+                raise self.reconcile_error
+            coverage = {}
+            for source in [self.ok_coverage,self.db_coverage]:
+                for ant,freqs in source.items():
+                    coverage.setdefault(ant,set()).update(freqs)
+        return coverage
+
+    def is_measured(self,ant_dict,freq):
+        coverage = self.coverage()
+        return all(freq in coverage.get(ant,()) for ant in ant_dict.values())
+
+    def merge_db(self,coverage):
+        """
+        adds the measurements found in the database, a get_coverage like
+        dictionary of antenna to frequencies
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        db_coverage = dict((ant,set(freqs)) for ant,freqs in (coverage or {}).items())
+
+        with self.lock:
+            self.db_coverage = db_coverage
+            only_db = sum(len(freqs - self.ok_coverage.get(ant,set())) for ant,freqs in db_coverage.items())
+            only_journal = sum(len(freqs - db_coverage.get(ant,set())) for ant,freqs in self.ok_coverage.items())
+        if only_db or only_journal:
+            logger.warning("journal {} reconciled: {} antenna frequencies only in the database, {} only in the journal".format(
+                self.filename,only_db,only_journal))
+        else:
+            logger.info("journal {} matches the database".format(self.filename))
+
+    def reconcile_async(self,fetch):
+        """
+        calls fetch() (returning a get_coverage like dictionary) in a
+        background thread and merges the result. Returns the thread.
+        When the database can not be reached the journal is used alone,
+        any other error (a bad query or driver call) is raised by the
+        next coverage call
+        """
+        def reconcile():
+            logger = logger_defaults.getModuleLogger(__name__)
+            try:
+                self.merge_db(fetch())
+            except Exception as e:
+                if onoff_dbpool.is_connection_error(e):
+                    logger.warning("journal reconciliation with the database failed: {}".format(e))
+                    return
+                logger.exception("journal reconciliation with the database failed")
+                with self.lock:
+                    self.reconcile_error = e
+
+        thread = threading.Thread(target=reconcile,name="journal-reconcile")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def close(self):
+        with self.lock:
+            self.jfile.close()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+non-blocking e-mail and Slack notifications
+
+messages are put on a bounded queue and sent by a background thread, so
+a slow SMTP server or Slack endpoint does not stall the observations.
+Sending is rate limited, and a message identical to one still waiting in
+the queue is not queued again, it is sent once with a repeat count.
+When the queue is full, new messages are dropped and counted.
+
+the sink does the actual sending: ATACommSink uses ATAComm, StubSink
+just keeps (and logs) the messages, for offline runs and tests
+
+Created Oct 2026
+"""
+
+import time
+import threading
+from six.moves import queue
+
+from ATATools import logger_defaults
+
+import onoff_trace
+
+default_queue_size = 100
+default_min_interval = 1.0
+default_shutdown_timeout = 30.0
+
+
+class ATACommSink(object):
+    """
+    sends the notifications with the ATAComm module (or a replacement)
+    """
+    def __init__(self,comm):
+        self.comm = comm
+
+    def send(self,kind,subject,message):
+        if kind == 'mail':
+            onoff_trace.traced("sendMail",self.comm.sendMail,subject,message)
+        else:
+            onoff_trace.traced("postSlackMsg",self.comm.postSlackMsg,message)
+
+
+class StubSink(object):
+    """
+    keeps the notifications in the sent list instead of sending them,
+    optionally taking delay seconds per message
+    """
+    def __init__(self,delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    def send(self,kind,subject,message):
+        logger = logger_defaults.getModuleLogger(__name__)
+        if self.delay:
+            time.sleep(self.delay)
+        logger.info("stub {}: {} {}".format(kind,subject,message))
+        self.sent.append((kind,subject,message))
+
+
+class NotificationDispatcher(object):
+
+    _stop = object()
+
+    def __init__(self,sink,maxsize=default_queue_size,min_interval=default_min_interval):
+        self.sink = sink
+        self.min_interval = min_interval
+        self.queue = queue.Queue(maxsize)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.dropped = 0
+        self.failed = 0
+        self.last_send = None
+        self.draining = False
+        self.thread = threading.Thread(target=self._run,name="notifications")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def mail(self,subject,message):
+        self._put(('mail',subject,message))
+
+    def slack(self,message):
+        self._put(('slack',None,message))
+
+    def _put(self,key):
+        logger = logger_defaults.getModuleLogger(__name__)
+        with self.lock:
+            if key in self.pending:
+                self.pending[key] += 1
+                return
+            try:
+                self.queue.put_nowait(key)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning("notification queue full, dropping {} {}".format(key[0],key[2]))
+                return
+            self.pending[key] = 1
+
+    def _run(self):
+        logger = logger_defaults.getModuleLogger(__name__)
+        while True:
+            key = self.queue.get()
+            if key is self._stop:
+                return
+
+            #the remaining messages are sent at once on shutdown
+            if self.last_send is not None and not self.draining:
+                wait = self.last_send + self.min_interval - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+
+            with self.lock:
+                count = self.pending.pop(key,1)
+            kind,subject,message = key
+            if count > 1:
+                message = "{}\n(repeated {} times)".format(message,count)
+
+            try:
+                self.sink.send(kind,subject,message)
+            except Exception:
+                self.failed += 1
+                logger.exception("sending {} notification failed".format(kind))
+            self.last_send = time.time()
+
+    def shutdown(self,timeout=default_shutdown_timeout):
+        """
+        sends what is still queued, without rate limiting, waiting at most
+        timeout seconds. Returns the number of notifications left unsent
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        self.draining = True
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self.queue.put(self._stop,timeout=max(deadline - time.time(),0.01))
+                break
+            except queue.Full:
+                if time.time() >= deadline:
+                    break
+        self.thread.join(max(deadline - time.time(),0.0))
+
+        with self.lock:
+            unsent = len(self.pending)
+        if self.thread.is_alive():
+            logger.warning("notifications not drained in {:.0f} s, {} left unsent".format(timeout,unsent))
+        if self.dropped or self.failed:
+            logger.warning("{} notifications dropped, {} failed".format(self.dropped,self.failed))
+        return unsent
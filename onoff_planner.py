@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+look-ahead planning of a whole onoff observation set
+
+the work set is every antenna of every SNAP group that still misses some
+of the requested frequencies. Each step of the plan takes at most one
+antenna per SNAP (the SNAP records one antenna at a time) and all the
+frequencies those antennas miss. Each step costs a pointing/autotune/rf
+switch cycle plus a retune and an on-off series per frequency, so the
+planner groups antennas with similar missing frequencies together.
+
+a frequency counts as measured for an antenna if it was measured on any
+of the sources, so source changes are driven only by source visibility.
+They are part of the cost estimate, not of the ordering
+
+Created Oct 2026
+"""
+
+from collections import namedtuple
+
+import onoff_coverage
+
+PlanStep = namedtuple('PlanStep', ['ant_dict', 'freq_list'])
+
+
+class RetuneCost(object):
+    """
+    time, in seconds, to retune from one sky frequency to another: a fixed
+    part plus the focus move, proportional to the frequency distance.
+    Used as a function of (from_freq, to_freq); from_freq None means the
+    current tuning is unknown
+    """
+    def __init__(self,fixed=40.0,per_mhz=0.005):
+        self.fixed = float(fixed)
+        self.per_mhz = float(per_mhz)
+
+    def __call__(self,from_freq,to_freq):
+        if from_freq is None:
+            return self.fixed
+        return self.fixed + self.per_mhz * abs(to_freq - from_freq)
+
+
+class MeasuredRetuneCost(RetuneCost):
+    """
+    retune cost fitted (least squares, fixed + per_mhz * distance) to the
+    measured set_freq durations. The given fixed and per_mhz values are
+    used until there are min_samples measurements at different distances
+    """
+    def __init__(self,fixed=40.0,per_mhz=0.005,min_samples=3):
+        RetuneCost.__init__(self,fixed,per_mhz)
+        self.min_samples = min_samples
+        self.samples = []
+
+    def add_sample(self,from_freq,to_freq,seconds):
+        if from_freq is None:
+            return
+        self.samples.append((abs(to_freq - from_freq),float(seconds)))
+        self._fit()
+
+    def _fit(self):
+        n = len(self.samples)
+        if n < self.min_samples:
+            return
+        mean_d = sum(d for d,t in self.samples) / n
+        mean_t = sum(t for d,t in self.samples) / n
+        var_d = sum((d - mean_d)**2 for d,t in self.samples)
+        if var_d == 0:
+            return
+        per_mhz = sum((d - mean_d)*(t - mean_t) for d,t in self.samples) / var_d
+        self.per_mhz = max(per_mhz,0.0)
+        self.fixed = max(mean_t - self.per_mhz * mean_d,0.0)
+
+    def summary(self):
+        return "retune {:.1f} s + {:.4f} s/MHz from {} samples".format(self.fixed,self.per_mhz,len(self.samples))
+
+
+class CostModel(object):
+    """
+    estimated durations, in seconds, of the parts of an onoff set
+
+    group_change: pointing, autotune and rf switch for new antennas
+    retune: setting the sky frequency and focus, fixed part
+    retune_per_mhz: focus move time per MHz of frequency change
+    source_change: ephemeris generation for a new source
+    observation: all on-off repetitions at a single frequency
+    retune_cost: optional function (from_freq, to_freq) replacing
+        retune and retune_per_mhz, e.g. a MeasuredRetuneCost
+
+    freq_tolerance is not a cost: a measured frequency within that many
+    MHz of a requested one counts as measured when planning
+    """
+    def __init__(self,group_change=240.0,retune=40.0,source_change=60.0,observation=300.0,
+            retune_per_mhz=0.005,retune_cost=None,freq_tolerance=onoff_coverage.default_freq_tolerance):
+        self.group_change = float(group_change)
+        self.retune = float(retune)
+        self.source_change = float(source_change)
+        self.observation = float(observation)
+        self.retune_per_mhz = float(retune_per_mhz)
+        self.retune_cost = retune_cost or RetuneCost(self.retune,self.retune_per_mhz)
+        self.freq_tolerance = float(freq_tolerance)
+
+    @classmethod
+    def from_config(cls,configParser,section='planner'):
+        """
+        reads the costs from the optional [planner] section of the config file
+        """
+        kwargs = {}
+        if configParser.has_section(section):
+            for key in ['group_change','retune','source_change','observation','retune_per_mhz','freq_tolerance']:
+                if configParser.has_option(section,key):
+                    kwargs[key] = configParser.getfloat(section,key)
+        return cls(**kwargs)
+
+    def step_cost(self,step,from_freq=None):
+        cost = self.group_change
+        for freq in step.freq_list:
+            cost += self.retune_cost(from_freq,freq) + self.observation
+            from_freq = freq
+        return cost
+
+    def estimate(self,plan,nsources=1):
+        """
+        estimated time of the plan execution in seconds
+        """
+        if not plan:
+            return 0.0
+        cost = nsources * self.source_change
+        from_freq = None
+        for step in plan:
+            cost += self.step_cost(step,from_freq)
+            if step.freq_list:
+                from_freq = step.freq_list[-1]
+        return cost
+
+
+def retune_time(freq_list,from_freq=None,retune_cost=None):
+    """
+    total retune time of observing freq_list in the given order
+    """
+    retune_cost = retune_cost or RetuneCost()
+    total = 0.0
+    for freq in freq_list:
+        total += retune_cost(from_freq,freq)
+        from_freq = freq
+    return total
+
+
+def order_frequencies(freq_list,from_freq=None,retune_cost=None):
+    """
+    orders the frequencies to minimize the retune time starting from
+    from_freq. Candidates are the upward and downward sweeps and a
+    nearest-next walk, the cheapest one according to retune_cost wins.
+    For a cost growing with the frequency distance, this is the sweep
+    starting at the end closer to from_freq
+    """
+    retune_cost = retune_cost or RetuneCost()
+    freqs = sorted(set(freq_list))
+    if len(freqs) < 2:
+        return freqs
+
+    candidates = [freqs, freqs[::-1]]
+    if from_freq is not None:
+        walk = []
+        left = list(freqs)
+        cfreq = from_freq
+        while left:
+            nfreq = min(left,key=lambda f: retune_cost(cfreq,f))
+            walk.append(nfreq)
+            left.remove(nfreq)
+            cfreq = nfreq
+        candidates.append(walk)
+
+    return min(candidates,key=lambda c: retune_time(c,from_freq,retune_cost))
+
+
+def sequence_plan(plan,from_freq=None,retune_cost=None):
+    """
+    orders the frequencies of each plan step, every step starting close
+    to where the previous one ended (a serpentine across the steps)
+    """
+    sequenced = []
+    for step in plan:
+        freqs = order_frequencies(step.freq_list,from_freq,retune_cost)
+        sequenced.append(PlanStep(step.ant_dict,freqs))
+        if freqs:
+            from_freq = freqs[-1]
+    return sequenced
+
+
+def missing_freqs(coverage,ant_snap_dictionary,freq_list,tolerance=None):
+    """
+    returns a dictionary of antenna to the list of frequencies (in freq_list
+    order) that are not yet in coverage. coverage maps an antenna to the
+    frequencies measured for it, matched within tolerance MHz. Antennas
+    with nothing left are omitted
+    """
+    return onoff_coverage.CoverageMatrix.from_coverage(coverage,ant_snap_dictionary,freq_list,tolerance).missing()
+
+
+def _build_plan(missing,queues,freq_list,widest_first,defer):
+
+    queues = dict((sk,list(q)) for sk,q in queues.items())
+    plan = []
+    while queues:
+        #the longest queue decides the number of steps, so it goes first
+        snap_order = sorted(queues.keys(), key=lambda sk: (-len(queues[sk]), sk))
+        longest = len(queues[snap_order[0]])
+
+        ant_dict = {}
+        freq_union = set()
+        for sk in snap_order:
+            if not freq_union:
+                if widest_first:
+                    best = max(queues[sk], key=lambda a: len(missing[a]))
+                else:
+                    best = queues[sk][0]
+            else:
+                best = min(queues[sk], key=lambda a: (len(set(missing[a]) - freq_union),
+                    -len(missing[a])))
+                #a SNAP with a shorter queue can wait for a better matching step
+                if defer and len(queues[sk]) < longest and not set(missing[best]) <= freq_union:
+                    continue
+            ant_dict[sk] = best
+            freq_union.update(missing[best])
+            queues[sk].remove(best)
+            if not queues[sk]:
+                queues.pop(sk)
+
+        plan.append(PlanStep(ant_dict,[f for f in freq_list if f in freq_union]))
+
+    return plan
+
+
+def plan_observations(coverage,ant_snap_dictionary,freq_list,cost_model=None):
+    """
+    builds the whole observation plan, as a list of PlanStep.
+
+    The number of steps (pointing/autotune cycles) is always the smallest
+    possible, the length of the longest SNAP queue. Within a step, the
+    SNAPs with the most work go first and the others add the antenna that
+    grows the step frequency list the least. The frequencies of each step
+    are ordered by sequence_plan. Several variants are built
+    (seeding with the widest antenna or in list order, letting SNAPs with
+    spare steps defer a bad match or not) and the one cost_model
+    estimates as the shortest is returned
+    """
+    cost_model = cost_model or CostModel()
+    missing = missing_freqs(coverage,ant_snap_dictionary,freq_list,cost_model.freq_tolerance)
+
+    queues = {}
+    for sk in ant_snap_dictionary:
+        pending = [cant for cant in ant_snap_dictionary[sk] if cant in missing]
+        if pending:
+            queues[sk] = pending
+
+    best_plan = None
+    for widest_first in [True, False]:
+        for defer in [False, True]:
+            plan = _build_plan(missing,queues,freq_list,widest_first,defer)
+            plan = sequence_plan(plan,None,cost_model.retune_cost)
+            if best_plan is None or cost_model.estimate(plan) < cost_model.estimate(best_plan):
+                best_plan = plan
+
+    return best_plan
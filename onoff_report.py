@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+progress report of onoff observation sets
+
+prints the completion of one or more sets per SNAP group, antenna,
+frequency and source, from a single aggregated database query
+(onoff_db.get_bulk_coverage), and estimates the observing time still
+needed by planning the rest of the set (onoff_planner). A frequency
+counts as done for an antenna if it was measured on any of the sources,
+as when planning; the per source lines show what each source measured.
+
+the durations of the estimate come from the [planner] section of the
+config file, or are measured in traced runs (see onoff_trace.py):
+    onoff_report.py -c onoff.cfg -s 12,13 -t trace.jsonl
+
+Created Oct 2026
+"""
+
+import sys
+import time
+import logging
+from optparse import OptionParser
+
+import numpy as np
+
+from ATATools import ata_control,logger_defaults,snap_array_helpers
+
+import onoff_db
+import onoff_sqlite
+import onoff_planner
+import onoff_coverage
+import onoff_trace
+from six.moves import configparser
+
+
+def _mean_duration(spans,name):
+    durations = [s['dur'] for s in spans if s['name'] == name and not s.get('error')]
+    if not durations:
+        return None
+    return sum(durations) / len(durations)
+
+
+def measured_cost_model(spans,cost_model=None):
+    """
+    a CostModel with the durations measured in the trace spans, the
+    ones of cost_model where a phase was not traced. A group change is
+    the pointing plus the autotune (the rf switches are set meanwhile),
+    the retune cost is fitted to the set_freq spans of each set, except
+    the ones that ran concurrently with other setup steps
+    """
+    cost_model = cost_model or onoff_planner.CostModel()
+    measured = onoff_planner.CostModel(cost_model.group_change,cost_model.retune,cost_model.source_change,
+            cost_model.observation,cost_model.retune_per_mhz,freq_tolerance=cost_model.freq_tolerance)
+
+    observation = _mean_duration(spans,'onoff_series')
+    if observation is not None:
+        measured.observation = observation
+    source_change = _mean_duration(spans,'create_ephems')
+    if source_change is not None:
+        measured.source_change = source_change
+    point = _mean_duration(spans,'point_ants')
+    autotune = _mean_duration(spans,'autotune')
+    if point is not None and autotune is not None:
+        measured.group_change = point + autotune
+
+    retune_cost = onoff_planner.MeasuredRetuneCost(cost_model.retune,cost_model.retune_per_mhz)
+    last_freq = {}
+    for s in sorted(spans,key=lambda s: s['start']):
+        if s['name'] != 'set_freq' or s.get('error') or 'freq' not in s:
+            continue
+        if not s.get('concurrent'):
+            retune_cost.add_sample(last_freq.get(s.get('set')),s['freq'],s['dur'])
+        last_freq[s.get('set')] = s['freq']
+    measured.retune_cost = retune_cost
+    measured.retune = retune_cost.fixed
+    measured.retune_per_mhz = retune_cost.per_mhz
+    return measured
+
+
+class SetProgress(object):
+    """
+    completion of one set: every count is a (done, total) pair of
+    antenna x frequency cells
+    """
+    def __init__(self,setid,bulk,ant_snap_dictionary,freq_list,sources,tolerance=None):
+        self.setid = setid
+        self.sources = list(sources)
+        self.ant_snap_dictionary = ant_snap_dictionary
+        self.coverage = onoff_db.merge_coverage(bulk,[setid])
+        self.matrix = onoff_coverage.CoverageMatrix.from_coverage(self.coverage,ant_snap_dictionary,
+                freq_list,tolerance)
+        #without the repeated frequencies
+        self.freq_list = self.matrix.freq_list
+
+        nfreqs = len(self.freq_list)
+        self.done = int(self.matrix.matrix.sum())
+        self.total = self.matrix.matrix.size
+        ant_done = self.matrix.matrix.sum(axis=1)
+        self.ants = [(ant,int(ant_done[row]),nfreqs) for row,ant in enumerate(self.matrix.ants)]
+        freq_done = self.matrix.matrix.sum(axis=0)
+        self.freqs = [(freq,int(freq_done[col]),len(self.matrix.ants)) for col,freq in enumerate(self.freq_list)]
+        snap_done = np.bincount(self.matrix.snap_rows,weights=ant_done,minlength=len(self.matrix.snaps))
+        snap_size = np.bincount(self.matrix.snap_rows,minlength=len(self.matrix.snaps))
+        self.snaps = [(sk,int(snap_done[n]),int(snap_size[n]) * nfreqs) for n,sk in enumerate(self.matrix.snaps)]
+
+        #the sources in the database, the requested ones first
+        found = sorted(set(source for (sid,source) in bulk if sid == setid) - set(self.sources),key=str)
+        self.source_counts = []
+        for source in self.sources + found:
+            smatrix = onoff_coverage.CoverageMatrix.from_coverage(onoff_db.merge_coverage(bulk,[setid],[source]),
+                    ant_snap_dictionary,freq_list,tolerance)
+            self.source_counts.append((source,int(smatrix.matrix.sum()),smatrix.matrix.size))
+
+    def remaining_plan(self,cost_model):
+        return onoff_planner.plan_observations(self.coverage,self.ant_snap_dictionary,self.freq_list,cost_model)
+
+
+def _percent(done,total):
+    return 100.0 * done / total if total else 100.0
+
+
+def _line(label,done,total):
+    return "    {:<12s} {:5d}/{:<5d} {:6.1f}%".format(str(label),done,total,_percent(done,total))
+
+
+def format_progress(progress,plan=None,cost_model=None,verbose=True):
+    lines = ["set {}: {}/{} antenna-frequency pairs done ({:.1f}%)".format(progress.setid,progress.done,
+        progress.total,_percent(progress.done,progress.total))]
+    lines.append("  per SNAP:")
+    lines.extend(_line(sk,done,total) for sk,done,total in progress.snaps)
+    if verbose:
+        lines.append("  per antenna:")
+        lines.extend(_line(ant,done,total) for ant,done,total in progress.ants)
+        lines.append("  per frequency:")
+        lines.extend(_line(freq,done,total) for freq,done,total in progress.freqs)
+    lines.append("  per source:")
+    lines.extend(_line(source,done,total) for source,done,total in progress.source_counts)
+    if plan is not None:
+        seconds = cost_model.estimate(plan,len(progress.sources))
+        lines.append("  remaining: {} antenna group changes, {} on-off series, about {:.1f} h".format(len(plan),
+            sum(len(step.freq_list) for step in plan),seconds / 3600.0))
+    return '\n'.join(lines)
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog options',
+            description='Show the progress of on-off observation sets')
+    parser.add_option('-s', '--sets', dest='sets', type=str, action="store", default=None,
+                        help ='Comma separated observation set IDs')
+    parser.add_option('-a', dest='ants', type=str, action="store", default=None,
+                        help ='Comma separated array list of ATA antennas, eg: \"2j,2d,4k\"')
+    parser.add_option('-p', dest='pointings', type=str, action="store", default=None,
+                        help ='Comma separated list of on off sources, eg: \"casa,vira,moon\"')
+    parser.add_option('-f', dest='freqs', type=str, action="store", default=None,
+                        help ='Comma separated list of sky tuning frequencies, in MHz')
+    parser.add_option('-c', '--config', dest='configfile', type=str, action="store", default=None,
+                        help ="config file with measurement parameters")
+    parser.add_option('-t', '--trace', dest='traces', type=str, action="store", default=None,
+                        help ="Comma separated trace files of earlier runs, the estimate uses their measured durations")
+    parser.add_option('--brief', dest='brief', action="store_true", default=False,
+                        help ="Only the per SNAP and per source completion")
+    parser.add_option('-v', '--verbose', dest='verbose', action="store_true", default=False,
+                        help ="More on-screen information")
+
+    (options,args) = parser.parse_args()
+
+    logger = logger_defaults.getProgramLogger("ONOFF_REPORT",logging.INFO if options.verbose else logging.WARNING)
+
+    if not options.sets:
+        parser.print_help()
+        sys.exit(1)
+
+    ant_str = freq_str = pointings_str = None
+    cost_model = onoff_planner.CostModel()
+    if options.configfile:
+        configParser = configparser.RawConfigParser()
+        configParser.read(options.configfile)
+        ant_str = configParser.get('measurement', 'antennas')
+        freq_str = configParser.get('measurement', 'freq')
+        pointings_str = configParser.get('measurement', 'sources')
+        cost_model = onoff_planner.CostModel.from_config(configParser)
+        database_file = onoff_sqlite.from_config(configParser)
+        if database_file:
+            onoff_db.use_connection(lambda: onoff_sqlite.SQLiteConnection(database_file))
+
+    ant_str = options.ants or ant_str
+    freq_str = options.freqs or freq_str
+    pointings_str = options.pointings or pointings_str
+    if not (ant_str and freq_str and pointings_str):
+        logger.error("antennas, frequencies and sources are needed, from -a, -f, -p or the config file")
+        sys.exit(1)
+
+    setids = [int(setid) for setid in snap_array_helpers.string_to_array(options.sets)]
+    ant_list = snap_array_helpers.string_to_array(ant_str)
+    freq_list = snap_array_helpers.string_to_numeric_array(freq_str)
+    pointings = snap_array_helpers.string_to_array(pointings_str)
+
+    if options.traces:
+        cost_model = measured_cost_model(onoff_trace.read_spans(options.traces.split(',')),cost_model)
+        logger.info(cost_model.retune_cost.summary())
+
+    tstart = time.time()
+    ant_groups = ata_control.get_snap_dictionary(ant_list)
+    bulk = onoff_db.get_bulk_coverage(setids,None,onoff_db.query_antennas(ant_groups))
+
+    for setid in setids:
+        progress = SetProgress(setid,bulk,ant_groups,freq_list,pointings,cost_model.freq_tolerance)
+        plan = progress.remaining_plan(cost_model)
+        print(format_progress(progress,plan,cost_model,not options.brief))
+    logger.info("report took {:.3f} s".format(time.time() - tstart))
+    onoff_db.close_pool()
+
+if __name__== "__main__":
+    main()
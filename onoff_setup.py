@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+dependency driven execution of the setup steps done before on-off
+observations (ephemeris, pointing, autotune, rf switch, frequency)
+
+each step names the steps it depends on. By default the steps run one
+after another in dependency order, as they always did. In concurrent mode
+(opt-in, it changes the order of the commands sent to the array) a step is
+started in a worker thread as soon as all of its dependencies finished,
+so e.g. the RF switch and the frequency/focus setup run while the dishes
+slew. Dependencies on steps that are not on the list are considered
+to be already satisfied
+
+Created Oct 2026
+"""
+
+import asyncio
+import time
+
+from ATATools import logger_defaults
+
+import onoff_trace
+
+
+class SetupStep(object):
+    """
+    single blocking setup call and the names of the steps it waits for
+    """
+    def __init__(self,name,func,args=(),deps=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = list(deps)
+        #set by run_steps if other steps may run at the same time
+        self.concurrent = False
+
+    def __call__(self):
+        logger = logger_defaults.getModuleLogger(__name__)
+        tstart = time.time()
+        #the durations of concurrent steps are flagged, they include contention
+        with onoff_trace.span(self.name,**({'concurrent': True} if self.concurrent else {})):
+            result = self.func(*self.args)
+        logger.info("setup step {} done in {:.2f} s".format(self.name,time.time() - tstart))
+        return result
+
+
+def order_steps(steps):
+    """
+    returns the steps in dependency order, keeping the original order
+    where there is a choice. Raises RuntimeError on a dependency cycle
+    """
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise RuntimeError("duplicate setup step names: {}".format(','.join(names)))
+
+    ordered = []
+    done = set()
+    remaining = list(steps)
+    while remaining:
+        for step in remaining:
+            if all(d in done or d not in names for d in step.deps):
+                ordered.append(step)
+                done.add(step.name)
+                remaining.remove(step)
+                break
+        else:
+            raise RuntimeError("dependency cycle between setup steps {}".format(
+                ','.join(step.name for step in remaining)))
+    return ordered
+
+
+async def _run_concurrent(steps,executor):
+
+    loop = asyncio.get_running_loop()
+    tasks = {}
+
+    async def run_step(step):
+        for dep in step.deps:
+            if dep in tasks:
+                await tasks[dep]
+        return await loop.run_in_executor(executor,step)
+
+    #steps are ordered, so the tasks of all dependencies already exist
+    for step in steps:
+        tasks[step.name] = asyncio.ensure_future(run_step(step))
+
+    results = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks.keys(),results))
+
+
+def run_steps(steps,concurrent=False,executor=None):
+    """
+    runs the setup steps and returns a dictionary of step name to the
+    returned value. The steps are run one by one in dependency order,
+    unless concurrent is True, then in the threads of executor (default:
+    the one of the asyncio loop). The first exception raised by a step is
+    re-raised after the steps that were already running have finished
+    """
+    logger = logger_defaults.getModuleLogger(__name__)
+
+    ordered = order_steps(steps)
+    tstart = time.time()
+    for step in ordered:
+        step.concurrent = concurrent and len(ordered) > 1
+    if concurrent:
+        results = asyncio.run(_run_concurrent(ordered,executor))
+    else:
+        results = {}
+        for step in ordered:
+            results[step.name] = step()
+
+    logger.info("setup ({}) of {} took {:.2f} s".format("concurrent" if concurrent else "sequential",
+        ','.join(step.name for step in ordered),time.time() - tstart))
+    return results
@@ -0,0 +1,853 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+simulated array backend for snap_onoff_obs
+
+slews, autotune, rf switching, retuning, RMS setting, captures and
+database calls take times drawn from configurable distributions. The
+simulated time is virtual: a blocking call waits until the clock has
+advanced by its duration, and the clock jumps to the end of the earliest
+waiting call once every thread of the run is waiting (see SimClock). Concurrent and
+pipelined calls therefore overlap as on the array, and neither the
+Python overhead nor the machine running the simulation changes the
+result. At the end, the number of on-off series and recordings per
+simulated hour is reported.
+
+the durations are read from the [simulation] section of the config file,
+each one as "const,<s>", "uniform,<min>,<max>" or "gauss,<mean>,<sigma>"
+
+if the [database] section selects the sqlite backend (see onoff_sqlite),
+the recordings go to that file and the real onoff_db queries run on it,
+each call taking the simulated db duration
+
+the array, SNAP, obs database and notification packages are replaced by
+the simulated ones in sys.modules (see install_backend), and the ATA
+helper packages by the stand-ins of onoff_sim_helpers when they are not
+installed, so the ATA software is not needed and never contacted
+
+Created Oct 2026
+"""
+
+import sys
+import time
+import heapq
+import types
+import random
+import asyncio
+import logging
+import selectors
+import threading
+import collections
+import concurrent.futures
+from optparse import OptionParser
+
+from six.moves import configparser
+
+import onoff_sim_helpers
+#before the onoff modules import them
+onoff_sim_helpers.install()
+
+import onoff_db
+import onoff_backend
+import onoff_planner
+import onoff_trace
+import onoff_sqlite
+import onoff_dbstats
+
+default_nsnaps = 3
+default_rms = 12.0
+
+default_timings = {
+        'slew': 'gauss,25,5',
+        'ephemeris': 'const,10',
+        'autotune': 'gauss,30,5',
+        'rf_switch': 'const,2',
+        'retune': 'gauss,8,1',
+        'focus_per_mhz': 'const,0.005',
+        'setrms': 'gauss,15,3',
+        'capture': 'const,1.1',
+        'db': 'uniform,0.02,0.2',
+        'notification': 'const,0.5',
+        'park': 'const,60',
+        }
+
+
+class Distribution(object):
+    """
+    random duration, in seconds, given as "kind,param[,param]"
+    """
+    def __init__(self,spec):
+        parts = [p.strip() for p in spec.split(',')]
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        nparams = {'const': 1, 'uniform': 2, 'gauss': 2}
+        if self.kind not in nparams or len(self.params) != nparams[self.kind]:
+            raise RuntimeError("bad distribution specification '{}'".format(spec))
+
+    def sample(self,rng):
+        if self.kind == 'const':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(self.params[0],self.params[1])
+        return max(rng.gauss(self.params[0],self.params[1]),0.0)
+
+
+class SimClock(object):
+    """
+    virtual simulated time shared by the threads taking part in the
+    simulation: the main thread, and the threads started by thread() or by
+    a SimExecutor. One of them runs at a time, the others are runnable,
+    waiting for the clock (wait) or blocked on a key until another one
+    wakes it (block, wake). The time only advances when no thread is
+    running or runnable, and then jumps to the end of the earliest wait.
+    Waits of concurrent threads overlap, a thread joining others continues
+    at the end of the longest one, and the order in which the threads run
+    does not depend on the machine: a run is repeatable.
+
+    other threads (the notifications, the journal reconciliation) do not
+    take part, their waits take no simulated time
+    """
+    def __init__(self,start=None):
+        self.start = time.time() if start is None else start
+        self.current = self.start
+        self.cond = threading.Condition(threading.RLock())
+        #thread ident to SimThreadState of the threads taking part
+        self.threads = {}
+        self.running = None
+        self.runnable = collections.deque()
+        #(end, sequence, state) of the waiting threads
+        self.waiting = []
+        self.blocked = {}
+        self.seq = 0
+
+    def now(self):
+        return self.current
+
+    def elapsed(self):
+        return self.current - self.start
+
+    def participant(self):
+        """
+        state of the calling thread, None if it does not take part. The
+        main thread takes part from its first call on
+        """
+        with self.cond:
+            state = self.threads.get(threading.get_ident())
+            if state is None and threading.current_thread() is threading.main_thread():
+                state = self.register("main")
+                self.attach(state)
+            return state
+
+    def register(self,name):
+        """
+        adds a runnable thread, to be started by the caller and to call
+        attach(state) first
+        """
+        with self.cond:
+            state = SimThreadState(name)
+            self.runnable.append(state)
+            self._schedule()
+            return state
+
+    def attach(self,state):
+        """
+        binds state to the calling thread and waits for its turn
+        """
+        with self.cond:
+            self.threads[threading.get_ident()] = state
+            while state.state != 'running':
+                self.cond.wait()
+
+    def unregister(self):
+        """
+        removes the calling thread, which must not use the clock anymore
+        """
+        with self.cond:
+            state = self.threads.pop(threading.get_ident())
+            state.state = 'done'
+            if self.running is state:
+                self.running = None
+            self.wake(state)
+            self._schedule()
+
+    def wait(self,seconds):
+        if seconds <= 0:
+            return
+        with self.cond:
+            state = self.participant()
+            if state is None:
+                return
+            self.seq += 1
+            heapq.heappush(self.waiting,(self.current + seconds,self.seq,state))
+            state.state = 'waiting'
+            self._pause(state)
+
+    def block(self,key):
+        """
+        blocks the calling thread until wake(key). The caller holds cond
+        and checks its condition again afterwards
+        """
+        state = self.participant()
+        self.blocked.setdefault(key,[]).append(state)
+        state.state = 'blocked'
+        self._pause(state)
+
+    def wake(self,key):
+        """
+        makes the threads blocked on key runnable
+        """
+        with self.cond:
+            for state in self.blocked.pop(key,[]):
+                state.state = 'runnable'
+                self.runnable.append(state)
+            self._schedule()
+
+    def thread(self,target,*args,**kwargs):
+        """
+        starts a thread taking part in the simulation, running target(*args)
+        """
+        self.participant()
+        state = self.register(kwargs.get('name',"sim-thread"))
+        def run():
+            self.attach(state)
+            try:
+                target(*args)
+            finally:
+                self.unregister()
+        thread = threading.Thread(target=run,name=state.name)
+        thread.sim_state = state
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def join(self,thread):
+        """
+        waits, in simulated time, for a thread started by thread()
+        """
+        with self.cond:
+            if self.participant() is not None:
+                while thread.sim_state.state != 'done':
+                    self.block(thread.sim_state)
+        thread.join()
+
+    def _pause(self,state):
+        if self.running is state:
+            self.running = None
+        self._schedule()
+        while state.state != 'running':
+            self.cond.wait()
+
+    def _schedule(self):
+        if self.running is not None:
+            return
+        if self.runnable:
+            state = self.runnable.popleft()
+        elif self.waiting:
+            end,seq,state = heapq.heappop(self.waiting)
+            self.current = max(self.current,end)
+        else:
+            return
+        state.state = 'running'
+        self.running = state
+        self.cond.notify_all()
+
+
+class SimThreadState(object):
+    """
+    running, runnable, waiting, blocked or done
+    """
+    def __init__(self,name):
+        self.name = name
+        self.state = 'runnable'
+        #executor jobs submitted by the thread and not finished yet
+        self.pending = 0
+
+
+class SimFuture(concurrent.futures.Future):
+    """
+    future of a SimExecutor job, waited for in simulated time
+    """
+    def __init__(self,clock):
+        concurrent.futures.Future.__init__(self)
+        self.clock = clock
+
+    def _wait_done(self):
+        with self.clock.cond:
+            if self.clock.participant() is not None:
+                while not self.done():
+                    self.clock.block(self)
+
+    def result(self,timeout=None):
+        self._wait_done()
+        return concurrent.futures.Future.result(self,timeout)
+
+    def exception(self,timeout=None):
+        self._wait_done()
+        return concurrent.futures.Future.exception(self,timeout)
+
+
+class SimExecutor(concurrent.futures.Executor):
+    """
+    executor whose worker threads take part in the simulation, replacing
+    the ThreadPoolExecutor of the pipelined writes and of the concurrent
+    setup (see onoff_backend.Backend.executor)
+    """
+    def __init__(self,clock,max_workers):
+        self.clock = clock
+        self.max_workers = max_workers
+        self.jobs = collections.deque()
+        self.workers = []
+        self.idle = []
+        self.stopped = False
+
+    def submit(self,fn,*args,**kwargs):
+        with self.clock.cond:
+            if self.stopped:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            submitter = self.clock.participant()
+            if submitter is not None:
+                submitter.pending += 1
+            future = SimFuture(self.clock)
+            self.jobs.append((future,submitter,fn,args,kwargs))
+            if self.idle:
+                self.clock.wake(('idle',self.idle.pop(0)))
+            elif len(self.workers) < self.max_workers:
+                self.workers.append(self.clock.thread(self._work,
+                    name="sim-executor-{}".format(len(self.workers))))
+            return future
+
+    def _work(self):
+        state = self.clock.participant()
+        while True:
+            with self.clock.cond:
+                while not self.jobs and not self.stopped:
+                    self.idle.append(state)
+                    self.clock.block(('idle',state))
+                if not self.jobs:
+                    return
+                future,submitter,fn,args,kwargs = self.jobs.popleft()
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args,**kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            with self.clock.cond:
+                self.clock.wake(future)
+                if submitter is not None:
+                    submitter.pending -= 1
+                    self.clock.wake(('select',submitter))
+
+    def shutdown(self,wait=True,cancel_futures=False):
+        with self.clock.cond:
+            self.stopped = True
+            if cancel_futures:
+                while self.jobs:
+                    self.jobs.popleft()[0].cancel()
+            while self.idle:
+                self.clock.wake(('idle',self.idle.pop()))
+        if wait:
+            for worker in self.workers:
+                self.clock.join(worker)
+
+
+class SimSelector(selectors.BaseSelector):
+    """
+    selector of the asyncio loops of the simulation (see SimLoopPolicy).
+    While a SimExecutor job submitted from the loop is not finished, an
+    empty select blocks the loop thread on the clock instead of on the
+    selector, so the workers can run
+    """
+    def __init__(self,clock):
+        self.clock = clock
+        self.selector = selectors.DefaultSelector()
+
+    def register(self,fileobj,events,data=None):
+        return self.selector.register(fileobj,events,data)
+
+    def unregister(self,fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self,fileobj,events,data=None):
+        return self.selector.modify(fileobj,events,data)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+    def select(self,timeout=None):
+        with self.clock.cond:
+            state = self.clock.participant()
+            while state is not None and state.pending and (timeout is None or timeout > 0):
+                events = self.selector.select(0)
+                if events:
+                    return events
+                self.clock.block(('select',state))
+        return self.selector.select(timeout)
+
+
+class SimLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    """
+    event loops on a SimSelector, see install_backend
+    """
+    def __init__(self,clock):
+        asyncio.DefaultEventLoopPolicy.__init__(self)
+        self.clock = clock
+
+    def new_event_loop(self):
+        return asyncio.SelectorEventLoop(SimSelector(self.clock))
+
+
+class SimArray(object):
+    """
+    shared state of the simulation: clock, random durations and the
+    in-memory obs database
+    """
+    def __init__(self,timings=None,nsnaps=default_nsnaps,seed=None,database=None):
+        self.clock = SimClock()
+        self.rng = random.Random(seed)
+        self.nsnaps = nsnaps
+        specs = dict(default_timings)
+        specs.update(timings or {})
+        self.timings = dict((k,Distribution(v)) for k,v in specs.items())
+
+        self.lock = threading.Lock()
+        self.next_setid = 1
+        self.next_obsid = 1
+        self.sets = {}
+        self.recordings = {}
+        self.ok_series = 0
+        #onoff_sqlite.SQLiteObsDb replacing the in-memory database, if any
+        self.database = database
+
+    def wait(self,name,scale=1.0):
+        #no duration is drawn for the threads not taking part, so the
+        #random sequence stays the same from run to run
+        if self.clock.participant() is None:
+            return 0.0
+        with self.lock:
+            seconds = self.timings[name].sample(self.rng) * scale
+        self.clock.wait(seconds)
+        return seconds
+
+    def db_call(self):
+        self.wait('db')
+
+
+class SimAtaControl(object):
+
+    def __init__(self,sim):
+        self.sim = sim
+        self.sky_freq = None
+
+    def get_snap_dictionary(self,ant_list):
+        ant_groups = {}
+        for i,ant in enumerate(sorted(ant_list)):
+            ant_groups.setdefault("snap{}".format(i % self.sim.nsnaps),[]).append(ant)
+        return ant_groups
+
+    def reserve_antennas(self,ant_list):
+        pass
+
+    def release_antennas(self,ant_list,should_park):
+        if should_park:
+            self.sim.wait('park')
+
+    def try_on_lnas(self,ant_list):
+        pass
+
+    def set_atten_thread(self,antpols_list_list,atten_list_list):
+        self.sim.wait('rf_switch')
+
+    def create_ephems(self,source,az_offset,el_offset):
+        self.sim.wait('ephemeris')
+
+    def point_ants(self,on_or_off,ants):
+        self.sim.wait('slew')
+
+    def autotune(self,ants):
+        self.sim.wait('autotune')
+
+    def rf_switch_thread(self,ant_list):
+        self.sim.wait('rf_switch')
+
+    def set_freq(self,freq,ants):
+        self.sim.wait('retune')
+        if self.sky_freq is not None:
+            self.sim.wait('focus_per_mhz',abs(freq - self.sky_freq))
+        self.sky_freq = freq
+
+
+class SimSnapObservations(object):
+
+    def __init__(self,sim):
+        self.sim = sim
+
+    def setRMS(self,ant_dict,fpga_file,rms):
+        self.sim.wait('setrms')
+        return dict((ant,[12.0,12.0]) for ant in ant_dict.values())
+
+    def record_same(self,ant_dict,freq,source,ncaptures,obstype,obsuser,desc,filefragment,
+            backend,az_offset,el_offset,fpga_file,obs_set_id):
+        self.sim.wait('capture',ncaptures)
+        if self.sim.database:
+            self.sim.db_call()
+            return self.sim.database.add_recording(obs_set_id,freq,source,obstype,obsuser,desc,ant_dict,
+                    az_offset,el_offset)
+        self.sim.db_call()
+        with self.sim.lock:
+            obsid = self.sim.next_obsid
+            self.sim.next_obsid += 1
+            self.sim.recordings[obsid] = {'setid': obs_set_id, 'freq': freq, 'source': source,
+                    'desc': desc, 'status': 'PENDING', 'ants': list(ant_dict.values()),
+                    'az': az_offset, 'el': el_offset, 'atten': None}
+        return obsid
+
+
+class SimObsDb(object):
+
+    def __init__(self,sim):
+        self.sim = sim
+
+    def getNewObsSetID(self,description):
+        self.sim.db_call()
+        with self.sim.lock:
+            setid = self.sim.next_setid
+            self.sim.next_setid += 1
+            self.sim.sets[setid] = description
+        return setid
+
+    def getSetData(self,setid):
+        self.sim.db_call()
+        if setid not in self.sim.sets:
+            raise RuntimeError("no set {}".format(setid))
+        return self.sim.sets[setid]
+
+    def updateAttenVals(self,obsid,attendict):
+        self.sim.db_call()
+        with self.sim.lock:
+            self.sim.recordings[obsid]['atten'] = attendict
+
+    def markRecordingsOK(self,obsids):
+        self.sim.db_call()
+        with self.sim.lock:
+            for obsid in obsids:
+                self.sim.recordings[obsid]['status'] = 'OK'
+            self.sim.ok_series += 1
+
+
+class SimOnoffDb(object):
+    """
+    onoff_db on top of the simulated recordings
+    """
+    def __init__(self,sim):
+        self.sim = sim
+
+    def get_all_meas_dict(self,setid,antenna_list):
+        self.sim.db_call()
+        returndict = {}
+        with self.sim.lock:
+            for obsid,rec in self.sim.recordings.items():
+                if rec['setid'] != setid or rec['status'] != 'OK':
+                    continue
+                for ant in rec['ants']:
+                    if antenna_list is not None and ant not in antenna_list:
+                        continue
+                    cdict = returndict.setdefault(ant,{'freq':[],'desc':[],'obsid':[],'az':[],'el':[]})
+                    cdict['freq'].append(rec['freq'])
+                    cdict['desc'].append(rec['desc'])
+                    cdict['obsid'].append(obsid)
+                    cdict['az'].append(rec['az'])
+                    cdict['el'].append(rec['el'])
+        return returndict or None
+
+    def get_coverage(self,setid,antenna_list):
+        self.sim.db_call()
+        coverage = {}
+        with self.sim.lock:
+            for rec in self.sim.recordings.values():
+                if rec['setid'] != setid or rec['status'] != 'OK':
+                    continue
+                for ant in rec['ants']:
+                    if antenna_list is None or ant in antenna_list:
+                        coverage.setdefault(ant,set()).add(rec['freq'])
+        return coverage
+
+    def get_meas_arrays(self,setid,antenna_list):
+        self.sim.db_call()
+        rows = []
+        with self.sim.lock:
+            for obsid,rec in self.sim.recordings.items():
+                if rec['setid'] != setid or rec['status'] != 'OK':
+                    continue
+                for ant in rec['ants']:
+                    if antenna_list is None or ant in antenna_list:
+                        rows.append((ant,rec['freq'],obsid))
+        arrays = onoff_db.MeasArrays()
+        arrays.append_rows(rows)
+        return arrays.trim()
+
+    def get_source_coverage(self,setid,antenna_list):
+        self.sim.db_call()
+        rows = set()
+        with self.sim.lock:
+            for rec in self.sim.recordings.values():
+                if rec['setid'] != setid or rec['status'] != 'OK':
+                    continue
+                for ant in rec['ants']:
+                    if antenna_list is None or ant in antenna_list:
+                        rows.add((ant,rec['freq'],rec['source']))
+        return list(rows)
+
+    CoverageIndex = onoff_db.CoverageIndex
+    query_antennas = staticmethod(onoff_db.query_antennas)
+
+    def get_obs_params(self,setid,sources,ant_snap_dictionary,freq_list):
+        coverage = self.get_coverage(setid,onoff_db.query_antennas(ant_snap_dictionary))
+        return onoff_db.obs_params_from_coverage(coverage,ant_snap_dictionary,freq_list)
+
+    def get_bulk_coverage(self,setids,sources=None,antenna_list=None):
+        self.sim.db_call()
+        bulk = {}
+        with self.sim.lock:
+            for rec in self.sim.recordings.values():
+                if rec['setid'] not in setids or rec['status'] != 'OK':
+                    continue
+                if sources is not None and rec['source'] not in sources:
+                    continue
+                for ant in rec['ants']:
+                    if antenna_list is None or ant in antenna_list:
+                        bulk.setdefault((rec['setid'],rec['source']),{}).setdefault(ant,set()).add(rec['freq'])
+        return bulk
+
+    merge_coverage = staticmethod(onoff_db.merge_coverage)
+    source_rows = staticmethod(onoff_db.source_rows)
+
+    def get_obs_plan(self,setid,sources,ant_snap_dictionary,freq_list,cost_model=None,prior_sets=None):
+        if prior_sets:
+            bulk = self.get_bulk_coverage([setid] + list(prior_sets),None,onoff_db.query_antennas(ant_snap_dictionary))
+            coverage = onoff_db.merge_coverage(bulk)
+        else:
+            coverage = self.get_coverage(setid,onoff_db.query_antennas(ant_snap_dictionary))
+        return onoff_db.plan_from_coverage(setid,coverage,sources,ant_snap_dictionary,freq_list,cost_model)
+
+    def write_onoff_series(self,atten_list,obsids):
+        self.sim.db_call()
+        with self.sim.lock:
+            for obsid,attendict in atten_list:
+                self.sim.recordings[obsid]['atten'] = attendict
+            for obsid in obsids:
+                self.sim.recordings[obsid]['status'] = 'OK'
+            self.sim.ok_series += 1
+
+    def remove_antennas_from_dict(self,ant_groups,curr_ant_dict):
+        onoff_db.remove_antennas_from_dict(ant_groups,curr_ant_dict)
+
+
+#onoff_db functions querying the database
+db_functions = ['get_all_meas_dict','get_coverage','get_source_coverage','get_bulk_coverage','get_meas_arrays',
+        'get_obs_params','get_obs_plan','write_onoff_series']
+
+
+class SimDbCalls(object):
+    """
+    proxy of a database module (the sqlite backed obs_db or onoff_db)
+    adding the simulated db duration to each call of the functions names,
+    or of all the functions if names is None
+    """
+    def __init__(self,module,sim,names=None):
+        self._module = module
+        self._sim = sim
+        self._names = names
+
+    def __getattr__(self,attr):
+        value = getattr(self._module,attr)
+        if not callable(value) or (self._names is not None and attr not in self._names):
+            return value
+        def call(*args,**kwargs):
+            self._sim.db_call()
+            return value(*args,**kwargs)
+        return call
+
+
+class SimATAComm(object):
+
+    def __init__(self,sim):
+        self.sim = sim
+
+    def setRecipient(self,recipient):
+        pass
+
+    def sendMail(self,subject,message):
+        self.sim.wait('notification')
+
+    def postSlackMsg(self,message):
+        self.sim.wait('notification')
+
+
+class SimPositions(object):
+    """
+    all the sources are always up, the current one is kept
+    """
+    def __init__(self,sim):
+        self.ATAPositions = self
+
+    def getPreferedSourceUp(self,current_source,pointings):
+        if current_source in pointings:
+            return current_source,False
+        return pointings[0],True
+
+
+class SimBackend(onoff_backend.Backend):
+    """
+    onoff_backend.Backend with all the parts simulated on a SimArray
+    """
+    def __init__(self,sim):
+        if sim.database:
+            obs_db,sim_onoff_db = SimDbCalls(sim.database,sim),SimDbCalls(onoff_db,sim,db_functions)
+        else:
+            obs_db,sim_onoff_db = SimObsDb(sim),SimOnoffDb(sim)
+        onoff_backend.Backend.__init__(self,SimAtaControl(sim),SimSnapObservations(sim),
+                obs_db,sim_onoff_db,SimATAComm(sim),SimPositions(sim))
+        self.sim = sim
+
+    def executor(self,max_workers):
+        return SimExecutor(self.sim.clock,max_workers)
+
+    def now(self):
+        return self.sim.clock.now()
+
+    def report(self,setid):
+        hours = self.sim.clock.elapsed() / 3600.0
+        if self.sim.database:
+            #each series has a single first ON recording
+            nrec = self.sim.database.count_recordings(setid)
+            self.sim.ok_series = self.sim.database.count_recordings(setid,desc="ON repetition 0")
+        else:
+            nrec = len([r for r in self.sim.recordings.values() if r['status'] == 'OK'])
+        return ("simulated {:.2f} h: {} on-off series ({:.2f}/h), {} recordings ({:.2f}/h)").format(
+                hours,self.sim.ok_series,self.sim.ok_series / hours,nrec,nrec / hours)
+
+
+def install_backend(backend):
+    """
+    registers the simulated parts of backend in sys.modules under the names
+    of the ATA packages snap_onoff_obs imports (SNAPobs, ATAobs, ATAComm,
+    ATATools.ata_control and ATATools.ata_positions), runs the asyncio
+    loops on the simulation clock (SimLoopPolicy), imports snap_onoff_obs
+    and makes it use backend. Returns snap_onoff_obs
+    """
+    snap_defaults = types.ModuleType("SNAPobs.snap_defaults")
+    snap_defaults.spectra_snap_file = None
+    snap_defaults.rms = default_rms
+    SNAPobs = types.ModuleType("SNAPobs")
+    SNAPobs.snap_defaults = snap_defaults
+    SNAPobs.snap_observations = backend.snap_observations
+    ATAobs = types.ModuleType("ATAobs")
+    ATAobs.obs_db = backend.obs_db
+    import ATATools
+    ATATools.ata_control = backend.ata_control
+    ATATools.ata_positions = backend.ata_positions
+    sys.modules.update({'SNAPobs': SNAPobs, 'SNAPobs.snap_defaults': snap_defaults,
+        'SNAPobs.snap_observations': backend.snap_observations, 'ATAobs': ATAobs, 'ATAobs.obs_db': backend.obs_db,
+        'ATAComm': backend.ATAComm, 'ATATools.ata_control': backend.ata_control,
+        'ATATools.ata_positions': backend.ata_positions})
+
+    asyncio.set_event_loop_policy(SimLoopPolicy(backend.sim.clock))
+
+    import snap_onoff_obs
+    snap_onoff_obs.set_backend(backend)
+    return snap_onoff_obs
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog options',
+            description='Run a whole on-off observation set on a simulated array')
+    parser.add_option('-c', '--config', dest='configfile', type=str, action="store", default=None,
+                        help ="config file with measurement and simulation parameters")
+    parser.add_option('-n', dest='ncaptures', type=int, action="store", default=None,
+                        help ='Number of data captures (for each correlation product), default: as snap_onoff_obs.py')
+    parser.add_option('-r', dest='repetitions', type=int, action="store", default=None,
+                        help ='Number of repetitions of on-off pairs, default: as snap_onoff_obs.py')
+    parser.add_option('-i', dest='obs_set', type=int, action="store", default=None,
+                        help ='Observation set ID to continue, with the sqlite database backend')
+    parser.add_option('--seed', dest='seed', type=int, action="store", default=None,
+                        help ='Random seed for the simulated durations')
+    parser.add_option('--concurrent-setup', dest='concurrent_setup', action="store_true", default=False,
+                        help ="Run the rf switch and frequency setup while the antennas slew and autotune, instead of one after another")
+    parser.add_option('--greedy', dest='greedy', action="store_true", default=False,
+                        help ="Pick the next antennas from the database after each group instead of planning the whole set")
+    parser.add_option('--batch-db', dest='batch_db', action="store_true", default=False,
+                        help ="Write the attenuations and the OK status of each on-off series in one transaction")
+    parser.add_option('--db-stats', dest='db_stats', type=str, action="store", default=None,
+                        help ="Write the database call statistics to this JSON file")
+    parser.add_option('--pipelined', dest='pipelined', action="store_true", default=False,
+                        help ="Overlap the DB writes of each recording with the next antenna pointing")
+    parser.add_option('--trace', dest='trace', type=str, action="store", default=None,
+                        help ="Append per phase timing spans, in simulated time, to this JSON lines file")
+    parser.add_option('-v', '--verbose', dest='verbose', action="store_true", default=False,
+                        help ="More on-screen information")
+
+    (options,args) = parser.parse_args()
+
+    if options.pipelined and options.batch_db:
+        parser.error("--pipelined has no effect with --batch-db, which writes the attenuations with the OK status")
+
+    if not options.configfile:
+        parser.print_help()
+        sys.exit(1)
+
+    from ATATools import logger_defaults
+    logger = logger_defaults.getProgramLogger("SNAP_ON_OFF_SIM",
+            logging.INFO if options.verbose else logging.WARNING)
+
+    configParser = configparser.RawConfigParser()
+    configParser.read(options.configfile)
+
+    timings = {}
+    nsnaps = default_nsnaps
+    if configParser.has_section('simulation'):
+        for key,value in configParser.items('simulation'):
+            if key == 'speedup':
+                logger.warning("speedup is not used, the simulated time is virtual")
+            elif key == 'snaps':
+                nsnaps = int(value)
+            else:
+                timings[key] = value
+
+    onoff_dbstats.from_config(configParser)
+    database_file = onoff_sqlite.from_config(configParser)
+    if database_file:
+        database = onoff_sqlite.use_sqlite(database_file)
+    else:
+        database = None
+
+    sim = SimArray(timings,nsnaps,options.seed,database)
+    backend = SimBackend(sim)
+    snap_onoff_obs = install_backend(backend)
+    if options.trace:
+        onoff_trace.start_trace(options.trace,sim.clock.now)
+
+    if options.obs_set:
+        obs_set_id = options.obs_set
+        backend.obs_db.getSetData(obs_set_id)
+    else:
+        obs_set_id = backend.obs_db.getNewObsSetID("OnOff simulation")
+    snap_onoff_obs.doOnOffObservations(configParser.get('measurement', 'antennas'),
+            configParser.get('measurement', 'freq'),configParser.get('measurement', 'sources'),
+            0.0,10.0,options.repetitions or snap_onoff_obs.default_repetitions,
+            options.ncaptures or snap_onoff_obs.default_captures,obs_set_id,None,
+            pipelined=options.pipelined,concurrent_setup=options.concurrent_setup,
+            greedy=options.greedy,batch_db=options.batch_db,db_stats=options.db_stats,
+            cost_model=onoff_planner.CostModel.from_config(configParser))
+
+    onoff_trace.stop_trace()
+    print(backend.report(obs_set_id))
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+stand-ins of the ATA helper packages for onoff_sim
+
+the onoff modules use the logging and list helpers of ATATools
+(logger_defaults and snap_array_helpers) and import ATASQL. When these
+packages are not installed, install() registers the stand-ins below in
+sys.modules, so the simulation runs without the ATA software. The ATASQL
+stand-in can not connect, the simulation uses its own database or the
+sqlite backend
+
+Created Oct 2026
+"""
+
+import sys
+import types
+import logging
+import importlib
+
+
+def getModuleLogger(name):
+    return logging.getLogger(name)
+
+def getProgramLogger(name,level=logging.INFO):
+    logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+    logging.getLogger().setLevel(level)
+    return logging.getLogger(name)
+
+
+def string_to_array(string):
+    """
+    "2a,2b" -> ['2a','2b'], "[2a,2b],[3c]" -> [['2a','2b'],['3c']]
+    """
+    string = string.replace(" ","")
+    if not string.startswith('['):
+        return [item for item in string.split(',') if item]
+    return [[item for item in group.split(',') if item] for group in string[1:-1].split('],[')]
+
+def string_to_numeric_array(string):
+    if not string.startswith('['):
+        return [float(item) for item in string.split(',') if item.strip()]
+    return [[float(item) for item in group.split(',') if item.strip()] for group in string[1:-1].split('],[')]
+
+def array_to_string(arr):
+    return str(arr).replace("'","").replace("[","").replace("]","").replace(" ","")
+
+def dict_to_list(dic):
+    return list(dic.values())
+
+def dict_list_to_list(dic):
+    return [item for values in dic.values() for item in values]
+
+def dict_values_to_comma_string(dic):
+    return ','.join(dic.values())
+
+
+def connectObsDb():
+    raise RuntimeError("no obs database in the simulation, use the sqlite backend")
+
+
+def _module(name,functions):
+    module = types.ModuleType(name)
+    for func in functions:
+        setattr(module,func.__name__,func)
+    return module
+
+def install():
+    """
+    registers the stand-ins of ATATools and ATASQL that can not be imported
+    """
+    try:
+        importlib.import_module('ATATools')
+    except ImportError:
+        logger_defaults = _module('ATATools.logger_defaults',[getModuleLogger,getProgramLogger])
+        snap_array_helpers = _module('ATATools.snap_array_helpers',[string_to_array,string_to_numeric_array,
+            array_to_string,dict_to_list,dict_list_to_list,dict_values_to_comma_string])
+        ATATools = types.ModuleType('ATATools')
+        ATATools.__path__ = []
+        ATATools.logger_defaults = logger_defaults
+        ATATools.snap_array_helpers = snap_array_helpers
+        sys.modules.update({'ATATools': ATATools, 'ATATools.logger_defaults': logger_defaults,
+            'ATATools.snap_array_helpers': snap_array_helpers})
+    try:
+        importlib.import_module('ATASQL')
+    except ImportError:
+        sys.modules['ATASQL'] = _module('ATASQL',[connectObsDb])
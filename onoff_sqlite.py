@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+local SQLite stand-in for the obs database
+
+implements the part of the recordings and rec_ants schema used by
+onoff_db and the obs_db calls of snap_onoff_obs, so the database paths
+can be run and benchmarked offline. Queries written for the MySQL
+connector (with %s placeholders) are translated.
+
+selected with the [database] section of the config file:
+    [database]
+    backend = sqlite
+    file = /tmp/onoff_obs.sqlite
+
+run as a program, fills a database file with synthetic sets:
+    onoff_sqlite.py -d obs.sqlite --sets 2 --ants 42 --freqs 40 -r 10
+
+Created Oct 2026
+"""
+
+import time
+import random
+import logging
+import sqlite3
+from optparse import OptionParser
+
+from ATATools import logger_defaults
+
+import onoff_db
+import onoff_dbpool
+
+schema = [
+        "create table if not exists sets (id integer primary key, description text, ts real)",
+        "create table if not exists recordings (id integer primary key, setid integer, freq real, "
+            "source text, obstype text, obsuser text, description text, status text, ts real)",
+        "create table if not exists rec_ants (id integer, ant text, az real, el real, "
+            "attenx real, atteny real)",
+        "create index if not exists rec_ants_id on rec_ants (id)",
+        "create index if not exists recordings_setid on recordings (setid, status)",
+        ]
+
+
+class SQLiteCursor(object):
+    """
+    cursor accepting the %s placeholders of the MySQL connector
+    """
+    def __init__(self,cursor):
+        self.cursor = cursor
+
+    def execute(self,query,args=()):
+        return self.cursor.execute(query.replace('%s','?'),tuple(args))
+
+    def executemany(self,query,args):
+        return self.cursor.executemany(query.replace('%s','?'),args)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self,size):
+        return self.cursor.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection(object):
+    """
+    connection with the cursor, commit, rollback and close calls of the
+    ATASQL.connectObsDb() connections
+    """
+    def __init__(self,filename):
+        self.conn = sqlite3.connect(filename,check_same_thread=False,timeout=30.0)
+        for cmd in schema:
+            self.conn.execute(cmd)
+        self.conn.commit()
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteObsDb(object):
+    """
+    the obs_db calls of snap_onoff_obs on an SQLite file, plus
+    add_recording, for the recordings the SNAP capture code would insert
+    """
+    def __init__(self,filename):
+        self.filename = filename
+        self.pool = onoff_dbpool.ConnectionPool(lambda: SQLiteConnection(filename))
+
+    def _execute(self,query,args=(),many=False):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if many:
+                    cursor.executemany(query,args)
+                else:
+                    cursor.execute(query,args)
+                rows = cursor.fetchall()
+                lastrowid = cursor.lastrowid
+                conn.commit()
+            finally:
+                cursor.close()
+        return rows,lastrowid
+
+    def getNewObsSetID(self,description):
+        rows,setid = self._execute("insert into sets (description,ts) values (%s,%s)",[description,time.time()])
+        return setid
+
+    def getSetData(self,setid):
+        rows,lastrowid = self._execute("select id,description,ts from sets where id = %s",[setid])
+        if not rows:
+            raise RuntimeError("no set {}".format(setid))
+        return rows[0]
+
+    def add_recording(self,setid,freq,source,obstype,obsuser,desc,ant_dict,az_offset,el_offset):
+        """
+        inserts a new recording of the antennas (the ant_dict values) and
+        returns its id
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("insert into recordings (setid,freq,source,obstype,obsuser,description,status,ts) "
+                        "values (%s,%s,%s,%s,%s,%s,'PENDING',%s)",
+                        [setid,freq,source,obstype,obsuser,desc,time.time()])
+                obsid = cursor.lastrowid
+                cursor.executemany("insert into rec_ants (id,ant,az,el) values (%s,%s,%s,%s)",
+                        [(obsid,ant,az_offset,el_offset) for ant in ant_dict.values()])
+                conn.commit()
+            finally:
+                cursor.close()
+        return obsid
+
+    def updateAttenVals(self,obsid,attendict):
+        self._execute("update rec_ants set attenx = %s, atteny = %s where id = %s and ant = %s",
+                [(attendict[ant][0],attendict[ant][1],obsid,ant) for ant in attendict],many=True)
+
+    def markRecordingsOK(self,obsids):
+        in_p=', '.join(map(lambda x: '%s', obsids))
+        self._execute("update recordings set status = 'OK' where id in ({})".format(in_p),list(obsids))
+
+    def count_recordings(self,setid,status='OK',desc=None):
+        query = "select count(*) from recordings where setid = %s and status = %s"
+        args = [setid,status]
+        if desc is not None:
+            query += " and description = %s"
+            args.append(desc)
+        rows,lastrowid = self._execute(query,args)
+        return rows[0][0]
+
+    def close(self):
+        self.pool.close()
+
+
+def use_sqlite(filename):
+    """
+    makes onoff_db use the SQLite file and returns the matching obs_db
+    replacement
+    """
+    onoff_db.use_connection(lambda: SQLiteConnection(filename))
+    return SQLiteObsDb(filename)
+
+
+def from_config(configParser,section='database'):
+    """
+    the SQLite file name if the config file selects the sqlite backend,
+    None for the default (MySQL through ATASQL)
+    """
+    if not configParser.has_section(section):
+        return None
+    backend = configParser.get(section,'backend') if configParser.has_option(section,'backend') else 'mysql'
+    if backend == 'mysql':
+        return None
+    if backend != 'sqlite':
+        raise RuntimeError("unknown database backend '{}'".format(backend))
+    return configParser.get(section,'file')
+
+
+def synthetic_ants(nants):
+    """
+    nants antenna names in the ATA style (1a, 1b, ...)
+    """
+    return ["{}{}".format(n // 8 + 1,"abcdefgh"[n % 8]) for n in range(nants)]
+
+
+def generate_set(obsdb,ants,freq_list,sources,repetitions=3,group_size=3,complete=1.0,ok_fraction=0.95,
+        rng=None,description="synthetic OnOff set"):
+    """
+    adds a set with on-off series of the antennas (group_size antennas
+    per recording) on the frequencies, cycling through the sources.
+    complete is the fraction of the (antenna group, frequency) series
+    done, ok_fraction the fraction of them marked OK. Returns the set id
+    """
+    rng = rng or random.Random()
+    setid = obsdb.getNewObsSetID(description)
+
+    recordings = []
+    rec_ants = []
+    nseries = 0
+    for first in range(0,len(ants),group_size):
+        group = ants[first:first + group_size]
+        for freq in freq_list:
+            if rng.random() >= complete:
+                continue
+            source = sources[nseries % len(sources)]
+            status = 'OK' if rng.random() < ok_fraction else 'PENDING'
+            nseries += 1
+            for rep in range(repetitions):
+                for on_or_off in ["on","off"]:
+                    recordings.append((setid,freq,source,"ON-OFF","ataonoff",
+                        "{} repetition {}".format(on_or_off.upper(),rep),status,time.time()))
+                    az = 0.0 if on_or_off == "on" else 10.0
+                    rec_ants.append([(ant,az,0.0,12.0,12.0) for ant in group])
+
+    with obsdb.pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for recording,ants_rows in zip(recordings,rec_ants):
+                cursor.execute("insert into recordings (setid,freq,source,obstype,obsuser,description,status,ts) "
+                        "values (%s,%s,%s,%s,%s,%s,%s,%s)",recording)
+                obsid = cursor.lastrowid
+                cursor.executemany("insert into rec_ants (id,ant,az,el,attenx,atteny) values (%s,%s,%s,%s,%s,%s)",
+                        [(obsid,) + row for row in ants_rows])
+            conn.commit()
+        finally:
+            cursor.close()
+    return setid
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options]',
+            description='Fill an SQLite obs database with synthetic on-off sets')
+    parser.add_option('-d', '--database', dest='database', type=str, action="store", default=None,
+                        help ='SQLite file, created if needed')
+    parser.add_option('--sets', dest='nsets', type=int, action="store", default=1,
+                        help ='Number of sets, default: 1')
+    parser.add_option('--ants', dest='nants', type=int, action="store", default=42,
+                        help ='Number of antennas, default: 42')
+    parser.add_option('--freqs', dest='nfreqs', type=int, action="store", default=40,
+                        help ='Number of frequencies from 1000 MHz in 250 MHz steps, default: 40')
+    parser.add_option('-r', dest='repetitions', type=int, action="store", default=3,
+                        help ='On-off repetitions per series, default: 3')
+    parser.add_option('-p', dest='sources', type=str, action="store", default="casa,moon",
+                        help ='Comma separated sources, default: casa,moon')
+    parser.add_option('--group', dest='group_size', type=int, action="store", default=3,
+                        help ='Antennas per recording, default: 3')
+    parser.add_option('--complete', dest='complete', type=float, action="store", default=1.0,
+                        help ='Fraction of the series done, default: 1.0')
+    parser.add_option('--ok', dest='ok_fraction', type=float, action="store", default=0.95,
+                        help ='Fraction of the done series marked OK, default: 0.95')
+    parser.add_option('--seed', dest='seed', type=int, action="store", default=None,
+                        help ='Random seed')
+
+    (options,args) = parser.parse_args()
+
+    if not options.database:
+        parser.print_help()
+        return
+
+    logger = logger_defaults.getProgramLogger("ONOFF_SQLITE",logging.INFO)
+
+    rng = random.Random(options.seed)
+    obsdb = SQLiteObsDb(options.database)
+    ants = synthetic_ants(options.nants)
+    freq_list = [1000.0 + 250.0 * n for n in range(options.nfreqs)]
+    sources = [s.strip() for s in options.sources.split(',')]
+    for n in range(options.nsets):
+        tstart = time.time()
+        setid = generate_set(obsdb,ants,freq_list,sources,options.repetitions,options.group_size,
+                options.complete,options.ok_fraction,rng)
+        logger.info("set {}: {} OK recordings in {:.1f} s".format(setid,obsdb.count_recordings(setid),
+            time.time() - tstart))
+        print(setid)
+    obsdb.close()
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+per phase timing of observing runs
+
+spans (name, start, end, duration and attributes like set, source and
+frequency) are appended as compact JSON lines to a trace file. Nothing is
+written until start_trace is called.
+
+run as a program, prints where the time of traced runs went, per set,
+per source and per frequency:
+    onoff_trace.py trace.jsonl [trace2.jsonl ...]
+
+Created Oct 2026
+"""
+
+import sys
+import time
+import json
+import threading
+from contextlib import contextmanager
+from optparse import OptionParser
+
+_lock = threading.Lock()
+_trace_file = None
+_clock = time.time
+_context = {}
+
+
+def start_trace(filename,clock=None):
+    """
+    starts appending spans to filename. clock is the function returning
+    the current time, time.time by default
+    """
+    global _trace_file,_clock
+    with _lock:
+        if _trace_file:
+            _trace_file.close()
+        _trace_file = open(filename,'a')
+        _clock = clock or time.time
+
+
+def stop_trace():
+    global _trace_file
+    with _lock:
+        if _trace_file:
+            _trace_file.close()
+        _trace_file = None
+        _context.clear()
+
+
+def set_context(**attrs):
+    """
+    attributes added to all the following spans, None removes one
+    """
+    with _lock:
+        for key,value in attrs.items():
+            if value is None:
+                _context.pop(key,None)
+            else:
+                _context[key] = value
+
+
+def _write(record):
+    line = json.dumps(record,separators=(',',':'),default=str)
+    with _lock:
+        if _trace_file:
+            _trace_file.write(line + '\n')
+            _trace_file.flush()
+
+
+@contextmanager
+def span(name,**attrs):
+    """
+    records the time spent in the with block as the phase name
+    """
+    if not _trace_file:
+        yield
+        return
+
+    with _lock:
+        record = dict(_context)
+    record.update(attrs)
+    record['name'] = name
+    record['start'] = _clock()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record['end'] = _clock()
+        record['dur'] = record['end'] - record['start']
+        if not ok:
+            record['error'] = True
+        _write(record)
+
+
+def traced(name,func,*args,**kwargs):
+    """
+    calls func(*args,**kwargs) inside a span
+    """
+    with span(name):
+        return func(*args,**kwargs)
+
+
+def read_spans(filenames):
+    spans = []
+    for filename in filenames:
+        with open(filename) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    #the last line may be cut by a crash
+                    pass
+    return spans
+
+
+def _covered_time(spans):
+    """
+    time covered by at least one of the spans, so nested and concurrent
+    spans are not counted twice
+    """
+    total = 0.0
+    cstart = cend = None
+    for s in sorted(spans,key=lambda s: s['start']):
+        if cend is None or s['start'] > cend:
+            if cend is not None:
+                total += cend - cstart
+            cstart,cend = s['start'],s['end']
+        else:
+            cend = max(cend,s['end'])
+    if cend is not None:
+        total += cend - cstart
+    return total
+
+
+def summarize(spans,key):
+    """
+    returns {key value: (covered time, {phase: (count, total duration)})}
+    for the spans having the attribute key
+    """
+    groups = {}
+    for s in spans:
+        if key not in s:
+            continue
+        groups.setdefault(s[key],[]).append(s)
+
+    summary = {}
+    for value,gspans in groups.items():
+        wall = _covered_time(gspans)
+        phases = {}
+        for s in gspans:
+            count,total = phases.get(s['name'],(0,0.0))
+            phases[s['name']] = (count + 1,total + s['dur'])
+        summary[value] = (wall,phases)
+    return summary
+
+
+def format_summary(summary,key):
+    lines = []
+    for value in sorted(summary.keys(),key=str):
+        wall,phases = summary[value]
+        lines.append("{} {}: {:.1f} s".format(key,value,wall))
+        for name in sorted(phases.keys(),key=lambda n: -phases[n][1]):
+            count,total = phases[name]
+            share = 100.0 * total / wall if wall else 0.0
+            lines.append("    {:<20s} {:5d} x {:9.1f} s {:9.2f} s/call {:6.1f}%".format(
+                name,count,total,total / count,share))
+    return '\n'.join(lines)
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options] trace.jsonl [trace.jsonl ...]',
+            description='Show the time breakdown of traced on-off observation runs')
+    parser.add_option('-b', '--by', dest='keys', type=str, action="store", default="set,source,freq",
+                        help ='Comma separated attributes to group by, default: set,source,freq')
+
+    (options,args) = parser.parse_args()
+
+    if not args:
+        parser.print_help()
+        sys.exit(1)
+
+    spans = read_spans(args)
+    for key in options.keys.split(','):
+        print(format_summary(summarize(spans,key),key))
+
+if __name__== "__main__":
+    main()
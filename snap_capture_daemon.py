@@ -0,0 +1,451 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+long-lived capture daemon of a SNAP, and its client
+
+the daemon keeps a snap_session.SnapSession to its SNAP and runs the
+capture jobs it receives on a local unix socket one after the other. The
+protocol is JSON lines: a request carries an id chosen by the client and
+an op (capture, check, status or stop), every reply carries the id of its
+request. A capture is acknowledged with a "queued" event when accepted
+and answered with a "done" or "error" event when it is finished, so a
+client can dispatch captures to all the SNAPs at once and only then wait
+
+the sockets are in a directory of the user only (runtime_dir), and a
+daemon only replaces a socket left behind by a daemon of the same user
+that is gone. The recordings are only written inside the data directory
+of the daemon, a relative job path is taken from there
+
+    snap_capture_daemon.py -s snap0 --fpga design.fpg -d ~/data
+
+    dispatcher = CaptureDispatcher(["snap0","snap1"])
+    futures = dispatcher.capture(dict((host,{'path': ..., 'ncaptures': 16}) for host in hosts))
+    results = dispatcher.wait(futures)
+
+Created Oct 2026
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import errno
+import socket
+import tempfile
+import logging
+import threading
+from six.moves import queue
+from concurrent.futures import Future,wait
+from optparse import OptionParser
+
+from ATATools import logger_defaults
+
+import snap_session
+
+default_socket = "{}.sock"
+default_connect_timeout = 10.0
+
+
+def runtime_dir():
+    """
+    the directory of the sockets of the user: $XDG_RUNTIME_DIR/snap_capture,
+    or snap_capture-<uid> in the temporary directory
+    """
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base:
+        return os.path.join(base,"snap_capture")
+    return os.path.join(tempfile.gettempdir(),"snap_capture-{}".format(os.getuid()))
+
+
+def make_runtime_dir(path=None):
+    """
+    creates the runtime directory with mode 0700, or checks that the
+    existing one is a directory of the user that nobody else can use.
+    Returns its path
+    """
+    path = path or runtime_dir()
+    try:
+        os.mkdir(path,0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError("{} is not a private directory of this user".format(path))
+    return path
+
+
+def socket_path(host):
+    return os.path.join(runtime_dir(),default_socket.format(host))
+
+
+def remove_stale_socket(path):
+    """
+    removes the socket at path left by a daemon of the user that is gone.
+    Anything else there (another file, the socket of another user or of
+    a running daemon) raises a RuntimeError
+    """
+    try:
+        st = os.lstat(path)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return
+        raise
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise RuntimeError("{} exists and is not a socket of this user".format(path))
+    sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error as e:
+        if e.errno != errno.ECONNREFUSED:
+            raise
+        os.unlink(path)
+        return
+    finally:
+        sock.close()
+    raise RuntimeError("a capture daemon is already serving {}".format(path))
+
+
+def job_path(data_dir,path):
+    """
+    the absolute path of a recording of a job, relative paths are in
+    data_dir. A path outside of data_dir (after following the links)
+    raises a ValueError
+    """
+    data_dir = os.path.realpath(data_dir)
+    resolved = os.path.realpath(os.path.join(data_dir,path))
+    if os.path.commonpath([data_dir,resolved]) != data_dir or resolved == data_dir:
+        raise ValueError("{} is not in the data directory {}".format(path,data_dir))
+    return resolved
+
+
+def _send(sock,lock,message):
+    line = json.dumps(message,separators=(',',':'),default=str) + '\n'
+    with lock:
+        sock.sendall(line.encode('utf-8'))
+
+
+def _lines(sock):
+    """
+    yields the decoded JSON messages received on sock until it is closed
+    """
+    buf = b''
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return
+        buf += data
+        while b'\n' in buf:
+            line,buf = buf.split(b'\n',1)
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+
+
+class CaptureDaemon(object):
+    """
+    serves capture jobs on the unix socket path with the session (a
+    SnapSession or an object with its run and check calls), recording
+    into data_dir
+    """
+    _stop = object()
+
+    def __init__(self,session,path,data_dir):
+        self.session = session
+        self.path = path
+        self.data_dir = os.path.realpath(data_dir)
+        self.jobs = queue.Queue()
+        self.done = 0
+        self.failed = 0
+        self.current = None
+        self.stopping = threading.Event()
+        remove_stale_socket(path)
+        self.server = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        #only the user can connect
+        umask = os.umask(0o177)
+        try:
+            self.server.bind(path)
+        finally:
+            os.umask(umask)
+        self.server.listen(8)
+        self.worker = threading.Thread(target=self._work,name="capture-worker")
+        self.worker.daemon = True
+        self.acceptor = threading.Thread(target=self._accept,name="capture-accept")
+        self.acceptor.daemon = True
+
+    def start(self):
+        self.worker.start()
+        self.acceptor.start()
+        return self
+
+    def _accept(self):
+        while not self.stopping.is_set():
+            try:
+                conn,addr = self.server.accept()
+            except OSError:
+                return
+            thread = threading.Thread(target=self._serve,args=(conn,),name="capture-client")
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self,conn):
+        logger = logger_defaults.getModuleLogger(__name__)
+        lock = threading.Lock()
+        try:
+            for request in _lines(conn):
+                op = request.get('op')
+                reply = {'id': request.get('id')}
+                if op == 'capture':
+                    try:
+                        request['path'] = job_path(self.data_dir,request.get('path') or '')
+                    except ValueError as e:
+                        reply.update({'event': 'error', 'error': str(e)})
+                        _send(conn,lock,reply)
+                        continue
+                if op in ('capture','check'):
+                    #acknowledged first, so the queued event comes before the result
+                    reply.update({'event': 'queued', 'position': self.jobs.qsize() + 1})
+                    _send(conn,lock,reply)
+                    self.jobs.put((request,conn,lock))
+                    continue
+                elif op == 'status':
+                    reply.update({'event': 'done', 'result': self.status()})
+                elif op == 'stop':
+                    reply.update({'event': 'done', 'result': self.status()})
+                    _send(conn,lock,reply)
+                    self.stop()
+                    return
+                else:
+                    reply.update({'event': 'error', 'error': "unknown op {}".format(op)})
+                _send(conn,lock,reply)
+        except (OSError,ValueError) as e:
+            logger.warning("capture client connection closed: {}".format(e))
+        finally:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def status(self):
+        return {'queued': self.jobs.qsize(), 'current': self.current, 'done': self.done, 'failed': self.failed}
+
+    def _run_job(self,request):
+        if request['op'] == 'check':
+            self.session.check()
+            return {'fpga_clk': self.session.fpga_clk, 'acc_len': self.session.acc_len}
+        tstart = time.time()
+        ncaptures = self.session.run(snap_session.SnapSession.record,request['path'],request['ncaptures'],
+                request.get('meta'),request.get('rfc'),request.get('ifc'),
+                request.get('adc_snapshots',snap_session.default_adc_snapshots))
+        return {'path': request['path'], 'ncaptures': ncaptures, 'seconds': time.time() - tstart}
+
+    def _work(self):
+        logger = logger_defaults.getModuleLogger(__name__)
+        while True:
+            job = self.jobs.get()
+            if job is self._stop:
+                return
+            request,conn,lock = job
+            self.current = request.get('id')
+            try:
+                reply = {'id': request.get('id'), 'event': 'done', 'result': self._run_job(request)}
+                self.done += 1
+            except Exception as e:
+                logger.exception("capture job {} failed".format(request.get('id')))
+                reply = {'id': request.get('id'), 'event': 'error', 'error': str(e)}
+                self.failed += 1
+            self.current = None
+            try:
+                _send(conn,lock,reply)
+            except OSError:
+                logger.warning("client of job {} is gone".format(request.get('id')))
+
+    def stop(self):
+        """
+        stops accepting jobs and ends once the queued ones are done
+        """
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.jobs.put(self._stop)
+        try:
+            #wakes up the accept call
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self.worker.is_alive():
+                self.worker.join(1.0)
+        finally:
+            self.stop()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class CaptureClient(object):
+    """
+    connection to a capture daemon. Every call returns a Future resolved
+    with the result of the request, or failing with a RuntimeError
+    """
+    def __init__(self,path,timeout=default_connect_timeout):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.sock.settimeout(None)
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        self.next_id = 1
+        self.reader = threading.Thread(target=self._read,name="capture-replies")
+        self.reader.daemon = True
+        self.reader.start()
+
+    def _request(self,op,**kwargs):
+        future = Future()
+        with self.lock:
+            rid = self.next_id
+            self.next_id += 1
+            self.pending[rid] = future
+        kwargs.update({'id': rid, 'op': op})
+        try:
+            _send(self.sock,self.send_lock,kwargs)
+        except OSError as e:
+            with self.lock:
+                self.pending.pop(rid,None)
+            future.set_exception(RuntimeError("capture daemon {}: {}".format(self.path,e)))
+        return future
+
+    def _read(self):
+        error = "connection closed"
+        try:
+            for reply in _lines(self.sock):
+                event = reply.get('event')
+                if event == 'queued':
+                    continue
+                with self.lock:
+                    future = self.pending.pop(reply.get('id'),None)
+                if future is None:
+                    continue
+                if event == 'done':
+                    future.set_result(reply.get('result'))
+                else:
+                    future.set_exception(RuntimeError(reply.get('error')))
+        except (OSError,ValueError) as e:
+            error = str(e)
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("capture daemon {}: {}".format(self.path,error)))
+
+    def capture(self,path,ncaptures,meta=None,rfc=None,ifc=None,adc_snapshots=snap_session.default_adc_snapshots):
+        return self._request('capture',path=path,ncaptures=ncaptures,meta=meta or {},rfc=rfc,ifc=ifc,
+                adc_snapshots=adc_snapshots)
+
+    def check(self):
+        return self._request('check')
+
+    def status(self):
+        return self._request('status')
+
+    def stop(self):
+        return self._request('stop')
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class CaptureTimeout(RuntimeError):
+    """
+    captures still running when CaptureDispatcher.wait gave up
+    """
+
+
+class CaptureDispatcher(object):
+    """
+    clients of the capture daemons of several SNAPs
+    """
+    def __init__(self,hosts,paths=None):
+        paths = paths or {}
+        self.clients = dict((host,CaptureClient(paths.get(host,socket_path(host)))) for host in hosts)
+
+    def capture(self,jobs):
+        """
+        sends the jobs, a dictionary of host to CaptureClient.capture
+        arguments, to all the daemons at once. Returns the futures per host
+        """
+        return dict((host,self.clients[host].capture(**kwargs)) for host,kwargs in jobs.items())
+
+    def wait(self,futures,timeout=None):
+        """
+        waits for the futures of capture and returns the results per host.
+        A failed capture raises its RuntimeError, captures not done after
+        timeout seconds a CaptureTimeout
+        """
+        done,not_done = wait(list(futures.values()),timeout)
+        if not_done:
+            raise CaptureTimeout("{} captures not done after {} s".format(len(not_done),timeout))
+        return dict((host,future.result()) for host,future in futures.items())
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog options',
+            description='Keep a SNAP connected and run the capture jobs sent on a unix socket')
+    parser.add_option('-s', '--snap', dest='host', type=str, action="store", default=None,
+                        help ='Hostname / IP of the SNAP')
+    parser.add_option('--fpga', dest='fpga_file', type=str, action="store", default=None,
+                        help ='.fpgfile of the SNAP design')
+    parser.add_option('--srate', dest='srate', type=float, action="store", default=snap_session.default_srate,
+                        help ='Sample rate in MHz, used for the clock check')
+    parser.add_option('-d', '--data-dir', dest='data_dir', type=str, action="store", default=None,
+                        help ='Directory of the recordings, the jobs can not write outside of it')
+    parser.add_option('--socket', dest='socket', type=str, action="store", default=None,
+                        help ='Unix socket path, default: {}'.format(socket_path("<snap>")))
+    parser.add_option('-v', '--verbose', dest='verbose', action="store_true", default=False,
+                        help ="More on-screen information")
+
+    (options,args) = parser.parse_args()
+
+    if not options.host or not options.fpga_file or not options.data_dir:
+        parser.print_help()
+        sys.exit(1)
+
+    logger = logger_defaults.getProgramLogger("SNAP_CAPTURE_DAEMON",
+            logging.INFO if options.verbose else logging.WARNING)
+
+    data_dir = os.path.expanduser(options.data_dir)
+    if not os.path.isdir(data_dir):
+        logger.error("data directory {} does not exist".format(data_dir))
+        sys.exit(1)
+    if not options.socket:
+        make_runtime_dir()
+
+    session = snap_session.SnapSession(options.host,options.fpga_file,options.srate)
+    #the socket is taken before connecting, a second daemon of the SNAP stops here
+    daemon = CaptureDaemon(session,options.socket or socket_path(options.host),data_dir)
+    #connect and validate up front, the first job should not pay for it
+    session.get()
+    logger.info("serving {} on {}".format(options.host,daemon.path))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("interrupted")
+    session.invalidate()
+
+if __name__== "__main__":
+    main()
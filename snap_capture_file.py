@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+appendable on-disk format of the SNAP vacc captures
+
+a recording is a directory:
+    meta.json       format version, the spectra and record layouts, the
+                    number of channels and the recording metadata (rfc,
+                    fpga_clk, acc_len, attenuations, ATA status, ...)
+    spectra.dat     little-endian float64 spectra, one (2, channels)
+                    block (auto0 and auto1) per capture
+    captures.dat    one record per capture: timestamp and the overflow
+                    counts (record_dtype)
+    <name>.npy      arrays written once, like the ADC bitsnaps or frange
+
+each capture is appended to the files as it arrives, so memory does not
+grow with the number of captures, and a crash loses at most the capture
+being written: a cut last block is ignored by the reader. The reader maps
+the files in memory and only reads the captures and channels asked for
+
+    with CaptureWriter(path,meta) as writer:
+        writer.write_capture(snap_vacc.decode_vacc(data,acc_len),t,...)
+
+    capture = CaptureFile(path)
+    auto0 = capture.auto(0,captures=slice(0,10),channels=slice(1000,2000))
+
+a recording can be exported to a pickle in the layout of the old
+recorder (retired/snap_record.py), for the analysis reading those files
+
+run as a program, prints the metadata and the size of recordings, and
+with -p exports them next to the recordings, as <name>.pkl:
+    snap_capture_file.py -p 1540000000_rf1400.00_n16_casa.cap
+
+Created Oct 2026
+"""
+
+import os
+import sys
+import json
+import pickle
+from optparse import OptionParser
+
+import numpy as np
+
+format_name = "snap_capture"
+format_version = 1
+spectra_dtype = np.dtype('<f8')
+record_dtype = np.dtype([('timestamp','<f8'),('auto0_of_count','<i8'),('auto1_of_count','<i8'),
+    ('fft_of0','<i8'),('fft_of1','<i8')])
+
+meta_file = "meta.json"
+spectra_file = "spectra.dat"
+records_file = "captures.dat"
+
+
+def _jsonable(value):
+    """
+    value with the numpy scalars and arrays converted for json
+    """
+    if isinstance(value,dict):
+        return dict((str(k),_jsonable(v)) for k,v in value.items())
+    if isinstance(value,(list,tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value,np.ndarray):
+        return value.tolist()
+    if isinstance(value,np.generic):
+        return value.item()
+    return value
+
+
+class CaptureWriter(object):
+    """
+    writes a recording directory capture by capture. The number of
+    channels is taken from the first capture if not given
+    """
+    def __init__(self,path,meta=None,nchannels=None):
+        self.path = path
+        self.meta = dict(meta or {})
+        self.nchannels = nchannels
+        self.ncaptures = 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.spectra = open(os.path.join(path,spectra_file),'wb')
+        self.records = open(os.path.join(path,records_file),'wb')
+        self._write_meta()
+
+    def _write_meta(self):
+        header = {'format': format_name, 'version': format_version, 'nchannels': self.nchannels,
+                'spectra_dtype': spectra_dtype.str, 'record_dtype': record_dtype.descr,
+                'meta': _jsonable(self.meta)}
+        #replaced atomically, a reader never sees a partial file
+        tmpname = os.path.join(self.path,meta_file + ".tmp")
+        with open(tmpname,'w') as f:
+            json.dump(header,f,indent=1,default=str)
+        os.rename(tmpname,os.path.join(self.path,meta_file))
+
+    def update_meta(self,**kwargs):
+        """
+        adds or changes metadata values, e.g. the attenuations once tuned
+        """
+        self.meta.update(kwargs)
+        self._write_meta()
+
+    def write_array(self,name,array):
+        """
+        stores an array written once per recording as <name>.npy
+        """
+        np.save(os.path.join(self.path,name + ".npy"),np.asarray(array))
+
+    def write_capture(self,spectra,timestamp,auto0_of_count=0,auto1_of_count=0,fft_of0=0,fft_of1=0):
+        """
+        appends a capture: spectra is the (2, channels) array of
+        snap_vacc.decode_vacc, or the auto0 and auto1 spectra
+        """
+        spectra = np.ascontiguousarray(spectra,dtype=spectra_dtype)
+        if self.nchannels is None:
+            self.nchannels = spectra.shape[-1]
+            self._write_meta()
+        if spectra.shape != (2,self.nchannels):
+            raise ValueError("capture of shape {}, expected (2, {})".format(spectra.shape,self.nchannels))
+
+        record = np.array([(timestamp,auto0_of_count,auto1_of_count,fft_of0,fft_of1)],dtype=record_dtype)
+        #the spectra go first, a record is only complete with its spectra
+        spectra.tofile(self.spectra)
+        self.spectra.flush()
+        record.tofile(self.records)
+        self.records.flush()
+        self.ncaptures += 1
+
+    def close(self):
+        if self.spectra:
+            self.spectra.close()
+            self.records.close()
+            self.spectra = self.records = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,tb):
+        self.close()
+        return False
+
+
+class CaptureFile(object):
+    """
+    reader of a recording directory, usable while it is being written
+    """
+    def __init__(self,path):
+        self.path = path
+        with open(os.path.join(path,meta_file)) as f:
+            header = json.load(f)
+        if header.get('format') != format_name or header.get('version',0) > format_version:
+            raise ValueError("{} is not a version {} {} recording".format(path,format_version,format_name))
+        self.meta = header['meta']
+        self.nchannels = header['nchannels']
+        self.spectra_dtype = np.dtype(header['spectra_dtype'])
+        self.record_dtype = np.dtype([tuple(field) for field in header['record_dtype']])
+
+    @property
+    def ncaptures(self):
+        """
+        the number of complete captures
+        """
+        if not self.nchannels:
+            return 0
+        nspectra = os.path.getsize(os.path.join(self.path,spectra_file)) // (2 * self.nchannels *
+                self.spectra_dtype.itemsize)
+        nrecords = os.path.getsize(os.path.join(self.path,records_file)) // self.record_dtype.itemsize
+        return min(nspectra,nrecords)
+
+    def _map(self,filename,dtype,shape):
+        if not shape[0]:
+            return np.zeros(shape,dtype=dtype)
+        return np.memmap(os.path.join(self.path,filename),dtype=dtype,mode='r',shape=shape)
+
+    def spectra(self,captures=None,channels=None):
+        """
+        the (captures, 2, channels) spectra of the selected captures and
+        channels (slices, index lists or None for all), read from disk
+        """
+        n = self.ncaptures
+        spectra = self._map(spectra_file,self.spectra_dtype,(n,2,self.nchannels or 0))
+        captures = slice(None) if captures is None else captures
+        channels = slice(None) if channels is None else channels
+        return np.array(spectra[captures][:,:,channels])
+
+    def auto(self,pol,captures=None,channels=None):
+        """
+        the (captures, channels) spectra of auto0 (pol 0) or auto1
+        """
+        n = self.ncaptures
+        spectra = self._map(spectra_file,self.spectra_dtype,(n,2,self.nchannels or 0))
+        captures = slice(None) if captures is None else captures
+        channels = slice(None) if channels is None else channels
+        return np.array(spectra[captures,pol][:,channels])
+
+    def records(self,captures=None):
+        """
+        the capture records (timestamp and overflow counts)
+        """
+        records = self._map(records_file,self.record_dtype,(self.ncaptures,))
+        return np.array(records if captures is None else records[captures])
+
+    def array(self,name):
+        return np.load(os.path.join(self.path,name + ".npy"),mmap_mode='r')
+
+    def arrays(self):
+        return sorted(f[:-4] for f in os.listdir(self.path) if f.endswith(".npy"))
+
+    def to_recorder_dict(self):
+        """
+        the recording as the dictionary pickled by the old recorder: the
+        metadata, the arrays, and per capture lists of the auto0 and auto1
+        spectra, timestamps and overflow counts
+        """
+        out = dict(self.meta)
+        for name in self.arrays():
+            out[name] = np.array(self.array(name))
+        spectra = self.spectra()
+        records = self.records()
+        for pol in range(2):
+            out['auto{}'.format(pol)] = list(spectra[:,pol])
+            out['auto{}_timestamp'.format(pol)] = records['timestamp'].tolist()
+            out['auto{}_of_count'.format(pol)] = records['auto{}_of_count'.format(pol)].tolist()
+            out['fft_of{}'.format(pol)] = records['fft_of{}'.format(pol)].tolist()
+        return out
+
+
+def pickle_filename(path):
+    """
+    the name of the pickle export of a recording: 1540000000_..._casa.cap
+    -> 1540000000_..._casa.pkl
+    """
+    path = path.rstrip(os.sep)
+    base,ext = os.path.splitext(path)
+    return (base if ext == ".cap" else path) + ".pkl"
+
+
+def plain(value):
+    """
+    value with the numpy arrays as (nested) lists and the numpy numbers as
+    Python numbers
+    """
+    if isinstance(value,np.ndarray):
+        return value.tolist()
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,dict):
+        return dict((k,plain(v)) for k,v in value.items())
+    if isinstance(value,(list,tuple)):
+        return [plain(v) for v in value]
+    return value
+
+
+def export_pickle(path,filename=None,protocol=2):
+    """
+    writes the recording at path as a pickle of the old recorder and
+    returns the file name. The arrays are written as lists (see plain),
+    so the pickle does not refer to numpy and loads in Python 2 or with
+    any numpy version
+    """
+    filename = filename or pickle_filename(path)
+    with open(filename,'wb') as f:
+        pickle.dump(plain(CaptureFile(path).to_recorder_dict()),f,protocol)
+    return filename
+
+
+def main():
+
+    parser = OptionParser(usage= 'Usage %prog [options] recording [recording ...]',
+            description='Show the metadata and the size of SNAP capture recordings')
+    parser.add_option('-m', '--meta', dest='meta', action="store_true", default=False,
+                        help ='Print all the metadata')
+    parser.add_option('-p', '--pickle', dest='pickle', action="store_true", default=False,
+                        help ='Export each recording to a .pkl file of the old recorder, next to it')
+
+    (options,args) = parser.parse_args()
+
+    if not args:
+        parser.print_help()
+        sys.exit(1)
+
+    for path in args:
+        capture = CaptureFile(path)
+        print("{}: {} captures of {} channels, arrays: {}".format(path,capture.ncaptures,capture.nchannels,
+            ",".join(capture.arrays()) or "none"))
+        meta = capture.meta
+        if options.meta:
+            for key in sorted(meta.keys()):
+                print("    {}: {}".format(key,meta[key]))
+        else:
+            print("    rfc {} MHz, fpga_clk {}, atten x {} y {}".format(meta.get('rfc'),meta.get('fpga_clk'),
+                meta.get('attenx'),meta.get('atteny')))
+        if options.pickle:
+            print("    exported to {}".format(export_pickle(path)))
+
+if __name__== "__main__":
+    main()
@@ -3,6 +3,13 @@
 import sys
 import os
 import time
+import logging
+
+from ATATools import ata_control,logger_defaults
+
+import snap_session
+import snap_tuning
+import snap_capture_daemon
 
 if len(sys.argv) != 8:
 
@@ -18,11 +25,92 @@ source = sys.argv[6]
 obsname = sys.argv[7]
 
 fpga_file = "/home/sonata/dev/ata_snap/snap_adc5g_spec/outputs/snap_adc5g_spec_2018-07-07_1844.fpg"
+ncaptures = 1000
+ifc = 629.1452
+target_rms = 12.0
+#a capture daemon failing that many recordings in a row is given up
+max_daemon_errors = 3
+#generous bound of the time of one capture, the daemon is considered
+#stuck after ncaptures of them
+max_capture_time = 5.0
+capture_timeout = ncaptures * max_capture_time
+
+logger = logger_defaults.getProgramLogger("SNAP_LONG_OBS",logging.INFO)
+
+datadir = os.path.expanduser(dest)
+meta = {'ant': ant, 'source': source, 'obsid': obsid, 'comment': obsname}
 
+#the recordings reuse one connection, the design and the clock check
+#are only redone after a failure
+sessions = snap_session.SessionManager(fpga_file)
+session = sessions.get(snap)
+
+#the attenuators (or the PAMs) are tuned once, before the first recording.
+#The tuned values are kept in the metadata of every recording; the
+#retired recorder also wrote them to the snap_onoff_atten table with
+#snap_obs_db.record_atten, which has no Python 3 version
+attendict,results = snap_tuning.tune_group({snap: ant},snap_tuning.make_tuner(sessions,target_rms=target_rms))
+if ant not in attendict:
+    raise results[snap]
+meta['attenx'],meta['atteny'] = attendict[ant][0],attendict[ant][1]
+logger.info("%s: tuned to %s (rms %s)" % (ant, attendict[ant], results[snap].rms))
+
+#if a capture daemon serves the SNAP (snap_capture_daemon.py, with dest
+#in its data directory), the recordings are its jobs
+dispatcher = None
+if os.path.exists(snap_capture_daemon.socket_path(snap)):
+    try:
+        dispatcher = snap_capture_daemon.CaptureDispatcher([snap])
+        logger.info("recording through the capture daemon of %s" % snap)
+    except OSError as e:
+        logger.warning("capture daemon of %s not reachable (%s), recording directly" % (snap, e))
+
+#consecutive recordings the daemon failed
+daemon_errors = 0
 for i in range(1, 10000):
-    t = ''
-    if i == 1:
-        t = '-t 12.0'
-    cmd = "./snap_record.py %s %s -n 1000 -a %s -p %s %s -o 1000000 -c %s_%s_on_%s_obsid%s_%smhz_%d" % (snap, fpga_file, ant, dest, t, source, ant, obsname, obsid, freq, i)
-    print(cmd)
-    os.system(cmd)
+    try:
+        #the sky frequency is read from the array for every recording, as
+        #the separate recorder did; freq is only part of the file name
+        rfc = float(ata_control.get_sky_freq())
+        comment = "%s_%s_on_%s_obsid%s_%smhz_%d" % (source, ant, obsname, obsid, freq, i)
+        path = os.path.join(datadir, "%d_rf%.2f_n%d_%s.cap" % (time.time(), rfc, ncaptures, comment))
+        try:
+            meta['ata_status'] = ata_control.get_ascii_status()
+        except Exception:
+            meta.pop('ata_status', None)
+        try:
+            meta['pam_stats'] = ata_control.get_pam_status(ant)
+        except Exception:
+            meta.pop('pam_stats', None)
+        logger.info("recording %d to %s" % (i, path))
+        if dispatcher:
+            try:
+                dispatcher.wait(dispatcher.capture({snap: {'path': path, 'ncaptures': ncaptures, 'meta': meta,
+                    'rfc': rfc, 'ifc': ifc}}), capture_timeout)
+            except snap_capture_daemon.CaptureTimeout:
+                raise
+            except RuntimeError:
+                daemon_errors += 1
+                raise
+            daemon_errors = 0
+        else:
+            session.run(snap_session.SnapSession.record, path, ncaptures, meta, rfc, ifc)
+    except KeyboardInterrupt:
+        raise
+    except snap_capture_daemon.CaptureTimeout:
+        #the daemon may still be capturing, so the SNAP can not be used
+        #directly either
+        logger.error("capture daemon of %s stuck in recording %d, stopping" % (snap, i))
+        raise
+    except Exception:
+        #a failed recording does not stop the run, as with the separate recorder
+        logger.exception("recording %d failed" % i)
+        if dispatcher and daemon_errors >= max_daemon_errors:
+            logger.error("the capture daemon of %s failed %d recordings in a row, recording directly" %
+                    (snap, daemon_errors))
+            dispatcher.close()
+            dispatcher = None
+
+if dispatcher:
+    dispatcher.close()
+sessions.close()
@@ -26,8 +26,10 @@
 '''
 
 import sys
+import time
 import logging
 from optparse import OptionParser
+from concurrent.futures import ThreadPoolExecutor
 
 from SNAPobs import snap_defaults,snap_observations
 from ATATools import ata_control,logger_defaults,ata_positions,snap_array_helpers
@@ -35,6 +37,15 @@ from ATAobs import obs_db
 import ATAComm 
 
 import onoff_db
+import onoff_setup
+import onoff_planner
+import onoff_trace
+import onoff_journal
+import onoff_atten_cache
+import onoff_notify
+import onoff_antpols
+import onoff_dbstats
+import onoff_sqlite
 from six.moves import configparser
 
 default_fpga_file = snap_defaults.spectra_snap_file
@@ -43,9 +54,52 @@ default_repetitions = 3
 default_pointings = "0.0,10"
 default_rms = snap_defaults.rms
 
-def onoff_observations(ant_dict,obs_set_id,freq,fpga_file,source,repetitions,ncaptures,az_offset,el_offset):
+#every obs_db call is timed, see onoff_dbstats
+obs_db = onoff_dbstats.InstrumentedModule(obs_db,"obs_db")
+#executor factory, see onoff_backend.Backend.executor
+new_executor = lambda max_workers: ThreadPoolExecutor(max_workers=max_workers)
+#clock of the measured durations, see onoff_backend.Backend.now
+now = time.time
+
+def set_backend(backend):
+    """
+    replaces the array, SNAP, database and notification modules used by
+    the observations with the ones of backend (an onoff_backend.Backend)
+    """
+    global ata_control,snap_observations,obs_db,onoff_db,ATAComm,ata_positions,new_executor,now
+
+    ata_control = backend.ata_control
+    snap_observations = backend.snap_observations
+    obs_db = onoff_dbstats.InstrumentedModule(backend.obs_db,"obs_db")
+    onoff_db = backend.onoff_db
+    ATAComm = backend.ATAComm
+    ata_positions = backend.ata_positions
+    new_executor = backend.executor
+    now = backend.now
+
+def onoff_observations(ant_dict,obs_set_id,freq,fpga_file,source,repetitions,ncaptures,az_offset,el_offset,pipelined=False,
+        journal=None,batch_db=False,atten_cache=None,coverage_index=None):
     """
     do a series of On Off observations for given set ID
+
+    if pipelined is True, the attenuation write of each recording is handed
+    to a background worker as soon as the capture finishes, so the DB round
+    trip overlaps the slew to the next position. All background writes must
+    succeed before the recordings are marked as OK
+
+    if batch_db is True, the attenuation values are not written after each
+    recording, but together with the OK status of the whole series, in a
+    single transaction, and pipelined is ignored
+
+    if journal (an onoff_journal.Journal) is given, each recording and the
+    final OK are appended to it
+
+    if atten_cache (an onoff_atten_cache.AttenCache) is given, the
+    attenuators are seeded with the cached values before setRMS and its
+    result is stored back
+
+    if coverage_index (an onoff_db.CoverageIndex) is given, the series is
+    marked as measured in it once it is OK
     """
     logger= logger_defaults.getModuleLogger(__name__)
 
@@ -58,30 +112,115 @@ def onoff_observations(ant_dict,obs_set_id,freq,fpga_file,source,repetitions,nca
         raise RuntimeError("no set id")
 
     obsids = []
-    for rep in range(repetitions):
-        for on_or_off in ["on", "off"]:
-            ants = snap_array_helpers.dict_values_to_comma_string(ant_dict)
-            logger.info("pointing antennas {} to position {}".format(ants,on_or_off))
-            ata_control.point_ants(on_or_off, ants)
-            desc = "{} repetition {}".format(on_or_off.upper(),rep)
-            filefragment = "{0!s}_{1:03d}".format(on_or_off,rep)
-            if(on_or_off == "on" and rep == 0):
-                attendict = snap_observations.setRMS(ant_dict,fpga_file,default_rms)
-            if(on_or_off == "on"):
-                caz = 0.0
-                cel = 0.0
-            else:
-                caz = az_offset
-                cel = el_offset
-            cobsid = snap_observations.record_same(ant_dict,freq,source,ncaptures,
-                    "ON-OFF","ataonoff",desc,filefragment,"SNAP",caz,cel,fpga_file,obs_set_id)
-
-            obs_db.updateAttenVals(cobsid,attendict)
-            obsids.append(cobsid)
+    atten_list = []
+    pending = []
+    #single worker, so the DB writes are still done in the recording order
+    executor = new_executor(1) if (pipelined and not batch_db) else None
+    try:
+        for rep in range(repetitions):
+            for on_or_off in ["on", "off"]:
+                ants = snap_array_helpers.dict_values_to_comma_string(ant_dict)
+                logger.info("pointing antennas {} to position {}".format(ants,on_or_off))
+                onoff_trace.traced("point_"+on_or_off,ata_control.point_ants,on_or_off,ants)
+                desc = "{} repetition {}".format(on_or_off.upper(),rep)
+                filefragment = "{0!s}_{1:03d}".format(on_or_off,rep)
+                if(on_or_off == "on" and rep == 0):
+                    if atten_cache:
+                        seed_antpols,seed_attens = atten_cache.seed(ant_dict,source,freq)
+                        if seed_antpols:
+                            logger.info("seeding attenuators {} with {}".format(seed_antpols,seed_attens))
+                            onoff_trace.traced("seed_atten",ata_control.set_atten_thread,seed_antpols,seed_attens)
+                    attendict = onoff_trace.traced("setRMS",snap_observations.setRMS,ant_dict,fpga_file,default_rms)
+                    if atten_cache:
+                        atten_cache.store(attendict,source,freq)
+                        atten_cache.save()
+                if(on_or_off == "on"):
+                    caz = 0.0
+                    cel = 0.0
+                else:
+                    caz = az_offset
+                    cel = el_offset
+                cobsid = onoff_trace.traced("record_same",snap_observations.record_same,ant_dict,freq,source,ncaptures,
+                        "ON-OFF","ataonoff",desc,filefragment,"SNAP",caz,cel,fpga_file,obs_set_id)
+
+                if batch_db:
+                    atten_list.append((cobsid,attendict))
+                elif executor:
+                    pending.append(executor.submit(onoff_trace.traced,"updateAttenVals",obs_db.updateAttenVals,
+                        cobsid,attendict))
+                else:
+                    onoff_trace.traced("updateAttenVals",obs_db.updateAttenVals,cobsid,attendict)
+                obsids.append(cobsid)
+                if journal:
+                    journal.record_unit(ant_dict,freq,rep,on_or_off,cobsid)
+
+        #barrier: re-raises the first failed background write, if any
+        for job in pending:
+            job.result()
+    finally:
+        if executor:
+            executor.shutdown(wait=True)
     
     #if we got to this point without raising an exception, we are marking all measurements as OK
     logger.info("marking observations {} as OK".format(', '.join(map(str,obsids))))
-    obs_db.markRecordingsOK(obsids)
+    if batch_db:
+        onoff_trace.traced("write_onoff_series",onoff_db.write_onoff_series,atten_list,obsids)
+    else:
+        onoff_trace.traced("markRecordingsOK",obs_db.markRecordingsOK,obsids)
+    if journal:
+        journal.record_ok(ant_dict,freq,obsids)
+    if coverage_index:
+        coverage_index.mark_ok(ant_dict,freq,source)
+
+def timed_set_freq(retune_cost,from_freq,freq,ants):
+    """
+    sets the sky frequency and focus, feeding the time it took to the
+    retune cost model. retune_cost is None when set_freq runs together
+    with other setup steps, as that time is skewed by the contention
+    """
+    tstart = now()
+    result = ata_control.set_freq(freq,ants)
+    if retune_cost:
+        retune_cost.add_sample(from_freq,freq,now() - tstart)
+    return result
+
+def greedy_obs_rounds(obs_set_id,pointings,ant_groups,freq_list,retune_cost=None,coverage_index=None):
+    """
+    yields the antenna dictionary and frequency list of the next antennas
+    to observe, asking the database (or coverage_index, if given) again
+    once they were observed. Note that it alters the ant_groups!
+    """
+    logger= logger_defaults.getModuleLogger(__name__)
+
+    from_freq = None
+    while(1):
+        #gets a antenna dictionary and 
+        get_obs_params = coverage_index.get_obs_params if coverage_index else onoff_db.get_obs_params
+        curr_ant_dict,curr_freq_list = onoff_trace.traced("get_obs_params",get_obs_params,
+                obs_set_id,pointings,ant_groups,freq_list)
+        
+        #if None, it meast that all was measured
+        if not curr_ant_dict:
+            logger.info("all seems to be measured")
+            return
+
+        #each group starts close to the frequency the previous one ended on
+        curr_freq_list = onoff_planner.order_frequencies(curr_freq_list,from_freq,retune_cost)
+        from_freq = curr_freq_list[-1]
+        yield curr_ant_dict,curr_freq_list
+
+        #now, we believe we have measured all frequencies for curr_ant_dict, so we may
+        #remove the content of it from our original ant_groups.
+        onoff_db.remove_antennas_from_dict(ant_groups,curr_ant_dict);
+
+def notify(notifier,subject,message,slack=True,slackmsg=None):
+    """
+    queues the e-mail and, if slack is True, the Slack post of the message
+    (or slackmsg) on the notifier (an onoff_notify.NotificationDispatcher)
+    """
+    notifier.mail(subject,message)
+    if slack:
+        notifier.slack(slackmsg or message)
 
 def remove_dups(duplicate): 
     final_list = list(set(duplicate))
@@ -120,9 +259,32 @@ def main():
                         help ="log to screen, not to file")
     parser.add_option('-m', '--mail', dest='mail', action="store", default=None,
                         help ="The recipient e-mail address (if different from default)")
+    parser.add_option('--concurrent-setup', dest='concurrent_setup', action="store_true", default=False,
+                        help ="Run the rf switch and frequency setup while the antennas slew and autotune, instead of one after another")
+    parser.add_option('--greedy', dest='greedy', action="store_true", default=False,
+                        help ="Pick the next antennas from the database after each group instead of planning the whole set")
+    parser.add_option('--trace', dest='trace', type=str, action="store", default=None,
+                        help ="Append per phase timing spans to this JSON lines file (see onoff_trace.py)")
+    parser.add_option('--journal', dest='journal', type=str, action="store", default=None,
+                        help ="Directory of the local set journals. With -i, resume from the journal without querying the database")
+    parser.add_option('--batch-db', dest='batch_db', action="store_true", default=False,
+                        help ="Write the attenuations and the OK status of each on-off series in one transaction")
+    parser.add_option('--atten-cache', dest='atten_cache', type=str, action="store", default=None,
+                        help ="File caching the attenuations found by setRMS, used to seed the next tunings")
+    parser.add_option('--stub-notifications', dest='stub_notifications', action="store_true", default=False,
+                        help ="Only log the e-mail and Slack notifications, do not send them")
+    parser.add_option('--prior-sets', dest='prior_sets', type=str, action="store", default=None,
+                        help ="Comma separated IDs of earlier sets, what they measured is not observed again")
+    parser.add_option('--db-stats', dest='db_stats', type=str, action="store", default=None,
+                        help ="Write the database call statistics (latency, rows, slow queries) to this JSON file")
+    parser.add_option('--pipelined', dest='pipelined', action="store_true", default=False,
+                        help ="Overlap the DB writes of each recording with the next antenna pointing")
 
     (options,args) = parser.parse_args()
 
+    if options.pipelined and options.batch_db:
+        parser.error("--pipelined has no effect with --batch-db, which writes the attenuations with the OK status")
+
     if(options.verbose):
         loglevel=logging.INFO
     else:
@@ -146,6 +308,14 @@ def main():
             ant_str = configParser.get('measurement', 'antennas')
             freq_str = configParser.get('measurement', 'freq')
             pointings_str = configParser.get('measurement', 'sources')
+            cost_model = onoff_planner.CostModel.from_config(configParser)
+            onoff_dbstats.from_config(configParser)
+            #record_same writes to the obs database itself, a real run can not use the stand-in
+            if onoff_sqlite.from_config(configParser):
+                raise RuntimeError("the sqlite database backend of {} is for offline runs only "
+                    "(onoff_sim.py, onoff_report.py)".format(options.configfile))
+        else:
+            cost_model = onoff_planner.CostModel()
     except:
         logger.exception("config file exception")
         raise
@@ -153,6 +323,9 @@ def main():
     if options.mail:
         ATAComm.setRecipient(options.mail)
 
+    if options.trace:
+        onoff_trace.start_trace(options.trace)
+
     if options.ants:
         ant_str = options.ants
     else: 
@@ -164,12 +337,22 @@ def main():
         #todo: check if that ID exits
         try: 
             obs_set_id = options.obs_set
-            obs_db.getSetData(obs_set_id)
+            onoff_trace.traced("getSetData",obs_db.getSetData,obs_set_id)
         except:
             logger.error("Data set id {} does not exist".format(obs_set_id))
             raise 
     else:
-        obs_set_id = obs_db.getNewObsSetID("OnOff observation")
+        obs_set_id = onoff_trace.traced("getNewObsSetID",obs_db.getNewObsSetID,"OnOff observation")
+
+    if options.journal:
+        journal = onoff_journal.Journal.for_set(options.journal,obs_set_id)
+    else:
+        journal = None
+
+    if options.atten_cache:
+        atten_cache = onoff_atten_cache.AttenCache(options.atten_cache)
+    else:
+        atten_cache = None
 
     if options.freqs:
         freq_str = options.freqs
@@ -191,21 +374,47 @@ def main():
 
     repetitions = options.repetitions
     ncaptures = options.ncaptures
+
+    if options.prior_sets:
+        prior_sets = [int(setid) for setid in snap_array_helpers.string_to_array(options.prior_sets)]
+    else:
+        prior_sets = None
     
     #TODO: we may need to modify this to add a verbosity/send mail/slack flags
-    doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repetitions,ncaptures,obs_set_id,options.fpga_file)
+    doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repetitions,ncaptures,obs_set_id,options.fpga_file,
+            pipelined=options.pipelined,concurrent_setup=options.concurrent_setup,
+            greedy=options.greedy,cost_model=cost_model,journal=journal,batch_db=options.batch_db,
+            atten_cache=atten_cache,stub_notifications=options.stub_notifications,prior_sets=prior_sets,db_stats=options.db_stats)
 
     exit()
 
-def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repetitions,ncaptures,obs_set_id,fpga_file):
+def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repetitions,ncaptures,obs_set_id,fpga_file,pipelined=False,concurrent_setup=False,
+        greedy=False,cost_model=None,journal=None,batch_db=False,atten_cache=None,
+        stub_notifications=False,prior_sets=None,db_stats=None):
+    """
+    observes all the antennas of ant_str on all the frequencies of freq_str.
+    ant_str may also list single pols, e.g. "2a,3bx" (see onoff_antpols),
+    the whole antennas are recorded.
+    What was measured in the prior_sets (a list of set IDs) is not
+    observed again. The database call statistics are logged at the end,
+    and written as JSON to the db_stats file, if given
+    """
 
     logger = logger_defaults.getModuleLogger(__name__)
+    onoff_trace.set_context(set=obs_set_id)
+
+    if pipelined and batch_db:
+        logger.warning("pipelined has no effect with batch_db, the attenuations are written with the OK status")
+        pipelined = False
 
     ant_list = snap_array_helpers.string_to_array(ant_str);
     pointings = snap_array_helpers.string_to_array(pointings_str);
     freq_list = snap_array_helpers.string_to_numeric_array(freq_str);
     ant_list = remove_dups(ant_list)
     full_ant_str = snap_array_helpers.array_to_string(ant_list)
+    if any(onoff_antpols.is_antpol(ant) for ant in ant_list):
+        logger.info("single pols in {}, their whole antennas are recorded".format(full_ant_str))
+        ant_list = onoff_antpols.antennas(ant_list)
 
 
     info_string = ("OnOff Started\nDataset ID {7}\n\nAnts: {0!s}\nFreq: {1!s}\n"
@@ -214,15 +423,19 @@ def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repe
 
     logger.info(info_string)
     logger.warning("Communication disabled, edit code")
-    ATAComm.sendMail("SNAP Obs started",info_string)
-    ATAComm.postSlackMsg(info_string)
+    if stub_notifications:
+        notifier = onoff_notify.NotificationDispatcher(onoff_notify.StubSink())
+    else:
+        notifier = onoff_notify.NotificationDispatcher(onoff_notify.ATACommSink(ATAComm))
+    notify(notifier,"SNAP Obs started",info_string)
 
     try:
         ant_groups = ata_control.get_snap_dictionary(ant_list)
     except:
         logstr = "unable to match antennas with snaps"
         logger.exception(logstr)
-        ATAComm.sendMail("SNAP Obs exception",logstr)
+        notify(notifier,"SNAP Obs exception",logstr,slack=False)
+        notifier.shutdown()
         raise
 
     #getting the antennas. From now on we can modify any antenna parameters
@@ -233,7 +446,8 @@ def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repe
     except:
         logstr = "unable to reserve the antennas"
         logger.exception(logstr)
-        ATAComm.sendMail("SNAP Obs exception",logstr)
+        notify(notifier,"SNAP Obs exception",logstr,slack=False)
+        notifier.shutdown()
         raise
 
     # For each SNAP. set the minicircuits attenuators to 12.0
@@ -251,29 +465,68 @@ def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repe
     except:
         logstr = "unable to set attenuators"
         logger.exception(logstr)
-        ATAComm.sendMail("SNAP Obs exception",logstr)
+        notify(notifier,"SNAP Obs exception",logstr,slack=False)
         ata_control.release_antennas(ant_list, True)
+        notifier.shutdown()
         raise
 
     current_source = None
     new_antennas = True
 
     logger.info("starting observations")
+    tstart = now()
     
+    cost_model = cost_model or onoff_planner.CostModel()
+    retune_cost = onoff_planner.MeasuredRetuneCost(cost_model.retune,cost_model.retune_per_mhz)
+    cost_model.retune_cost = retune_cost
+    curr_tuned_freq = None
+    coverage_index = None
+
+    query_ants = onoff_db.query_antennas(ant_groups)
+
     try:
         ata_control.try_on_lnas(ant_list)
-        while(1):
-            new_antennas = True
-            #gets a antenna dictionary and 
-            curr_ant_dict,curr_freq_list = onoff_db.get_obs_params(obs_set_id,pointings,ant_groups,freq_list)
-            
-            #if None, it meast that all was measured
-            if not curr_ant_dict:
+        if greedy:
+            if prior_sets:
+                fetch = lambda: onoff_db.source_rows(onoff_db.get_bulk_coverage([obs_set_id] + prior_sets,
+                    None,query_ants))
+            else:
+                fetch = lambda: onoff_db.get_source_coverage(obs_set_id,query_ants)
+            #loaded once, then kept up to date as the series are marked OK
+            coverage_index = onoff_trace.traced("load_coverage_index",onoff_db.CoverageIndex,fetch,
+                    tolerance=cost_model.freq_tolerance,clock=now)
+            obs_rounds = greedy_obs_rounds(obs_set_id,pointings,ant_groups,freq_list,retune_cost,coverage_index)
+        elif journal and journal.existed:
+            #the database is only checked in the background, for measurements
+            #missing in the journal
+            logger.info("resuming set {} from journal {}".format(obs_set_id,journal.filename))
+            coverage = journal.coverage()
+            if prior_sets:
+                prior = onoff_trace.traced("get_bulk_coverage",onoff_db.get_bulk_coverage,prior_sets,None,query_ants)
+                for ant,freqs in onoff_db.merge_coverage(prior).items():
+                    coverage.setdefault(ant,set()).update(freqs)
+            obs_rounds = onoff_planner.plan_observations(coverage,ant_groups,freq_list,cost_model)
+            journal.reconcile_async(lambda: onoff_db.get_meas_arrays(obs_set_id,query_ants).coverage())
+        else:
+            obs_rounds = onoff_trace.traced("get_obs_plan",onoff_db.get_obs_plan,
+                    obs_set_id,pointings,ant_groups,freq_list,cost_model,prior_sets)
+
+        if not greedy:
+            if not obs_rounds:
                 logger.info("all seems to be measured")
-                break
+            if journal:
+                journal.record_plan(obs_rounds)
+
+        for curr_ant_dict,curr_freq_list in obs_rounds:
+            new_antennas = True
 
             for curr_freq in curr_freq_list:
 
+                if journal and journal.is_measured(curr_ant_dict,curr_freq):
+                    logger.info("{} already measured on {}, skipping".format(
+                        snap_array_helpers.dict_values_to_comma_string(curr_ant_dict),curr_freq))
+                    continue
+
                 current_source,was_changed = ata_positions.ATAPositions.getPreferedSourceUp(current_source,pointings)
 
                 if not current_source:
@@ -284,53 +537,74 @@ def doOnOffObservations(ant_str,freq_str, pointings_str,az_offset,el_offset,repe
 
                 #we either changed antennas or changed source.
                 #need to generate the ephemeris and autotune PAMs
+                onoff_trace.set_context(source=current_source,freq=curr_freq)
+                setup_steps = []
                 if was_changed:
                     #if we only switched the antennas, we don't need to regenerate
                     # the ephemeris
                     logger.info("source changed to {}".format(current_source))
-                    ata_control.create_ephems(current_source, az_offset, el_offset);
+                    setup_steps.append(onoff_setup.SetupStep("create_ephems",ata_control.create_ephems,
+                        (current_source, az_offset, el_offset)))
 
                 if( was_changed or new_antennas):
                     logger.info("need to (re)run autotune")
                     curr_ant_list = snap_array_helpers.dict_to_list(curr_ant_dict)
                     curr_ant_string = snap_array_helpers.array_to_string(curr_ant_list)
 
-                    logger.info("pointing the antennas")
-                    ata_control.point_ants("on", curr_ant_string );
-                    logger.info("autotuning")
-                    ata_control.autotune(curr_ant_string)
-                    ata_control.rf_switch_thread(curr_ant_list)
+                    #autotune needs the antennas on source, the rf switches
+                    #and the focus do not depend on the pointing
+                    setup_steps.append(onoff_setup.SetupStep("point_ants",ata_control.point_ants,
+                        ("on", curr_ant_string), deps=["create_ephems"]))
+                    setup_steps.append(onoff_setup.SetupStep("autotune",ata_control.autotune,
+                        (curr_ant_string,), deps=["point_ants"]))
+                    setup_steps.append(onoff_setup.SetupStep("rf_switch",ata_control.rf_switch_thread,
+                        (curr_ant_list,)))
                     new_antennas = False
 
                 logger.info("changing to frequency {}".format(curr_freq))
-                ata_control.set_freq(curr_freq, curr_ant_string)
-
-                onoff_observations(curr_ant_dict,obs_set_id,curr_freq,fpga_file,current_source,repetitions,ncaptures,az_offset,el_offset)
+                #the retune is only timed when it runs alone
+                timed_cost = retune_cost if (not concurrent_setup or not setup_steps) else None
+                setup_steps.append(onoff_setup.SetupStep("set_freq",timed_set_freq,
+                    (timed_cost, curr_tuned_freq, curr_freq, curr_ant_string)))
+                setup_executor = new_executor(len(setup_steps)) if concurrent_setup else None
+                try:
+                    onoff_setup.run_steps(setup_steps,concurrent=concurrent_setup,executor=setup_executor)
+                finally:
+                    if setup_executor:
+                        setup_executor.shutdown(wait=True)
+                curr_tuned_freq = curr_freq
+
+                onoff_trace.traced("onoff_series",onoff_observations,curr_ant_dict,obs_set_id,curr_freq,fpga_file,
+                        current_source,repetitions,ncaptures,az_offset,el_offset,pipelined,journal,batch_db,
+                        atten_cache,coverage_index)
                 #snap_control.do_onoff_obs(args.hosts, \
                 #    "/home/sonata/dev/ata_snap/snap_adc5g_spec/outputs/snap_adc5g_spec_2018-06-23_1048.fpg", \
                 #    source, args.ncaptures, args.repetitions, ants_to_observe, freq, obsid, 0.0, 10.0)
-    
-            #now, we believe we have measured all frequencies for curr_ant_dict, so we may
-            #remove the content of it from our original ant_groups. Note that this function
-            #alters the ant_groups!
-            onoff_db.remove_antennas_from_dict(ant_groups,curr_ant_dict);
-            
-    
-        ATAComm.sendMail("SNAP Obs End","Finishing measurements - success")
-        ATAComm.postSlackMsg("Finishing measurements - success")
+
+        logger.info(retune_cost.summary())
+        endmsg = "Finishing measurements - success, set {} took {:.0f} s".format(obs_set_id,now() - tstart)
+        logger.info(endmsg)
+        notify(notifier,"SNAP Obs End",endmsg)
     except KeyboardInterrupt:
         logger.info("Keyboard interuption")
-        ATAComm.sendMail("SNAP Obs End","Finishing measurements - keyboard interrupt, obsid {}".format(obs_set_id))
-        ATAComm.postSlackMsg("Finishing measurements - keyboard interrupt")
+        notify(notifier,"SNAP Obs End","Finishing measurements - keyboard interrupt, obsid {}".format(obs_set_id),
+                slackmsg="Finishing measurements - keyboard interrupt")
     except Exception as e:
         logger.exception("something went wrong")
         errmsg = "Finishing measurements - failed, obsid {}: {}".format(obs_set_id,e)
-        ATAComm.sendMail("SNAP Obs End",errmsg)
-        ATAComm.postSlackMsg(errmsg)
+        notify(notifier,"SNAP Obs End",errmsg)
         raise
     finally: 
         logger.info("shutting down")
-        ata_control.release_antennas(ant_list, True)
+        onoff_trace.traced("release_antennas",ata_control.release_antennas,ant_list,True)
+        onoff_trace.set_context(set=None,source=None,freq=None)
+        if journal:
+            journal.close()
+        logger.info(onoff_dbstats.stats.format_summary())
+        if db_stats:
+            onoff_dbstats.stats.write_summary(db_stats)
+        #the antennas are released first, a slow mail server can not delay it
+        notifier.shutdown()
         #ata_control.release_antennas(ant_list, False)
         #logger.warning("not parking the antennas!")
 
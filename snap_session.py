@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+persistent CasperFpga sessions, one per SNAP, for a whole observing run
+
+a session connects to its SNAP once, parses the design (.fpg) once, reads
+the accumulation length and verifies the FPGA clock, and then keeps the
+connection for all the following captures. The cached design information
+and clock check are only redone when a call on the SNAP fails (the
+connection is dropped and reopened once) or on request (check).
+
+    manager = SessionManager(fpga_file)
+    session = manager.get("snap0")
+    session.record(path,ncaptures,meta)
+
+Created Oct 2026
+"""
+
+import time
+import threading
+
+import numpy as np
+
+from ATATools import logger_defaults
+
+import snap_vacc
+import snap_capture_file
+
+default_srate = 900.0
+default_clock_tolerance = 0.01
+default_clock_checks = 5
+default_retry_delay = 1.0
+default_adc_snapshots = 10
+mux_sel = {'auto':0, 'cross':1}
+
+
+def casper_connect(host):
+    """
+    opens a casperfpga connection, casperfpga is only needed on the
+    observing machines
+    """
+    import casperfpga
+    return casperfpga.CasperFpga(host)
+
+
+class SnapSession(object):
+
+    def __init__(self,host,fpga_file,srate=default_srate,connect=None,clock_tolerance=default_clock_tolerance,
+            clock_checks=default_clock_checks,retry_delay=default_retry_delay,sleep=time.sleep):
+        self.host = host
+        self.fpga_file = fpga_file
+        self.srate = srate
+        self.connect = connect or casper_connect
+        self.clock_tolerance = clock_tolerance
+        self.clock_checks = clock_checks
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+        self.lock = threading.RLock()
+        self.snap = None
+        self.acc_len = None
+        self.fpga_clk = None
+        self.opened = 0
+        self.spectra = None
+
+    def _clock_ok(self,fpga_clk):
+        return np.abs((fpga_clk*4. / self.srate) - 1) < self.clock_tolerance
+
+    def verify_clock(self):
+        """
+        estimates the FPGA clock, retrying clock_checks times one
+        retry_delay apart while it does not match srate
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+
+        fpga_clk = self.snap.estimate_fpga_clock()
+        num_check = 0
+        while not self._clock_ok(fpga_clk) and num_check < self.clock_checks:
+            num_check += 1
+            self.sleep(self.retry_delay)
+            logger.info("{}: estimating FPGA clock retry {}".format(self.host,num_check))
+            fpga_clk = self.snap.estimate_fpga_clock()
+        if not self._clock_ok(fpga_clk):
+            raise RuntimeError("{}: bad clock estimate {:.1f} for sample rate {:.1f}".format(self.host,fpga_clk,
+                self.srate))
+        self.fpga_clk = fpga_clk
+        logger.info("{}: clock estimate is {:.1f}".format(self.host,fpga_clk))
+        return fpga_clk
+
+    def open(self):
+        """
+        connects, reads the design information and verifies the clock
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        with self.lock:
+            logger.info("{}: connecting, design {}".format(self.host,self.fpga_file))
+            snap = self.connect(self.host)
+            snap.get_system_information(self.fpga_file)
+            self.snap = snap
+            try:
+                #integer division, as the recorder always did
+                self.acc_len = float(snap.read_int('timebase_sync_period') // (4096 // 4))
+                self.verify_clock()
+            except:
+                self.invalidate()
+                raise
+            self.opened += 1
+            return snap
+
+    def invalidate(self):
+        """
+        drops the connection, the next call reconnects and verifies again
+        """
+        with self.lock:
+            snap = self.snap
+            self.snap = None
+            self.acc_len = self.fpga_clk = None
+        disconnect = getattr(snap,'disconnect',None)
+        if disconnect:
+            try:
+                disconnect()
+            except Exception:
+                pass
+
+    def check(self):
+        """
+        re-reads the design information and re-verifies the clock now
+        """
+        with self.lock:
+            self.invalidate()
+            return self.open()
+
+    def get(self):
+        """
+        the validated connection, opened if needed
+        """
+        with self.lock:
+            return self.snap if self.snap is not None else self.open()
+
+    def run(self,func,*args,**kwargs):
+        """
+        calls func(session,*args,**kwargs). If it fails, the connection is
+        reopened and validated, and func is called once more
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        with self.lock:
+            try:
+                self.get()
+                return func(self,*args,**kwargs)
+            except Exception as e:
+                logger.warning("{}: {}, reconnecting".format(self.host,e))
+                self.invalidate()
+            self.get()
+            return func(self,*args,**kwargs)
+
+    def read_vacc(self,out=None):
+        """
+        one vacc capture: the (2, channels) auto0 and auto1 spectra, the
+        snapshot time and the overflow counts. out may be the previous
+        spectra array, to be reused
+        """
+        snap = self.get()
+        snap.write_int('vacc_ss_sel',mux_sel['auto'])
+        x,t = snap.snapshots.vacc_ss_ss.read_raw()
+        spectra = snap_vacc.decode_vacc(x['data'],self.acc_len,x['length'],out)
+        auto0_of_count = snap.read_int('power_vacc0_of_count')
+        fft_of0 = snap.read_int('fft_of')
+        auto1_of_count = snap.read_int('power_vacc1_of_count')
+        fft_of1 = snap.read_int('fft_of')
+        return spectra,t,auto0_of_count,auto1_of_count,fft_of0,fft_of1
+
+    def adc_bitsnaps(self,nsnapshots=default_adc_snapshots):
+        """
+        the adc0 and adc1 bitsnaps of nsnapshots ADC snapshots
+        """
+        import adc5g
+        adc0 = []
+        adc1 = []
+        for i in range(nsnapshots):
+            all_chan_data = adc5g.get_snapshot(self.get(),'ss_adc')
+            adc0 += [all_chan_data[0::2][0::2]]
+            adc1 += [all_chan_data[1::2][0::2]]
+        return np.array(adc0),np.array(adc1)
+
+    def record(self,path,ncaptures,meta=None,rfc=None,ifc=None,adc_snapshots=default_adc_snapshots):
+        """
+        records ncaptures vacc captures into a snap_capture_file recording
+        at path, with the ADC bitsnaps of adc_snapshots snapshots. rfc and
+        ifc (MHz), if given, define the frange array. Returns the number
+        of captures written
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+        snap = self.get()
+
+        meta = dict(meta or {})
+        meta.update({'host': self.host, 'fpgfile': self.fpga_file, 'srate': self.srate, 'acc_len': self.acc_len,
+            'fpga_clk': self.fpga_clk, 'fft_shift': snap.read_int('fft_shift'), 'rfc': rfc, 'ifc': ifc})
+        with snap_capture_file.CaptureWriter(path,meta) as writer:
+            if adc_snapshots:
+                adc0,adc1 = self.adc_bitsnaps(adc_snapshots)
+                writer.write_array('adc0_bitsnaps',adc0)
+                writer.write_array('adc1_bitsnaps',adc1)
+                writer.update_meta(adc0_stats={"mean": adc0.mean(), "dev": adc0.std()},
+                        adc1_stats={"mean": adc1.mean(), "dev": adc1.std()})
+            spectra = None
+            for i in range(ncaptures):
+                capture = self.read_vacc(spectra)
+                spectra = capture[0]
+                if i == 0 and rfc is not None and ifc is not None:
+                    writer.write_array('frange',np.linspace(rfc - (self.srate - ifc),
+                        rfc - (self.srate - ifc) + self.srate/2.,2*spectra.shape[1]))
+                writer.write_capture(*capture)
+            logger.info("{}: {} captures written to {}".format(self.host,writer.ncaptures,path))
+            return writer.ncaptures
+
+
+class SessionManager(object):
+    """
+    the sessions of an observing run, one per SNAP host
+    """
+    def __init__(self,fpga_file,srate=default_srate,**kwargs):
+        self.fpga_file = fpga_file
+        self.srate = srate
+        self.kwargs = kwargs
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def get(self,host):
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = SnapSession(host,self.fpga_file,self.srate,**self.kwargs)
+                self.sessions[host] = session
+            return session
+
+    def check_all(self):
+        """
+        re-verifies every open session
+        """
+        for session in list(self.sessions.values()):
+            if session.snap is not None:
+                session.check()
+
+    def close(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+        for session in sessions:
+            session.invalidate()
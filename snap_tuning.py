@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ADC level tuning of the SNAP inputs with the attenuators
+
+the ADC snapshots of a SNAP are collected into a preallocated buffer and
+the RMS of both inputs is computed with one vectorized call. The
+attenuation change is predicted from an attenuator response model, the
+dB of RMS change per dB of attenuation of each antpol. It starts at the
+nominal 1 dB/dB and is refined from the steps actually taken, so the
+target is usually reached in one step, or in two when the model was off.
+The SNAPs of a group are tuned concurrently. The antennas without an
+attenuator are tuned with their PAMs.
+
+the result has the setRMS format, a recording label to [x, y]
+attenuations dictionary:
+
+    sessions = snap_session.SessionManager(fpga_file)
+    attendict = tune_group(ant_dict,make_tuner(sessions))
+
+Created Oct 2026
+"""
+
+import os
+import json
+import math
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ATATools import logger_defaults
+
+import onoff_antpols
+
+default_target_rms = 12.0
+default_tolerance = 1.0
+default_max_steps = 4
+default_snapshots = 5
+min_atten = 0.0
+max_atten = 30.0
+#attenuators have 0.25 dB steps
+atten_step = 0.25
+
+TuneResult = namedtuple('TuneResult', ['attens', 'rms', 'steps', 'converged'])
+
+
+def quantize(atten):
+    """
+    the closest attenuator setting
+    """
+    return min(max(round(atten / atten_step) * atten_step,min_atten),max_atten)
+
+
+def rms_error(rms,target_rms):
+    """
+    dB the RMS is above the target
+    """
+    return 20.0 * math.log10(max(rms,1e-6) / target_rms)
+
+
+class AttenResponse(object):
+    """
+    dB of RMS change per dB of attenuation, per antpol. The last slope
+    measured over a change of at least min_change dB is used, clipped to
+    [min_slope, max_slope], and kept in filename, if given, for the next
+    runs
+    """
+    def __init__(self,filename=None,nominal=1.0,min_slope=0.25,max_slope=2.0,min_change=1.0):
+        self.filename = filename
+        self.nominal = nominal
+        self.min_slope = min_slope
+        self.max_slope = max_slope
+        self.min_change = min_change
+        self.lock = threading.Lock()
+        self.slopes = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                self.slopes = json.load(f)
+
+    def slope(self,antpol):
+        return self.slopes.get(antpol,self.nominal)
+
+    def observe(self,antpol,atten0,rms0,atten1,rms1):
+        """
+        updates the slope of antpol from two (attenuation, RMS) points.
+        Smaller changes than min_change dB are too noisy and ignored
+        """
+        if abs(atten1 - atten0) < self.min_change or rms0 <= 0 or rms1 <= 0:
+            return
+        measured = -20.0 * math.log10(rms1 / rms0) / (atten1 - atten0)
+        measured = min(max(measured,self.min_slope),self.max_slope)
+        with self.lock:
+            self.slopes[antpol] = measured
+
+    def next_atten(self,antpol,atten,rms,target_rms):
+        """
+        the attenuator setting predicted to give target_rms
+        """
+        return quantize(atten + rms_error(rms,target_rms) / self.slope(antpol))
+
+    def save(self):
+        if not self.filename:
+            return
+        tmpname = self.filename + ".tmp"
+        with self.lock, open(tmpname,'w') as f:
+            json.dump(self.slopes,f)
+        os.replace(tmpname,self.filename)
+
+
+class AdcSampler(object):
+    """
+    collects nsnapshots ADC snapshots (from the snapshot function) into a
+    preallocated buffer and returns the mean and RMS of both inputs. The
+    snapshot interleaves the inputs and their cores: x, y, x, y, ..., of
+    which every other pair is used, as the recorder always did
+    """
+    def __init__(self,snapshot,nsnapshots=default_snapshots):
+        self.snapshot = snapshot
+        self.nsnapshots = nsnapshots
+        self.buffer = None
+
+    def sample(self):
+        for i in range(self.nsnapshots):
+            data = self.snapshot()
+            nsamples = len(data) // 4
+            if self.buffer is None or self.buffer.shape[2] != nsamples:
+                self.buffer = np.empty((self.nsnapshots,2,nsamples),dtype=np.float64)
+            #strided slices, only the used samples are converted
+            self.buffer[i,0] = data[0:4 * nsamples:4]
+            self.buffer[i,1] = data[1:4 * nsamples:4]
+        return self.buffer.mean(axis=(0,2)),self.buffer.std(axis=(0,2))
+
+
+class SnapTuner(object):
+    """
+    tunes the inputs of one SNAP. set_atten(antpols, attens) sets the
+    attenuators of the antpols
+    """
+    def __init__(self,sampler,set_atten,response=None,target_rms=default_target_rms,tolerance=default_tolerance,
+            max_steps=default_max_steps):
+        self.sampler = sampler
+        self.set_atten = set_atten
+        self.response = response or AttenResponse()
+        self.target_rms = target_rms
+        self.tolerance = tolerance
+        self.max_steps = max_steps
+
+    def _settled(self,atten,rms):
+        error = rms_error(rms,self.target_rms)
+        if abs(error) <= self.tolerance:
+            return True
+        #nothing more to do at the end of the attenuator range
+        return (error < 0 and atten <= min_atten) or (error > 0 and atten >= max_atten)
+
+    def tune(self,label,attens=None):
+        """
+        tunes the inputs of the label ("2a", or "2ax" for the x input only)
+        from the starting [x, y] attenuations (e.g. cached ones). Returns
+        a TuneResult with the [x, y] attenuations, the last RMS of the
+        inputs and the number of steps
+        """
+        logger = logger_defaults.getModuleLogger(__name__)
+
+        inputs = onoff_antpols.input_antpols(label)
+        used = [n for n,pol in enumerate(onoff_antpols.pols) if pol in inputs]
+        antpols = [inputs[onoff_antpols.pols[n]] for n in used]
+        attens = [quantize(a) for a in (attens or [min_atten,min_atten])]
+        previous = None
+        for step in range(1,self.max_steps + 1):
+            self.set_atten(antpols,[attens[n] for n in used])
+            mean,rms = self.sampler.sample()
+            logger.info("{}: attens {} mean {} rms {}".format(label,attens,mean[used],rms[used]))
+            if previous:
+                for n,antpol in zip(used,antpols):
+                    self.response.observe(antpol,previous[0][n],previous[1][n],attens[n],rms[n])
+            if all(self._settled(attens[n],rms[n]) for n in used):
+                return TuneResult(attens,rms.tolist(),step,True)
+            if step == self.max_steps:
+                break
+            previous = (list(attens),rms)
+            for n,antpol in zip(used,antpols):
+                attens[n] = self.response.next_atten(antpol,attens[n],rms[n],self.target_rms)
+        logger.warning("{}: RMS {} not within {} dB of {} after {} steps".format(label,rms[used],self.tolerance,
+            self.target_rms,self.max_steps))
+        return TuneResult(attens,rms.tolist(),self.max_steps,False)
+
+
+def _tune_snap(tuner_for,snap,label,attens):
+    return tuner_for(snap).tune(label,attens)
+
+def tune_group(ant_dict,tuner_for,start_attens=None,max_workers=None):
+    """
+    tunes the SNAPs of ant_dict (SNAP to recording label) concurrently.
+    tuner_for(snap) returns the SnapTuner of a SNAP, start_attens maps a
+    label to its starting [x, y] attenuations. Returns the label to
+    [x, y] attenuations dictionary, and the TuneResults per SNAP. A SNAP
+    whose tuning raised has the exception as its result and no
+    attenuations, the other SNAPs are tuned all the same
+    """
+    logger = logger_defaults.getModuleLogger(__name__)
+
+    start_attens = start_attens or {}
+    snaps = list(ant_dict.keys())
+    if not snaps:
+        return {},{}
+    with ThreadPoolExecutor(max_workers=max_workers or len(snaps)) as executor:
+        futures = dict((sk,executor.submit(_tune_snap,tuner_for,sk,ant_dict[sk],start_attens.get(ant_dict[sk])))
+                for sk in snaps)
+    results = {}
+    for sk,future in futures.items():
+        try:
+            results[sk] = future.result()
+        except Exception as e:
+            logger.error("{}: tuning of {} failed: {!r}".format(sk,ant_dict[sk],e))
+            results[sk] = e
+    return dict((ant_dict[sk],results[sk].attens) for sk in snaps if isinstance(results[sk],TuneResult)),results
+
+
+class AttenSetter(object):
+    """
+    set_atten function of SnapTuner with ata_control.set_atten. When
+    set_atten answers that there is no attenuator for the antennas, their
+    PAMs are set instead (atasetpams, both pols at once), as the recorder
+    always did. The PAM settings of the pols not being tuned are kept
+    """
+    def __init__(self,ata_control):
+        self.ata_control = ata_control
+        self.lock = threading.Lock()
+        self.pam_attens = {}
+
+    def __call__(self,antpols,attens):
+        logger = logger_defaults.getModuleLogger(__name__)
+
+        answer = self.ata_control.set_atten(antpols,attens)
+        if "no attenuator for" not in (answer or ""):
+            return
+        with self.lock:
+            for antpol,atten in zip(antpols,attens):
+                self.pam_attens[antpol] = atten
+            values = dict((ant,[self.pam_attens.get(ant + pol,min_atten) for pol in onoff_antpols.pols])
+                    for ant in onoff_antpols.antennas(antpols))
+        for ant,(attenx,atteny) in values.items():
+            logger.info("{}: no attenuator connected, setting the pams to {},{}".format(ant,attenx,atteny))
+            self.ata_control.set_pam_attens(ant,attenx,atteny)
+
+
+def make_tuner(sessions,response=None,target_rms=default_target_rms,nsnapshots=default_snapshots):
+    """
+    tuner_for function for tune_group, sampling through the snap_session
+    sessions (a SessionManager) and setting the attenuators, or the PAMs
+    of the antennas without one, with an AttenSetter
+    """
+    from ATATools import ata_control
+    import adc5g
+
+    response = response or AttenResponse()
+    set_atten = AttenSetter(ata_control)
+
+    def tuner_for(snap):
+        session = sessions.get(snap)
+        sampler = AdcSampler(lambda: adc5g.get_snapshot(session.get(),'ss_adc'),nsnapshots)
+        return SnapTuner(sampler,set_atten,response,target_rms)
+
+    return tuner_for
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+decoding of the SNAP vector accumulator (vacc) snapshots
+
+a vacc_ss_ss snapshot is a buffer of big-endian uint32 accumulations,
+interleaved between the two autocorrelations: auto0 of channel 0,
+auto1 of channel 0, auto0 of channel 1, ... The buffer is viewed in
+place as a (channels, 2) uint32 array, without the tuple of Python ints
+struct.unpack builds, and the accumulation length is divided out in a
+single pass into a (2, channels) float64 array, whose rows are the
+contiguous auto0 and auto1 spectra
+
+Created Oct 2026
+"""
+
+import struct
+
+import numpy as np
+
+vacc_dtype = np.dtype('>u4')
+
+
+def vacc_counts(data,length=None):
+    """
+    the raw accumulations of a snapshot buffer as a read only
+    (channels, 2) big-endian uint32 view of data, column 0 being auto0.
+    length (bytes, the snapshot 'length') defaults to the whole buffer
+    """
+    if length is None:
+        length = len(data)
+    count = length // vacc_dtype.itemsize
+    if count % 2:
+        raise ValueError("vacc snapshot of {} words is not a whole number of channel pairs".format(count))
+    return np.frombuffer(data,dtype=vacc_dtype,count=count).reshape(-1,2)
+
+
+def decode_vacc(data,acc_len,length=None,out=None):
+    """
+    the auto0 and auto1 spectra of a snapshot buffer, divided by the
+    accumulation length, as the two rows of a (2, channels) float64
+    array. out, if given, is such an array to fill, so a capture loop can
+    reuse one buffer
+    """
+    counts = vacc_counts(data,length)
+    if out is None:
+        out = np.empty((2,counts.shape[0]),dtype=np.float64)
+    np.divide(counts.T,acc_len,out=out)
+    return out
+
+
+def decode_vacc_unpack(data,acc_len,length=None):
+    """
+    the struct.unpack decoding of retired/snap_record.py, kept as the reference
+    of the tests and the benchmark. Returns the auto0 and auto1 spectra
+    """
+    if length is None:
+        length = len(data)
+    d = np.array(struct.unpack('>%dL' % (length // 4),data[:length])) / acc_len
+    return d[0::2],d[1::2]
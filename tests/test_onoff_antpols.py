@@ -0,0 +1,33 @@
+"""
+Test the onoff_antpols module
+"""
+
+import sys
+
+import unittest
+
+sys.path.append("..")
+import onoff_antpols
+
+class AntpolsTest(unittest.TestCase):
+
+    def test_parse(self):
+
+        assert(onoff_antpols.parse("2a") == ("2a", None))
+        assert(onoff_antpols.parse("2ax") == ("2a", "x"))
+        assert(onoff_antpols.parse("12cy") == ("12c", "y"))
+        assert(onoff_antpols.is_antpol("1hy"))
+        assert(not onoff_antpols.is_antpol("12c"))
+        for name in ["snap0", "2az", "2", "ax", "", "2a,3b"]:
+            with self.assertRaises(ValueError):
+                onoff_antpols.parse(name)
+
+    def test_labels(self):
+
+        assert(onoff_antpols.antpols("2a") == ["2ax", "2ay"])
+        assert(onoff_antpols.antpols("2ax") == ["2ax"])
+        assert(onoff_antpols.antpols("2ax,3by") == ["2ax", "3by"])
+        assert(onoff_antpols.input_antpols("2ay") == {"y" : "2ay"})
+        assert(onoff_antpols.input_antpols("2a") == {"x" : "2ax", "y" : "2ay"})
+        assert(onoff_antpols.antenna("3bx") == "3b")
+        assert(onoff_antpols.antennas(["2a", "2ax", "3by", "4cy"]) == ["2a", "3b", "4c"])
@@ -0,0 +1,52 @@
+"""
+Test the onoff_atten_cache module
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+import unittest
+
+sys.path.append("..")
+import onoff_atten_cache
+
+class AttenCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "atten.json")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def test_store_and_seed(self):
+
+        cache = onoff_atten_cache.AttenCache(self.filename, max_age=3600.0, max_span=2000.0)
+        cache.store({"1a" : [10.0, 12.0]}, "moon", 1400.0, now=1000.0)
+        cache.store({"1a" : [14.0, 16.0]}, "moon", 2400.0, now=1000.0)
+        cache.save()
+
+        cache = onoff_atten_cache.AttenCache(self.filename, max_age=3600.0, max_span=2000.0)
+        assert(cache.lookup("1ax", "moon", 1400.0, now=2000.0) == 10.0)
+        # interpolated between 1400 and 2400 MHz
+        assert(cache.lookup("1ay", "moon", 1900.0, now=2000.0) == 14.0)
+        # outside of the cached frequencies, other source or expired
+        assert(cache.lookup("1ax", "moon", 3000.0, now=2000.0) is None)
+        assert(cache.lookup("1ax", "casa", 1400.0, now=2000.0) is None)
+        assert(cache.lookup("1ax", "moon", 1400.0, now=5000.0) is None)
+
+        antpols, attens = cache.seed({"snap0" : "1a", "snap1" : "2b"}, "moon", 1650.0, now=2000.0)
+        assert(antpols == [["1ax", "1ay"]])
+        assert(attens == [[11.0, 13.0]])
+
+    def test_newer_value_replaces(self):
+
+        cache = onoff_atten_cache.AttenCache(self.filename)
+        cache.store({"1a" : [10.0, 12.0]}, "moon", 1400.0, now=1000.0)
+        cache.store({"1a" : [11.0, 12.5]}, "moon", 1400.5, now=1100.0)
+        assert(cache.lookup("1ax", "moon", 1400.0, now=1200.0) == 11.0)
+        assert(len(cache.entries["1ax|moon"]) == 1)
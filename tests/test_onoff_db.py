@@ -0,0 +1,146 @@
+"""
+Test the onoff_db selection functions
+"""
+
+import sys
+import types
+
+import unittest
+
+sys.path.append("..")
+import onoff_db
+
+class DriverConnection(object):
+    """
+    connection of the driver module, recording the cursor arguments
+    """
+    def __init__(self):
+        self.cursor_args = None
+
+    def cursor(self, *args, **kwargs):
+        self.cursor_args = (args, kwargs)
+
+def driver_connection(module):
+
+    cls = type("Connection", (DriverConnection,), {"__module__" : module})
+    return cls()
+
+class OnoffDbTest(unittest.TestCase):
+
+    def test_unbuffered_cursor(self):
+
+        conn = driver_connection("mysql.connector.connection_cext")
+        onoff_db._unbuffered_cursor(conn)
+        assert(conn.cursor_args == ((), {"buffered" : False}))
+
+        # MySQLdb takes the server side cursor class, without the buffered flag
+        cursors = types.ModuleType("MySQLdb.cursors")
+        cursors.SSCursor = object()
+        mysqldb = types.ModuleType("MySQLdb")
+        mysqldb.cursors = cursors
+        modules = {"MySQLdb" : mysqldb, "MySQLdb.cursors" : cursors}
+        saved = dict((name, sys.modules.get(name)) for name in modules)
+        sys.modules.update(modules)
+        try:
+            conn = driver_connection("MySQLdb.connections")
+            onoff_db._unbuffered_cursor(conn)
+            assert(conn.cursor_args == ((cursors.SSCursor,), {}))
+        finally:
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name)
+                else:
+                    sys.modules[name] = module
+
+        conn = driver_connection("onoff_sqlite")
+        onoff_db._unbuffered_cursor(conn)
+        assert(conn.cursor_args == ((), {}))
+
+    def test_coverage_matches_meas(self):
+
+        meas = {
+            "1a" : {"freq" : [1000.0, 1000.0, 2000.0], "desc" : ["on", "off", "on"],
+                "obsid" : [1, 2, 3], "az" : [0, 0, 0], "el" : [0, 0, 0]},
+            "2a" : {"freq" : [1000.0, 2000.0, 3000.0], "desc" : ["on", "on", "on"],
+                "obsid" : [1, 3, 4], "az" : [0, 0, 0], "el" : [0, 0, 0]}
+            }
+        ant_snap_dictionary = {"snap0" : ["1a", "1b"], "snap1" : ["2a", "2b"]}
+        freq_list = [1000.0, 2000.0, 3000.0]
+
+        coverage = onoff_db.coverage_from_meas(meas)
+        assert(coverage == {"1a" : {1000.0, 2000.0}, "2a" : {1000.0, 2000.0, 3000.0}})
+
+        ant_dict, freqs = onoff_db.obs_params_from_coverage(coverage, ant_snap_dictionary, freq_list)
+        assert(ant_dict == {"snap0" : "1a", "snap1" : "2b"})
+        assert(sorted(freqs) == freq_list)
+        assert(onoff_db.obs_params_from_meas(meas, ant_snap_dictionary, freq_list)[0] == ant_dict)
+
+    def test_coverage_index(self):
+
+        db_rows = [("1a", 1000.0, "moon")]
+        fetches = []
+        def fetch():
+            fetches.append(1)
+            return list(db_rows)
+
+        index = onoff_db.CoverageIndex(fetch, reconcile_interval=None)
+        ant_snap_dictionary = {"snap0" : ["1a", "1b"]}
+        freq_list = [1000.0, 2000.0]
+        assert(index.get_obs_params(1, ["moon"], ant_snap_dictionary, freq_list) == ({"snap0" : "1a"}, [2000.0]))
+
+        index.mark_ok({"snap0" : "1a"}, 2000.0, "moon")
+        assert(index.is_measured("1a", 2000.0, "moon"))
+        assert(not index.is_measured("1a", 2000.0, "casa"))
+        assert(index.get_obs_params(1, ["moon"], ant_snap_dictionary, freq_list) == ({"snap0" : "1b"}, freq_list))
+        assert(len(fetches) == 1)
+
+        # reconciling keeps what the database does not have yet
+        db_rows.append(("1b", 1000.0, "casa"))
+        index.reconcile()
+        assert(index.coverage() == {"1a" : {1000.0, 2000.0}, "1b" : {1000.0}})
+        assert(index.coverage("moon") == {"1a" : {1000.0, 2000.0}})
+        assert(index.local == {("1a", 2000.0, "moon")})
+
+    def test_tolerant_match(self):
+
+        coverage = {"1a" : {1400.0001, 2500.0}, "1b" : {1399.2}}
+        ant_snap_dictionary = {"snap0" : ["1a", "1b"], "snap1" : ["2a"]}
+        freq_list = [2500.0, 1400.0]
+
+        ant_dict, freqs = onoff_db.obs_params_from_coverage(coverage, ant_snap_dictionary, freq_list, 0.5)
+        assert(ant_dict == {"snap0" : "1b", "snap1" : "2a"})
+        assert(freqs == freq_list)
+
+        ant_dict, freqs = onoff_db.obs_params_from_coverage(coverage, ant_snap_dictionary, freq_list, 1.0)
+        assert(ant_dict == {"snap0" : "1b", "snap1" : "2a"})
+        assert(freqs == freq_list)
+
+        ant_dict, freqs = onoff_db.obs_params_from_coverage({"1a" : {2500.0, 1400.0}, "1b" : {2500.0, 1399.2}, "2a" : {2500.0}},
+                ant_snap_dictionary, freq_list, 1.0)
+        assert(ant_dict == {"snap1" : "2a"})
+        assert(freqs == [1400.0])
+
+    def test_repeated_freqs(self):
+
+        # a frequency requested twice is measured once
+        ant_snap_dictionary = {"s0" : ["1a"]}
+        assert(onoff_db.obs_params_from_coverage({}, ant_snap_dictionary, [1400.0, 1400.0, 1400.2]) ==
+                ({"s0" : "1a"}, [1400.0]))
+        assert(onoff_db.obs_params_from_coverage({"1a" : {1400.0}}, ant_snap_dictionary, [1400.0, 1400.0]) ==
+                ({}, []))
+
+    def test_merge_bulk(self):
+
+        bulk = {
+            (1, "moon") : {"1a" : {1000.0}, "2a" : {1000.0}},
+            (1, "casa") : {"1a" : {2000.0}},
+            (2, "moon") : {"1a" : {3000.0}}
+            }
+        assert(onoff_db.merge_coverage(bulk) == {"1a" : {1000.0, 2000.0, 3000.0}, "2a" : {1000.0}})
+        assert(onoff_db.merge_coverage(bulk, setids=[1]) == {"1a" : {1000.0, 2000.0}, "2a" : {1000.0}})
+        assert(onoff_db.merge_coverage(bulk, sources=["moon"]) == {"1a" : {1000.0, 3000.0}, "2a" : {1000.0}})
+        assert(sorted(onoff_db.source_rows(bulk))[0] == ("1a", 1000.0, "moon"))
+
+    def test_query_antennas(self):
+
+        assert(onoff_db.query_antennas({"snap0" : ["1a", "1b"], "snap1" : ["2a"]}) == ["1a", "1b", "2a"])
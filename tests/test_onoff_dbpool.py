@@ -0,0 +1,110 @@
+"""
+Test the onoff_dbpool module
+"""
+
+import sys
+import sqlite3
+
+import unittest
+
+sys.path.append("..")
+import onoff_dbpool
+
+class BrokenConnection(object):
+
+    def cursor(self):
+        raise sqlite3.OperationalError("server has gone away")
+
+    def rollback(self):
+        raise sqlite3.OperationalError("server has gone away")
+
+    def close(self):
+        pass
+
+class SnapshotConnection(object):
+    """
+    REPEATABLE READ without autocommit: the first read of a transaction
+    takes a snapshot of the committed rows, kept until commit or rollback
+    """
+    def __init__(self,committed):
+        self.committed = committed
+        self.snapshot = None
+
+    def read(self):
+        if self.snapshot is None:
+            self.snapshot = list(self.committed)
+        return self.snapshot
+
+    def insert(self,row):
+        self.committed.append(row)
+        self.snapshot = None
+
+    def rollback(self):
+        self.snapshot = None
+
+    def close(self):
+        pass
+
+class DbPoolTest(unittest.TestCase):
+
+    def test_reuse(self):
+
+        pool = onoff_dbpool.ConnectionPool(lambda: sqlite3.connect(":memory:"), maxsize=2)
+        for i in range(5):
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("select 1")
+                assert(cursor.fetchall() == [(1,)])
+        assert(pool.created == 1)
+        assert(pool.reused == 4)
+        pool.close()
+
+    def test_fresh_snapshot(self):
+
+        committed = []
+        pool = onoff_dbpool.ConnectionPool(lambda: SnapshotConnection(committed), maxsize=2)
+        with pool.connection() as conn:
+            assert(conn.read() == [])
+
+        # a row committed on another connection is seen by the reused one
+        writer = SnapshotConnection(committed)
+        writer.insert(1)
+        with pool.connection() as conn:
+            assert(conn.read() == [1])
+        assert(pool.created == 1)
+        pool.close()
+
+    def test_bounded(self):
+
+        pool = onoff_dbpool.ConnectionPool(lambda: sqlite3.connect(":memory:"), maxsize=1, timeout=0.1)
+        conn = pool.acquire()
+        self.assertRaises(RuntimeError, pool.acquire)
+        pool.release(conn)
+        pool.release(pool.acquire())
+        pool.close()
+
+    def test_broken_connection(self):
+
+        connections = [BrokenConnection()]
+        pool = onoff_dbpool.ConnectionPool(lambda: connections.pop() if connections else sqlite3.connect(":memory:"),
+                check_after=0.0)
+
+        # the failing connection is discarded when the block raises
+        try:
+            with pool.connection() as conn:
+                conn.cursor()
+        except sqlite3.OperationalError as e:
+            assert(onoff_dbpool.is_connection_error(e))
+        assert(pool.discarded == 1)
+        assert(not pool.idle)
+
+        # an idle connection failing the health check is replaced
+        with pool.connection() as conn:
+            pass
+        pool.idle = [(BrokenConnection(), 0.0)]
+        pool.max_idle = float("inf")
+        with pool.connection() as conn:
+            conn.cursor().execute("select 1")
+        assert(pool.discarded == 2)
+        assert(pool.created == 3)
+        pool.close()
@@ -0,0 +1,38 @@
+"""
+Test the onoff_dbstats module
+"""
+
+import sys
+
+import unittest
+
+sys.path.append("..")
+import onoff_dbstats
+
+class DbStatsTest(unittest.TestCase):
+
+    def test_record(self):
+
+        stats = onoff_dbstats.DbStats(slow_threshold=1.0)
+        for ms in [0.5, 3.0, 3.0, 40.0]:
+            stats.record("get_coverage", ms / 1000.0, rows=10, nbytes=100)
+        stats.record("get_coverage", 2.0, rows=5, statement="select 1")
+        stats.record("obs_db.markRecordingsOK", 0.001, error=True)
+
+        summary = stats.summary()
+        cstats = summary["calls"]["get_coverage"]
+        assert(cstats["count"] == 5)
+        assert(cstats["rows"] == 45)
+        assert(cstats["bytes"] == 400)
+        assert(cstats["p50_ms"] == 5)
+        assert(cstats["p95_ms"] == 2000)
+        assert(summary["calls"]["obs_db.markRecordingsOK"]["errors"] == 1)
+        assert(len(summary["slow"]) == 1)
+        assert(summary["slow"][0]["statement"] == "select 1")
+        assert("get_coverage" in stats.format_summary())
+
+    def test_render(self):
+
+        assert(onoff_dbstats.render("select a from b where c = %s and d in (%s)", [1, "2a"]) ==
+                "select a from b where c = 1 and d in ('2a')")
+        assert(onoff_dbstats.row_bytes([("2a", 1400.0, None)]) == 10)
@@ -0,0 +1,80 @@
+"""
+Test the onoff_journal module
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+import unittest
+
+sys.path.append("..")
+import onoff_journal
+import onoff_planner
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def test_resume(self):
+
+        journal = onoff_journal.Journal.for_set(self.directory, 12)
+        assert(not journal.existed)
+        ant_dict = {"snap0" : "1a", "snap1" : "2b"}
+        journal.record_plan([onoff_planner.PlanStep(ant_dict, [1400.0, 2500.0])])
+        for rep in range(2):
+            journal.record_unit(ant_dict, 1400.0, rep, "on", 10 + 2 * rep)
+            journal.record_unit(ant_dict, 1400.0, rep, "off", 11 + 2 * rep)
+        journal.record_ok(ant_dict, 1400.0, [10, 11, 12, 13])
+        # a series interrupted by a crash, never marked OK
+        journal.record_unit(ant_dict, 2500.0, 0, "on", 14)
+        journal.close()
+
+        # simulate a line cut by the crash
+        with open(onoff_journal.journal_filename(self.directory, 12), "a") as f:
+            f.write('{"t":"unit","ants":')
+
+        journal = onoff_journal.Journal.for_set(self.directory, 12)
+        assert(journal.existed)
+        assert(journal.coverage() == {"1a" : set([1400.0]), "2b" : set([1400.0])})
+        assert(len(journal.units) == 5)
+        assert(journal.plan == [[ant_dict, [1400.0, 2500.0]]])
+        assert(journal.is_measured(ant_dict, 1400.0))
+        assert(not journal.is_measured(ant_dict, 2500.0))
+
+        # measurements found only in the database are merged
+        journal.merge_db({"1a" : set([2500.0]), "2b" : set([2500.0, 1400.0])})
+        assert(journal.is_measured(ant_dict, 2500.0))
+
+        # records appended after the damaged line are readable
+        journal.record_ok({"snap0" : "1c"}, 1400.0, [20])
+        journal.close()
+        journal = onoff_journal.Journal.for_set(self.directory, 12)
+        assert(journal.coverage()["1c"] == set([1400.0]))
+        journal.close()
+
+    def test_reconcile_errors(self):
+
+        journal = onoff_journal.Journal.for_set(self.directory, 13)
+        journal.record_ok({"snap0" : "1a"}, 1400.0, [1, 2])
+
+        # without the database the journal is used alone
+        def unreachable():
+            raise sqlite3.OperationalError("server has gone away")
+        journal.reconcile_async(unreachable).join()
+        assert(journal.coverage() == {"1a" : {1400.0}})
+
+        # a failing driver call is not hidden
+        def bad_call():
+            raise TypeError("cursor() got an unexpected keyword argument 'buffered'")
+        journal.reconcile_async(bad_call).join()
+        self.assertRaises(TypeError, journal.coverage)
+        journal.close()
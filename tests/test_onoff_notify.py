@@ -0,0 +1,61 @@
+"""
+Test the onoff_notify module
+"""
+
+import sys
+import time
+
+import unittest
+
+sys.path.append("..")
+import onoff_notify
+
+class FailingSink(object):
+
+    def send(self, kind, subject, message):
+        raise RuntimeError("smtp down")
+
+class NotifyTest(unittest.TestCase):
+
+    def test_coalescing(self):
+
+        sink = onoff_notify.StubSink(delay=0.2)
+        dispatcher = onoff_notify.NotificationDispatcher(sink, min_interval=0.0)
+        dispatcher.mail("SNAP Obs started", "set 1")
+        # the first message is being sent, the next ones wait in the queue
+        time.sleep(0.05)
+        for i in range(3):
+            dispatcher.slack("antenna 1a failed")
+        assert(dispatcher.shutdown(timeout=5.0) == 0)
+
+        assert(sink.sent[0] == ("mail", "SNAP Obs started", "set 1"))
+        assert(sink.sent[1] == ("slack", None, "antenna 1a failed\n(repeated 3 times)"))
+        assert(len(sink.sent) == 2)
+
+    def test_bounded_queue(self):
+
+        sink = onoff_notify.StubSink(delay=0.1)
+        dispatcher = onoff_notify.NotificationDispatcher(sink, maxsize=2, min_interval=0.0)
+        for i in range(10):
+            dispatcher.slack("message %d" % i)
+        dispatcher.shutdown(timeout=5.0)
+        assert(dispatcher.dropped > 0)
+        assert(len(sink.sent) + dispatcher.dropped == 10)
+
+    def test_shutdown_timeout(self):
+
+        sink = onoff_notify.StubSink(delay=0.5)
+        dispatcher = onoff_notify.NotificationDispatcher(sink, min_interval=0.0)
+        for i in range(5):
+            dispatcher.slack("message %d" % i)
+        tstart = time.time()
+        unsent = dispatcher.shutdown(timeout=0.2)
+        assert(time.time() - tstart < 0.5)
+        assert(unsent > 0)
+
+    def test_failing_sink(self):
+
+        dispatcher = onoff_notify.NotificationDispatcher(FailingSink(), min_interval=0.0)
+        dispatcher.mail("subject", "message")
+        dispatcher.shutdown(timeout=5.0)
+        assert(dispatcher.failed == 1)
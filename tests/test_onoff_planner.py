@@ -0,0 +1,79 @@
+"""
+Test the onoff_planner module
+"""
+
+import sys
+
+import unittest
+
+sys.path.append("..")
+import onoff_planner
+
+class PlannerTest(unittest.TestCase):
+
+    _freqs = [1400.0, 2500.0, 3500.0, 4500.0]
+    _groups = {
+            "snap0" : ["1a", "1c", "2a"],
+            "snap1" : ["2b", "2h"],
+            "snap2" : ["4j"]}
+
+    def test_empty_coverage(self):
+
+        plan = onoff_planner.plan_observations({}, self._groups, self._freqs)
+        # the longest SNAP queue decides the number of steps
+        assert(len(plan) == 3)
+        for step in plan:
+            assert(sorted(step.freq_list) == self._freqs)
+
+        planned = sorted(a for step in plan for a in step.ant_dict.values())
+        assert(planned == sorted(sum(self._groups.values(), [])))
+
+    def test_groups_similar_antennas(self):
+
+        coverage = {
+                "1a" : self._freqs,
+                "1c" : [1400.0, 2500.0],
+                "2b" : [1400.0, 2500.0],
+                "4j" : self._freqs}
+        plan = onoff_planner.plan_observations(coverage, self._groups, self._freqs)
+
+        assert(len(plan) == 2)
+        # 1c and 2b miss the same frequencies, they should be observed together
+        steps = dict((step.ant_dict["snap0"], step) for step in plan)
+        assert(steps["1c"].ant_dict.get("snap1") == "2b")
+        assert(sorted(steps["1c"].freq_list) == [3500.0, 4500.0])
+        assert("snap2" not in steps["1c"].ant_dict)
+
+    def test_all_measured(self):
+
+        coverage = dict((a, self._freqs) for a in sum(self._groups.values(), []))
+        assert(onoff_planner.plan_observations(coverage, self._groups, self._freqs) == [])
+
+    def test_cost_estimate(self):
+
+        model = onoff_planner.CostModel(group_change=100, retune=10, source_change=50, observation=20,
+                retune_per_mhz=0.0)
+        plan = [onoff_planner.PlanStep({"snap0" : "1a"}, [1400.0, 2500.0])]
+        assert(model.estimate(plan) == 50 + 100 + 2 * 30)
+        assert(model.estimate([]) == 0.0)
+
+    def test_frequency_sweep(self):
+
+        cost = onoff_planner.RetuneCost(fixed=10.0, per_mhz=0.01)
+        freqs = [4500.0, 1400.0, 3500.0, 2500.0]
+        assert(onoff_planner.order_frequencies(freqs, 1000.0, cost) == sorted(freqs))
+        assert(onoff_planner.order_frequencies(freqs, 5000.0, cost) == sorted(freqs)[::-1])
+
+        # serpentine: the second step starts where the first one ended
+        plan = [onoff_planner.PlanStep({"snap0" : "1a"}, freqs),
+                onoff_planner.PlanStep({"snap0" : "1c"}, freqs)]
+        plan = onoff_planner.sequence_plan(plan, 1000.0, cost)
+        assert(plan[0].freq_list[-1] == plan[1].freq_list[0])
+
+    def test_measured_retune_cost(self):
+
+        cost = onoff_planner.MeasuredRetuneCost(fixed=100.0, per_mhz=1.0)
+        for d in [0.0, 1000.0, 2000.0]:
+            cost.add_sample(1400.0, 1400.0 + d, 20.0 + 0.01 * d)
+        assert(abs(cost.fixed - 20.0) < 1e-6)
+        assert(abs(cost.per_mhz - 0.01) < 1e-9)
@@ -0,0 +1,60 @@
+"""
+Test the onoff_report module
+"""
+
+import sys
+
+import unittest
+
+sys.path.append("..")
+import onoff_report
+import onoff_planner
+
+class ReportTest(unittest.TestCase):
+
+    _freqs = [1400.0, 2500.0, 3500.0]
+    _groups = {
+            "snap0" : ["1a", "1c"],
+            "snap1" : ["2b"]}
+
+    def test_progress(self):
+
+        bulk = {
+                (1, "moon") : {"1a" : {1400.0, 2500.0}, "2b" : {1400.0}},
+                (1, "casa") : {"1a" : {3500.0}, "2b" : {1400.0001}},
+                (2, "moon") : {"1c" : {1400.0, 2500.0, 3500.0}}}
+        progress = onoff_report.SetProgress(1, bulk, self._groups, self._freqs, ["moon"])
+
+        assert((progress.done, progress.total) == (4, 9))
+        assert(progress.snaps == [("snap0", 3, 6), ("snap1", 1, 3)])
+        assert(progress.ants == [("1a", 3, 3), ("1c", 0, 3), ("2b", 1, 3)])
+        assert(progress.freqs == [(1400.0, 2, 3), (2500.0, 1, 3), (3500.0, 1, 3)])
+        # sources found in the set but not requested are listed too
+        assert(progress.source_counts == [("moon", 3, 9), ("casa", 2, 9)])
+
+        plan = progress.remaining_plan(onoff_planner.CostModel())
+        assert(sorted(a for step in plan for a in step.ant_dict.values()) == ["1c", "2b"])
+        assert("remaining: 1 antenna group changes, 3 on-off series" in onoff_report.format_progress(progress, plan,
+            onoff_planner.CostModel()))
+
+    def test_measured_cost_model(self):
+
+        spans = [
+                {"name" : "point_ants", "start" : 0.0, "dur" : 20.0, "set" : 1},
+                {"name" : "autotune", "start" : 20.0, "dur" : 30.0, "set" : 1},
+                {"name" : "onoff_series", "start" : 50.0, "dur" : 100.0, "set" : 1},
+                {"name" : "onoff_series", "start" : 150.0, "dur" : 200.0, "set" : 1, "error" : True}]
+        for n, freq in enumerate([1000.0, 2000.0, 4000.0, 8000.0, 1000.0]):
+            distance = abs(freq - [1000.0, 1000.0, 2000.0, 4000.0, 8000.0][n])
+            spans.append({"name" : "set_freq", "start" : 400.0 + n, "dur" : 10.0 + 0.001 * distance,
+                "set" : 1, "freq" : freq})
+        # slowed down by the concurrent pointing, not used for the fit
+        spans.append({"name" : "set_freq", "start" : 410.0, "dur" : 90.0, "set" : 1, "freq" : 2000.0,
+            "concurrent" : True})
+
+        defaults = onoff_planner.CostModel(source_change=77.0)
+        cost_model = onoff_report.measured_cost_model(spans, defaults)
+        assert(cost_model.observation == 100.0)
+        assert(cost_model.group_change == 50.0)
+        assert(cost_model.source_change == 77.0)
+        assert(abs(cost_model.retune_cost(1000.0, 3000.0) - 12.0) < 1e-6)
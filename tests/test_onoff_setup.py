@@ -0,0 +1,94 @@
+"""
+Test the onoff_setup module
+"""
+
+import sys
+import time
+import threading
+
+import unittest
+
+sys.path.append("..")
+import onoff_setup
+
+class Calls(object):
+    """
+    records the start and end of the setup calls
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def step(self,name,seconds=0.0,fail=False):
+        def func():
+            with self.lock:
+                self.events.append(("start",name))
+            time.sleep(seconds)
+            with self.lock:
+                self.events.append(("end",name))
+            if fail:
+                raise RuntimeError("{} failed".format(name))
+            return name
+        return func
+
+    def index(self,event,name):
+        return self.events.index((event,name))
+
+def setup_steps(calls,fail=None):
+    return [onoff_setup.SetupStep("set_freq",calls.step("set_freq",0.05)),
+            onoff_setup.SetupStep("autotune",calls.step("autotune"),deps=["point_ants"]),
+            onoff_setup.SetupStep("point_ants",calls.step("point_ants",0.02,fail == "point_ants"),
+                deps=["create_ephems"]),
+            onoff_setup.SetupStep("rf_switch",calls.step("rf_switch"))]
+
+class SetupTest(unittest.TestCase):
+
+    def test_order(self):
+
+        calls = Calls()
+        steps = onoff_setup.order_steps(setup_steps(calls))
+        # create_ephems is not on the list, so point_ants does not wait for it
+        assert([s.name for s in steps] == ["set_freq","point_ants","autotune","rf_switch"])
+
+        cycle = [onoff_setup.SetupStep("a",calls.step("a"),deps=["b"]),
+                onoff_setup.SetupStep("b",calls.step("b"),deps=["a"])]
+        self.assertRaises(RuntimeError, onoff_setup.order_steps, cycle)
+        self.assertRaises(RuntimeError, onoff_setup.order_steps, cycle[:1] * 2)
+
+    def test_sequential_default(self):
+
+        calls = Calls()
+        results = onoff_setup.run_steps(setup_steps(calls))
+        assert(results == {"set_freq": "set_freq", "point_ants": "point_ants", "autotune": "autotune",
+            "rf_switch": "rf_switch"})
+        # one call at a time, in dependency order
+        names = ["set_freq","point_ants","autotune","rf_switch"]
+        assert(calls.events == [(event,name) for name in names for event in ["start","end"]])
+
+    def test_concurrent(self):
+
+        calls = Calls()
+        steps = setup_steps(calls)
+        results = onoff_setup.run_steps(steps,concurrent=True)
+        assert(len(results) == 4)
+        # their spans are flagged, the durations include the contention
+        assert(all(step.concurrent for step in steps))
+        single = setup_steps(calls)[:1]
+        onoff_setup.run_steps(single,concurrent=True)
+        assert(not single[0].concurrent)
+        # autotune waits for the pointing, the frequency setup does not
+        assert(calls.index("start","autotune") > calls.index("end","point_ants"))
+        assert(calls.index("start","point_ants") < calls.index("end","set_freq"))
+
+    def test_errors(self):
+
+        for concurrent in [False, True]:
+            calls = Calls()
+            try:
+                onoff_setup.run_steps(setup_steps(calls,fail="point_ants"),concurrent=concurrent)
+                assert(False)
+            except RuntimeError as e:
+                assert(str(e) == "point_ants failed")
+            # the dependent step is not started, the running ones are finished
+            assert(("start","autotune") not in calls.events)
+            assert(("end","set_freq") in calls.events)
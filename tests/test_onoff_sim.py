@@ -0,0 +1,64 @@
+"""
+Test the onoff_sim module
+"""
+
+import sys
+import time
+import threading
+
+import unittest
+
+sys.path.append("..")
+import onoff_sim
+
+class SimClockTest(unittest.TestCase):
+
+    def test_virtual_time(self):
+
+        clock = onoff_sim.SimClock(start=0.0)
+        tstart = time.time()
+        clock.wait(3600.0)
+        # the time spent between the waits is not simulated time
+        time.sleep(0.05)
+        clock.wait(60.0)
+        assert(clock.elapsed() == 3660.0)
+        assert(time.time() - tstart < 1.0)
+
+    def test_concurrent_waits(self):
+
+        clock = onoff_sim.SimClock(start=0.0)
+        ends = {}
+        def branch(name,seconds):
+            clock.wait(seconds)
+            ends[name] = clock.now()
+        threads = [clock.thread(branch,name,seconds)
+                for name,seconds in [("slew",30.0),("rf_switch",2.0),("retune",8.0)]]
+        for thread in threads:
+            clock.join(thread)
+        # the branches overlap, the join ends with the longest one
+        assert(ends == {"slew": 30.0, "rf_switch": 2.0, "retune": 8.0})
+        assert(clock.elapsed() == 30.0)
+        clock.wait(5.0)
+        assert(clock.elapsed() == 35.0)
+
+    def test_other_threads(self):
+
+        clock = onoff_sim.SimClock(start=0.0)
+        # a thread not started by the clock takes no simulated time
+        thread = threading.Thread(target=clock.wait,args=(60.0,))
+        thread.start()
+        thread.join()
+        assert(clock.elapsed() == 0.0)
+
+    def test_executor(self):
+
+        clock = onoff_sim.SimClock(start=0.0)
+        executor = onoff_sim.SimExecutor(clock,2)
+        def job(seconds):
+            clock.wait(seconds)
+            return clock.now()
+        futures = [executor.submit(job,seconds) for seconds in [10.0,4.0,3.0]]
+        # two workers: the third job starts when the second one ends
+        assert([future.result() for future in futures] == [10.0,4.0,7.0])
+        executor.shutdown()
+        assert(clock.elapsed() == 10.0)
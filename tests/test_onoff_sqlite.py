@@ -0,0 +1,122 @@
+"""
+Test the onoff_sqlite module with the onoff_db queries
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+
+import unittest
+
+sys.path.append("..")
+import onoff_db
+import onoff_sqlite
+import onoff_journal
+
+class SQLiteTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.obsdb = onoff_sqlite.use_sqlite(os.path.join(self.directory, "obs.sqlite"))
+
+    def tearDown(self):
+
+        self.obsdb.close()
+        onoff_db.close_pool()
+        onoff_db.use_connection(None)
+        shutil.rmtree(self.directory)
+
+    def test_generated_set(self):
+
+        ants = onoff_sqlite.synthetic_ants(6)
+        freq_list = [1000.0, 2000.0]
+        setid = onoff_sqlite.generate_set(self.obsdb, ants, freq_list, ["moon"], repetitions=2,
+                group_size=3, ok_fraction=1.0, rng=random.Random(1))
+
+        assert(self.obsdb.count_recordings(setid) == 2 * 2 * 2 * 2)
+        assert(onoff_db.get_coverage(setid, ants) == dict((ant, set(freq_list)) for ant in ants))
+        meas = onoff_db.get_all_meas_dict(setid, ants[:1])
+        assert(sorted(meas.keys()) == ants[:1])
+        assert(len(meas[ants[0]]["freq"]) == 2 * 2 * 2)
+
+    def test_obs_db_calls(self):
+
+        setid = self.obsdb.getNewObsSetID("test")
+        assert(self.obsdb.getSetData(setid)[1] == "test")
+
+        obsids = []
+        for desc in ["ON repetition 0", "OFF repetition 0"]:
+            obsids.append(self.obsdb.add_recording(setid, 1400.0, "moon", "ON-OFF", "ataonoff", desc,
+                {"snap0" : "1a", "snap1" : "2a"}, 0.0, 10.0))
+        self.obsdb.updateAttenVals(obsids[0], {"1a" : [10.0, 11.0], "2a" : [12.0, 13.0]})
+        assert(onoff_db.get_coverage(setid, None) == {})
+
+        onoff_db.write_onoff_series([(obsids[1], {"1a" : [10.0, 11.0]})], obsids)
+        assert(onoff_db.get_coverage(setid, None) == {"1a" : {1400.0}, "2a" : {1400.0}})
+        assert(onoff_db.get_source_coverage(setid, ["1a"]) == [("1a", 1400.0, "moon")])
+
+    def test_series_matches_obs_db(self):
+
+        #the same series written by the obs_db calls and by write_onoff_series
+        ant_dict = {"snap0" : "1a", "snap1" : "2a"}
+        attendict = {"1a" : [10.0, 11.0], "2a" : [12.0, 13.5]}
+        series = []
+        for description in ["obs_db", "write_onoff_series"]:
+            setid = self.obsdb.getNewObsSetID(description)
+            obsids = [self.obsdb.add_recording(setid, 1400.0, "moon", "ON-OFF", "ataonoff", desc,
+                ant_dict, 0.0, 10.0) for desc in ["ON repetition 0", "OFF repetition 0"]]
+            series.append((setid, obsids))
+        (setid_a, obsids_a), (setid_b, obsids_b) = series
+        for obsid in obsids_a:
+            self.obsdb.updateAttenVals(obsid, attendict)
+        self.obsdb.markRecordingsOK(obsids_a)
+        onoff_db.write_onoff_series([(obsid, attendict) for obsid in obsids_b], obsids_b)
+
+        def rows(setid):
+            rows, lastrowid = self.obsdb._execute("select recordings.description,recordings.status,rec_ants.ant,"
+                    "rec_ants.az,rec_ants.el,rec_ants.attenx,rec_ants.atteny "
+                    "from recordings inner join rec_ants on recordings.id = rec_ants.id "
+                    "where recordings.setid = %s order by recordings.id,rec_ants.ant", [setid])
+            return rows
+        assert(len(rows(setid_a)) == 4)
+        assert(rows(setid_a) == rows(setid_b))
+
+    def test_meas_arrays(self):
+
+        ants = onoff_sqlite.synthetic_ants(6)
+        freq_list = [1000.0, 2000.0, 3000.0]
+        setid = onoff_sqlite.generate_set(self.obsdb, ants, freq_list, ["moon"], repetitions=3,
+                group_size=2, ok_fraction=1.0, rng=random.Random(1))
+
+        #chunks smaller than the result
+        arrays = onoff_db.get_meas_arrays(setid, ants[:4], chunk_size=7)
+        assert(arrays.size == 4 * 3 * 3 * 2)
+        assert(len(arrays.freqs) == arrays.size)
+        assert(sorted(arrays.ants) == ants[:4])
+        assert(arrays.coverage() == onoff_db.get_coverage(setid, ants[:4]))
+        assert(len(set(arrays.obsids.tolist())) == 2 * 3 * 3 * 2)
+
+        assert(onoff_db.get_meas_arrays(setid, []).size == 0)
+        assert(onoff_db.get_meas_arrays(setid, None).coverage() == onoff_db.get_coverage(setid, None))
+
+        grown = onoff_db.MeasArrays(capacity=2)
+        grown.append_rows([("1a", 1400.0, 1), ("1b", 1400.0, 1), ("1a", 2000.0, 2)])
+        grown.append_rows([("1b", 2000.0, 2)])
+        assert(grown.size == 4 and len(grown.trim().freqs) == 4)
+        assert(grown.coverage() == {"1a" : {1400.0, 2000.0}, "1b" : {1400.0, 2000.0}})
+
+    def test_journal_reconcile(self):
+
+        ants = onoff_sqlite.synthetic_ants(4)
+        setid = onoff_sqlite.generate_set(self.obsdb, ants, [1000.0, 2000.0], ["moon"], repetitions=1,
+                group_size=2, ok_fraction=1.0, rng=random.Random(1))
+
+        #the resumed run reconciles its journal with the streamed measurements
+        journal = onoff_journal.Journal.for_set(self.directory, setid)
+        journal.record_ok({"snap0" : ants[0]}, 1000.0, [1])
+        journal.reconcile_async(lambda: onoff_db.get_meas_arrays(setid, ants[:2]).coverage()).join()
+        assert(journal.coverage() == dict((ant, {1000.0, 2000.0}) for ant in ants[:2]))
+        journal.close()
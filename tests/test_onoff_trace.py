@@ -0,0 +1,59 @@
+"""
+Test the onoff_trace module
+"""
+
+import os
+import sys
+import tempfile
+
+import unittest
+
+sys.path.append("..")
+import onoff_trace
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+
+        fd, self.filename = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.now = [100.0]
+        onoff_trace.start_trace(self.filename, lambda: self.now[0])
+
+    def tearDown(self):
+
+        onoff_trace.stop_trace()
+        os.remove(self.filename)
+
+    def test_spans_and_summary(self):
+
+        onoff_trace.set_context(set=7, freq=1400.0)
+        with onoff_trace.span("onoff_series"):
+            with onoff_trace.span("point_on"):
+                self.now[0] += 20.0
+            self.now[0] += 10.0
+        onoff_trace.set_context(freq=2500.0)
+        with onoff_trace.span("point_on"):
+            self.now[0] += 30.0
+
+        spans = onoff_trace.read_spans([self.filename])
+        assert(len(spans) == 3)
+
+        summary = onoff_trace.summarize(spans, "set")
+        wall, phases = summary[7]
+        # nested spans are not counted twice in the covered time
+        assert(wall == 60.0)
+        assert(phases["point_on"] == (2, 50.0))
+
+        summary = onoff_trace.summarize(spans, "freq")
+        assert(summary[1400.0][0] == 30.0)
+        assert(summary[2500.0][1] == {"point_on" : (1, 30.0)})
+
+    def test_error_span(self):
+
+        def fail():
+            raise RuntimeError("boom")
+
+        self.assertRaises(RuntimeError, onoff_trace.traced, "autotune", fail)
+        spans = onoff_trace.read_spans([self.filename])
+        assert(spans[0]["name"] == "autotune" and spans[0]["error"])
@@ -0,0 +1,154 @@
+"""
+Test the snap_capture_daemon module with a stub session
+"""
+
+import os
+import sys
+import stat
+import time
+import socket
+import shutil
+import tempfile
+import threading
+
+import unittest
+
+sys.path.append("..")
+import snap_capture_daemon
+
+class StubSession(object):
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fpga_clk = 225.0
+        self.acc_len = 2048.0
+        self.recorded = []
+        self.checks = 0
+        self.lock = threading.Lock()
+
+    def run(self, func, path, ncaptures, meta, rfc, ifc, adc_snapshots):
+        time.sleep(self.delay)
+        if ncaptures < 0:
+            raise RuntimeError("bad number of captures")
+        with self.lock:
+            self.recorded.append((path, ncaptures, meta, rfc))
+        return ncaptures
+
+    def check(self):
+        self.checks += 1
+
+class CaptureDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.daemons = []
+
+    def tearDown(self):
+
+        for daemon in self.daemons:
+            daemon.stop()
+        shutil.rmtree(self.directory)
+
+    def _daemon(self, host, session):
+
+        daemon = snap_capture_daemon.CaptureDaemon(session, os.path.join(self.directory, host + ".sock"),
+                self.directory)
+        self.daemons.append(daemon.start())
+        return daemon.path
+
+    def test_jobs(self):
+
+        session = StubSession()
+        client = snap_capture_daemon.CaptureClient(self._daemon("snap0", session))
+        futures = [client.capture("a.cap", 4, {"ant" : "1a"}, rfc=1400.0), client.capture("b.cap", -1),
+                client.check()]
+        assert(futures[0].result(5)["ncaptures"] == 4)
+        with self.assertRaises(RuntimeError):
+            futures[1].result(5)
+        assert(futures[2].result(5)["fpga_clk"] == 225.0)
+        path = os.path.join(os.path.realpath(self.directory), "a.cap")
+        assert(session.recorded == [(path, 4, {"ant" : "1a"}, 1400.0)] and session.checks == 1)
+        assert(client.status().result(5)["failed"] == 1)
+
+        assert(client.stop().result(5)["done"] == 2)
+        client.close()
+
+    def test_dispatch_to_all(self):
+
+        hosts = ["snap0", "snap1", "snap2"]
+        paths = dict((host, self._daemon(host, StubSession(0.2))) for host in hosts)
+        dispatcher = snap_capture_daemon.CaptureDispatcher(hosts, paths)
+
+        tstart = time.time()
+        futures = dispatcher.capture(dict((host, {"path" : host + ".cap", "ncaptures" : 2}) for host in hosts))
+        results = dispatcher.wait(futures, 5)
+        # the SNAPs capture at the same time
+        assert(time.time() - tstart < 0.5)
+        assert(sorted(os.path.basename(r["path"]) for r in results.values()) == ["snap0.cap", "snap1.cap", "snap2.cap"])
+        # captures still running when the wait gives up
+        futures = dispatcher.capture({"snap0" : {"path" : "late.cap", "ncaptures" : 1}})
+        with self.assertRaises(snap_capture_daemon.CaptureTimeout):
+            dispatcher.wait(futures, 0.05)
+        dispatcher.wait(futures, 5)
+        dispatcher.close()
+
+    def test_daemon_gone(self):
+
+        path = self._daemon("snap0", StubSession(0.5))
+        client = snap_capture_daemon.CaptureClient(path)
+        future = client.capture("a.cap", 1)
+        client.close()
+        with self.assertRaises(RuntimeError):
+            future.result(5)
+
+    def test_job_paths(self):
+
+        session = StubSession()
+        client = snap_capture_daemon.CaptureClient(self._daemon("snap0", session))
+        os.symlink("/etc", os.path.join(self.directory, "etc"))
+        # nothing is written outside of the data directory
+        for path in ["../a.cap", "/etc/a.cap", "etc/a.cap", ""]:
+            with self.assertRaises(RuntimeError):
+                client.capture(path, 1).result(5)
+        inside = os.path.join(self.directory, "sub", "b.cap")
+        assert(client.capture(inside, 1).result(5)["path"] == os.path.realpath(inside))
+        assert(len(session.recorded) == 1)
+        client.close()
+
+    def test_socket_checks(self):
+
+        path = self._daemon("snap0", StubSession())
+        assert(stat.S_IMODE(os.stat(path).st_mode) == 0o600)
+        # a running daemon keeps its socket
+        with self.assertRaises(RuntimeError):
+            snap_capture_daemon.CaptureDaemon(StubSession(), path, self.directory)
+
+        # a file that is not a socket is left alone
+        other = os.path.join(self.directory, "other.sock")
+        open(other, "w").close()
+        with self.assertRaises(RuntimeError):
+            snap_capture_daemon.CaptureDaemon(StubSession(), other, self.directory)
+        assert(os.path.exists(other))
+
+        # the socket of a daemon that is gone is replaced
+        stale = os.path.join(self.directory, "stale.sock")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(stale)
+        sock.close()
+        daemon = snap_capture_daemon.CaptureDaemon(StubSession(), stale, self.directory)
+        self.daemons.append(daemon.start())
+        client = snap_capture_daemon.CaptureClient(stale)
+        assert(client.status().result(5)["done"] == 0)
+        client.close()
+
+    def test_runtime_dir(self):
+
+        runtime = os.path.join(self.directory, "run")
+        assert(snap_capture_daemon.make_runtime_dir(runtime) == runtime)
+        assert(stat.S_IMODE(os.stat(runtime).st_mode) == 0o700)
+        assert(snap_capture_daemon.make_runtime_dir(runtime) == runtime)
+        # a directory others can use is refused
+        os.chmod(runtime, 0o755)
+        with self.assertRaises(RuntimeError):
+            snap_capture_daemon.make_runtime_dir(runtime)
@@ -0,0 +1,94 @@
+"""
+Test the snap_capture_file module
+"""
+
+import os
+import sys
+import pickle
+import shutil
+import tempfile
+
+import unittest
+import numpy as np
+
+sys.path.append("..")
+import snap_capture_file
+
+class CaptureFileTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.cap")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def _spectra(self, n):
+
+        return np.arange(2 * 8, dtype=float).reshape(2, 8) + 100 * n
+
+    def test_write_and_read(self):
+
+        meta = {"rfc" : 1400.0, "fpga_clk" : np.float64(225.0), "ata_status" : "ok",
+                "adc0_stats" : {"mean" : np.float32(0.5)}}
+        with snap_capture_file.CaptureWriter(self.path, meta) as writer:
+            writer.write_array("adc0_bitsnaps", np.arange(5))
+            for n in range(4):
+                writer.write_capture(self._spectra(n), 1000.0 + n, n, 2 * n)
+            writer.update_meta(attenx=10.5, atteny=11.0)
+
+        capture = snap_capture_file.CaptureFile(self.path)
+        assert(capture.ncaptures == 4 and capture.nchannels == 8)
+        assert(capture.meta["rfc"] == 1400.0 and capture.meta["attenx"] == 10.5)
+        assert(capture.meta["adc0_stats"]["mean"] == 0.5)
+        assert(capture.arrays() == ["adc0_bitsnaps"])
+        assert(capture.array("adc0_bitsnaps").tolist() == list(range(5)))
+
+        assert(np.array_equal(capture.spectra(), np.array([self._spectra(n) for n in range(4)])))
+        auto1 = capture.auto(1, captures=slice(1, 3), channels=slice(2, 5))
+        assert(np.array_equal(auto1, np.array([self._spectra(n)[1, 2:5] for n in [1, 2]])))
+        records = capture.records()
+        assert(records["timestamp"].tolist() == [1000.0, 1001.0, 1002.0, 1003.0])
+        assert(records["auto1_of_count"].tolist() == [0, 2, 4, 6])
+
+    def test_cut_capture(self):
+
+        writer = snap_capture_file.CaptureWriter(self.path)
+        # readable before the first capture
+        assert(snap_capture_file.CaptureFile(self.path).ncaptures == 0)
+        for n in range(3):
+            writer.write_capture(self._spectra(n), float(n))
+        # a crash in the middle of the next capture
+        writer.spectra.write(b"\0" * 24)
+        writer.spectra.flush()
+
+        capture = snap_capture_file.CaptureFile(self.path)
+        assert(capture.ncaptures == 3)
+        assert(capture.auto(0).shape == (3, 8))
+
+        with self.assertRaises(ValueError):
+            writer.write_capture(np.zeros((2, 4)), 4.0)
+        writer.close()
+
+    def test_pickle_export(self):
+
+        with snap_capture_file.CaptureWriter(self.path, {"rfc" : 1400.0}) as writer:
+            writer.write_array("frange", np.linspace(0.0, 1.0, 16))
+            for n in range(3):
+                writer.write_capture(self._spectra(n), 1000.0 + n, n, 2 * n, 3, 4)
+
+        filename = snap_capture_file.export_pickle(self.path)
+        assert(filename == os.path.join(self.directory, "test.pkl"))
+        with open(filename, "rb") as f:
+            data = f.read()
+        # plain lists and numbers, readable without numpy
+        assert(b"numpy" not in data)
+        out = pickle.loads(data)
+        assert(type(out["frange"]) == list and type(out["auto0"][0][0]) == float)
+        # the layout of the old recorder
+        assert(out["rfc"] == 1400.0 and len(out["frange"]) == 16)
+        assert(len(out["auto0"]) == 3 and np.array_equal(out["auto1"][2], self._spectra(2)[1]))
+        assert(out["auto0_timestamp"] == out["auto1_timestamp"] == [1000.0, 1001.0, 1002.0])
+        assert(out["auto1_of_count"] == [0, 2, 4] and out["fft_of0"] == [3, 3, 3])
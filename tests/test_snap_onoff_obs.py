@@ -0,0 +1,111 @@
+"""
+Test snap_onoff_obs on the onoff_sim backend
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import unittest
+
+sys.path.append("..")
+import onoff_sim
+
+timings = {'slew': 'const,10', 'capture': 'const,0.5', 'setrms': 'const,5', 'db': 'const,4'}
+
+class LoggedObsDb(onoff_sim.SimObsDb):
+    """
+    SimObsDb recording its calls, failing updateAttenVals of fail_obsid
+    """
+    def __init__(self,sim,fail_obsid=None):
+        onoff_sim.SimObsDb.__init__(self,sim)
+        self.fail_obsid = fail_obsid
+        self.calls = []
+
+    def updateAttenVals(self,obsid,attendict):
+        onoff_sim.SimObsDb.updateAttenVals(self,obsid,attendict)
+        if obsid == self.fail_obsid:
+            raise RuntimeError("update of {} failed".format(obsid))
+        self.calls.append(("updateAttenVals",obsid))
+
+    def markRecordingsOK(self,obsids):
+        onoff_sim.SimObsDb.markRecordingsOK(self,obsids)
+        self.calls.append(("markRecordingsOK",tuple(obsids)))
+
+class FailingSnapObservations(onoff_sim.SimSnapObservations):
+
+    def __init__(self,sim,fail_after):
+        onoff_sim.SimSnapObservations.__init__(self,sim)
+        self.fail_after = fail_after
+
+    def record_same(self,*args):
+        if self.sim.next_obsid > self.fail_after:
+            raise RuntimeError("capture failed")
+        return onoff_sim.SimSnapObservations.record_same(self,*args)
+
+class PipelinedTest(unittest.TestCase):
+
+    def run_series(self,pipelined,fail_obsid=None,fail_after=None):
+
+        sim = onoff_sim.SimArray(timings,seed=1)
+        backend = onoff_sim.SimBackend(sim)
+        backend.obs_db = LoggedObsDb(sim,fail_obsid)
+        if fail_after:
+            backend.snap_observations = FailingSnapObservations(sim,fail_after)
+        self.obs = onoff_sim.install_backend(backend)
+        self.sim = sim
+        self.obs_db = backend.obs_db
+        setid = backend.obs_db.getNewObsSetID("pipelined test")
+        self.obs.onoff_observations({"snap0": "2a", "snap1": "2b"},setid,1400.0,None,"moon",2,16,0.0,10.0,
+                pipelined=pipelined)
+
+    def executor_threads(self):
+        return [t for t in threading.enumerate() if t.name.startswith("sim-executor")]
+
+    def test_order(self):
+
+        self.run_series(False)
+        sequential = self.sim.clock.elapsed()
+        self.run_series(True)
+        # the writes keep the recording order and come before the OK
+        assert(self.obs_db.calls == [("updateAttenVals",obsid) for obsid in range(1,5)] +
+                [("markRecordingsOK",(1,2,3,4))])
+        # each write overlaps the next slew, the last one is waited for
+        assert(self.sim.clock.elapsed() == sequential - 3 * 4.0)
+
+    def test_failed_write(self):
+
+        before = self.executor_threads()
+        self.assertRaises(RuntimeError, self.run_series, True, fail_obsid=2)
+        # the series is not marked OK, the writes after the failed one were done
+        assert(("markRecordingsOK",(1,2,3,4)) not in self.obs_db.calls)
+        assert(all(rec['status'] == 'PENDING' for rec in self.sim.recordings.values()))
+        assert(("updateAttenVals",4) in self.obs_db.calls)
+        assert(self.executor_threads() == before)
+
+    def test_failed_capture(self):
+
+        before = self.executor_threads()
+        self.assertRaises(RuntimeError, self.run_series, True, fail_after=3)
+        # the writes already queued are finished and the worker is shut down
+        assert(self.obs_db.calls == [("updateAttenVals",1),("updateAttenVals",2),("updateAttenVals",3)])
+        assert(self.executor_threads() == before)
+
+class ConfigTest(unittest.TestCase):
+
+    def test_sqlite_rejected(self):
+
+        obs = onoff_sim.install_backend(onoff_sim.SimBackend(onoff_sim.SimArray(timings)))
+        fd, filename = tempfile.mkstemp(suffix=".cfg")
+        with os.fdopen(fd, "w") as f:
+            f.write("[measurement]\nantennas = 1a\nfreq = 1400\nsources = moon\n"
+                    "[database]\nbackend = sqlite\nfile = /tmp/onoff_test.sqlite\n")
+        argv = sys.argv
+        sys.argv = ["snap_onoff_obs.py", "--no-file", "-c", filename]
+        try:
+            # the real observations can not record into the stand-in
+            self.assertRaisesRegex(RuntimeError, "offline runs only", obs.main)
+        finally:
+            sys.argv = argv
+            os.remove(filename)
@@ -0,0 +1,128 @@
+"""
+Test the snap_session module with a fake SNAP
+"""
+
+import os
+import sys
+import struct
+import shutil
+import tempfile
+
+import unittest
+
+sys.path.append("..")
+import snap_session
+import snap_capture_file
+
+class FakeSnapshot(object):
+
+    def __init__(self, snap):
+        self.snap = snap
+
+    def read_raw(self):
+        self.snap.reads += 1
+        if self.snap.fail_reads:
+            self.snap.fail_reads -= 1
+            raise IOError("connection lost")
+        words = [2048 * (self.snap.reads + n) for n in range(8)]
+        data = struct.pack('>8L', *words)
+        return {'data' : data, 'length' : len(data)}, 1000.0 + self.snap.reads
+
+class FakeSnapshots(object):
+
+    def __init__(self, snap):
+        self.vacc_ss_ss = FakeSnapshot(snap)
+
+class FakeSnap(object):
+
+    def __init__(self, clocks):
+        self.clocks = list(clocks)
+        self.designs = 0
+        self.reads = 0
+        self.fail_reads = 0
+        self.snapshots = FakeSnapshots(self)
+
+    def get_system_information(self, fpga_file):
+        self.designs += 1
+
+    def estimate_fpga_clock(self):
+        return self.clocks.pop(0) if len(self.clocks) > 1 else self.clocks[0]
+
+    def read_int(self, name):
+        return {'timebase_sync_period' : 2048 * 1024}.get(name, 0)
+
+    def write_int(self, name, value):
+        pass
+
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.snaps = []
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def _connect(self, clocks):
+
+        def connect(host):
+            snap = FakeSnap(clocks)
+            self.snaps.append(snap)
+            return snap
+        return connect
+
+    def _session(self, clocks=[225.0], clock_checks=5):
+
+        return snap_session.SnapSession("snap0", "design.fpg", 900.0, self._connect(clocks),
+                clock_checks=clock_checks, sleep=lambda s: None)
+
+    def test_reused_across_recordings(self):
+
+        session = self._session()
+        for n in range(3):
+            path = os.path.join(self.directory, "{}.cap".format(n))
+            assert(session.run(snap_session.SnapSession.record, path, 4, {"ant" : "1a"}, adc_snapshots=0) == 4)
+
+        assert(len(self.snaps) == 1 and self.snaps[0].designs == 1)
+        capture = snap_capture_file.CaptureFile(path)
+        assert(capture.ncaptures == 4 and capture.nchannels == 4)
+        assert(capture.meta["acc_len"] == 2048.0 and capture.meta["ant"] == "1a")
+        # words 2048 * (reads + n), divided by acc_len
+        assert(capture.auto(0, captures=[0])[0].tolist() == [9.0, 11.0, 13.0, 15.0])
+
+    def test_clock_retries(self):
+
+        session = self._session([100.0, 100.0, 225.0])
+        session.get()
+        assert(session.fpga_clk == 225.0)
+
+        session = self._session([100.0], clock_checks=2)
+        with self.assertRaises(RuntimeError):
+            session.get()
+        assert(session.snap is None)
+
+    def test_reconnect_on_error(self):
+
+        session = self._session()
+        session.get()
+        self.snaps[0].fail_reads = 1
+        path = os.path.join(self.directory, "retry.cap")
+        assert(session.run(snap_session.SnapSession.record, path, 2, adc_snapshots=0) == 2)
+        assert(len(self.snaps) == 2 and session.opened == 2)
+
+        session.check()
+        assert(len(self.snaps) == 3)
+
+    def test_manager(self):
+
+        manager = snap_session.SessionManager("design.fpg", connect=self._connect([225.0]),
+                sleep=lambda s: None)
+        assert(manager.get("snap0") is manager.get("snap0"))
+        assert(manager.get("snap1") is not manager.get("snap0"))
+        manager.get("snap0").get()
+        manager.check_all()
+        assert(len(self.snaps) == 2)
+        manager.close()
+        assert(manager.sessions == {})
@@ -0,0 +1,151 @@
+"""
+Test the snap_tuning module with simulated attenuators and ADCs
+"""
+
+import sys
+import time
+import threading
+
+import unittest
+import numpy as np
+
+sys.path.append("..")
+import snap_tuning
+
+class SimInputs(object):
+    """
+    two ADC inputs whose RMS falls by slope dB per dB of attenuation
+    """
+    def __init__(self, rms0, slopes, seed=1, delay=0.0):
+        self.rms0 = rms0
+        self.slopes = slopes
+        self.attens = [0.0, 0.0]
+        self.rng = np.random.RandomState(seed)
+        self.delay = delay
+        self.set_calls = 0
+
+    def set_atten(self, antpols, attens):
+        self.set_calls += 1
+        for antpol, atten in zip(antpols, attens):
+            self.attens["xy".index(antpol[-1])] = atten
+
+    def snapshot(self):
+        time.sleep(self.delay)
+        rms = [r * 10 ** (-s * a / 20.0) for r, a, s in zip(self.rms0, self.attens, self.slopes)]
+        samples = np.empty(4096)
+        samples[0::2] = self.rng.normal(0, rms[0], 2048)
+        samples[1::2] = self.rng.normal(0, rms[1], 2048)
+        return samples
+
+class SimAtaControl(object):
+    """
+    ata_control of the inputs: the attenuators of the antennas in no_atten
+    do not respond, their PAMs set the inputs instead
+    """
+    def __init__(self, inputs, no_atten):
+        self.inputs = inputs
+        self.no_atten = no_atten
+        self.pam_calls = []
+
+    def set_atten(self, antpols, attens):
+        missing = [antpol for antpol in antpols if antpol[:-1] in self.no_atten]
+        if missing:
+            return "no attenuator for {}\n".format(",".join(missing))
+        self.inputs.set_atten(antpols, attens)
+        return "OK\n"
+
+    def set_pam_attens(self, ant, attenx, atteny):
+        self.pam_calls.append((ant, attenx, atteny))
+        self.inputs.attens = [attenx, atteny]
+
+class TuningTest(unittest.TestCase):
+
+    def _tuner(self, inputs, response=None):
+
+        return snap_tuning.SnapTuner(snap_tuning.AdcSampler(inputs.snapshot), inputs.set_atten, response)
+
+    def test_sampler_stats(self):
+
+        inputs = SimInputs([40.0, 10.0], [1.0, 1.0])
+        mean, rms = snap_tuning.AdcSampler(inputs.snapshot, 5).sample()
+        assert(abs(rms[0] - 40.0) < 1.5 and abs(rms[1] - 10.0) < 0.5)
+        assert(abs(mean[0]) < 1.5)
+
+    def test_converges_in_few_steps(self):
+
+        # the nominal model is right: a single correction step
+        inputs = SimInputs([60.0, 30.0], [1.0, 1.0])
+        result = self._tuner(inputs).tune("2a")
+        assert(result.converged and result.steps <= 2)
+        assert(abs(result.attens[0] - 14.0) <= 1.0 and abs(result.attens[1] - 8.0) <= 1.0)
+
+        # the slope is learned, the next tuning needs one step less
+        response = snap_tuning.AttenResponse()
+        inputs = SimInputs([60.0, 60.0], [0.6, 0.6])
+        first = self._tuner(inputs, response).tune("2a")
+        assert(first.converged and first.steps <= 3)
+        assert(abs(response.slope("2ax") - 0.6) < 0.25)
+        inputs = SimInputs([60.0, 60.0], [0.6, 0.6], seed=2)
+        second = self._tuner(inputs, response).tune("2a")
+        assert(second.converged and second.steps < first.steps)
+
+    def test_limits_and_single_input(self):
+
+        # too weak already without attenuation
+        inputs = SimInputs([2.0, 2.0], [1.0, 1.0])
+        result = self._tuner(inputs).tune("2a")
+        assert(result.converged and result.steps == 1 and result.attens == [0.0, 0.0])
+
+        inputs = SimInputs([60.0, 600.0], [1.0, 1.0])
+        result = self._tuner(inputs).tune("2ax", [3.1, 5.0])
+        assert(result.converged and result.attens[1] == 5.0)
+        assert(snap_tuning.quantize(3.1) == 3.0 and snap_tuning.quantize(40) == 30.0)
+
+    def test_group_concurrent(self):
+
+        sims = dict(("snap{}".format(n), SimInputs([60.0, 60.0], [1.0, 1.0], seed=n, delay=0.02))
+                for n in range(3))
+        ant_dict = {"snap0" : "1a", "snap1" : "2ax,3by", "snap2" : "4c"}
+        tstart = time.time()
+        attendict, results = snap_tuning.tune_group(ant_dict, lambda sk: self._tuner(sims[sk]))
+        elapsed = time.time() - tstart
+        assert(sorted(attendict.keys()) == ["1a", "2ax,3by", "4c"])
+        assert(all(r.converged for r in results.values()))
+        # 5 snapshots per step, the SNAPs run side by side
+        steps = max(r.steps for r in results.values())
+        assert(elapsed < 2 * steps * 5 * 0.02)
+
+    def test_group_failure(self):
+
+        # a failing SNAP does not stop the tuning of the others
+        sims = dict(("snap{}".format(n), SimInputs([60.0, 60.0], [1.0, 1.0], seed=n)) for n in range(3))
+        def tuner_for(sk):
+            if sk == "snap1":
+                raise RuntimeError("snap1 not reachable")
+            return self._tuner(sims[sk])
+        ant_dict = {"snap0" : "1a", "snap1" : "2a", "snap2" : "4c"}
+        attendict, results = snap_tuning.tune_group(ant_dict, tuner_for)
+        assert(sorted(attendict.keys()) == ["1a", "4c"])
+        assert(isinstance(results["snap1"], RuntimeError))
+        assert(results["snap0"].converged and results["snap2"].converged)
+
+    def test_pam_fallback(self):
+
+        # the attenuators of 2a do not respond, the PAMs are tuned instead
+        inputs = SimInputs([60.0, 30.0], [1.0, 1.0])
+        control = SimAtaControl(inputs, ["2a"])
+        tuner = snap_tuning.SnapTuner(snap_tuning.AdcSampler(inputs.snapshot), snap_tuning.AttenSetter(control))
+        result = tuner.tune("2a")
+        assert(result.converged and result.steps <= 2)
+        assert(control.pam_calls[-1] == ("2a", result.attens[0], result.attens[1]))
+        assert(inputs.set_calls == 0)
+
+        # a single pol keeps the PAM setting of the other one
+        tuner.tune("2ay", [0.0, 6.0])
+        assert(control.pam_calls[-1][1] == result.attens[0])
+
+        # with an attenuator the PAMs are left alone
+        inputs = SimInputs([60.0, 30.0], [1.0, 1.0])
+        control = SimAtaControl(inputs, [])
+        snap_tuning.SnapTuner(snap_tuning.AdcSampler(inputs.snapshot), snap_tuning.AttenSetter(control)).tune("2a")
+        assert(not control.pam_calls and inputs.set_calls > 0)
@@ -0,0 +1,40 @@
+"""
+Test the snap_vacc module
+"""
+
+import sys
+import struct
+
+import unittest
+import numpy as np
+
+sys.path.append("..")
+import snap_vacc
+
+class VaccTest(unittest.TestCase):
+
+    def test_matches_unpack(self):
+
+        words = [0, 1, 0xffffffff, 0x80000000, 12345678, 7, 0x01020304, 99]
+        data = struct.pack('>%dL' % len(words), *words)
+        auto0, auto1 = snap_vacc.decode_vacc_unpack(data, 4.0)
+        decoded = snap_vacc.decode_vacc(data, 4.0)
+
+        assert(decoded.shape == (2, 4) and decoded.dtype == np.float64)
+        assert(np.array_equal(decoded[0], auto0) and np.array_equal(decoded[1], auto1))
+        assert(decoded[0, 1] == 0xffffffff / 4.0)
+
+        counts = snap_vacc.vacc_counts(data)
+        assert(counts[:, 1].tolist() == words[1::2])
+
+    def test_length_and_out(self):
+
+        # the snapshot buffer may be longer than its valid length
+        data = struct.pack('>6L', 2, 4, 6, 8, 10, 12) + b'\0' * 8
+        out = np.empty((2, 2))
+        decoded = snap_vacc.decode_vacc(data, 2.0, length=16, out=out)
+        assert(decoded is out)
+        assert(out.tolist() == [[1.0, 3.0], [2.0, 4.0]])
+
+        with self.assertRaises(ValueError):
+            snap_vacc.vacc_counts(data, length=12)